@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+benchmarks/ipc_batch.py
+Compares sequential requests with batched and pipelined submission.
+
+One client issues the same number of small commands three ways: one request
+per round trip, a single ordered batch, and a pipeline that writes every
+request before reading any reply. Run from the repository root:
+
+    python -m benchmarks.ipc_batch --commands 500
+"""
+
+import argparse
+import time
+
+from benchmarks.ipc_throughput import _start_server
+from src.lite_agent.ipc import IPCClient
+
+
+def _status_handler(command_dict):
+    return {"status": "Agent is running", "n": command_dict.get("n")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--commands", type=int, default=500)
+    args = parser.parse_args()
+
+    server, loop = _start_server(_status_handler, 128)
+    commands = [{"command": "status", "n": i} for i in range(args.commands)]
+    with IPCClient(port=server.port, timeout=60) as client:
+        client.request({"command": "status"})  # Connect before timing.
+        cases = [
+            ("sequential", lambda: [client.request(c) for c in commands]),
+            ("batch", lambda: client.batch(commands)),
+            ("pipeline", lambda: client.pipeline(commands)),
+        ]
+        for name, run in cases:
+            started = time.perf_counter()
+            results = run()
+            elapsed = time.perf_counter() - started
+            assert len(results) == len(commands)
+            print(
+                f"{name:<10} {len(commands)} commands in {elapsed * 1000:8.1f} ms "
+                f"({elapsed / len(commands) * 1e6:6.1f} us per command)"
+            )
+    loop.call_soon_threadsafe(server.close)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+benchmarks/ipc_bulk.py
+Compares fetching a large reply over the socket with the shared-memory path.
+
+The handler returns a reply of the requested size. The same request is timed
+with a plain IPCClient and with one that opts in to shared-memory replies.
+Run from the repository root:
+
+    python -m benchmarks.ipc_bulk --megabytes 32 --rounds 10
+"""
+
+import argparse
+import time
+
+from benchmarks.ipc_throughput import _start_server
+from src.lite_agent.ipc import IPCClient
+
+
+async def _bulk_handler(command_dict):
+    return {"blob": "b" * command_dict["size"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--megabytes", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    server, loop = _start_server(_bulk_handler, 128)
+    command = {"size": args.megabytes * 1024 * 1024}
+    for name, use_shm in (("socket", False), ("shared memory", True)):
+        with IPCClient(port=server.port, timeout=120, shm=use_shm) as client:
+            client.request(command)  # Warm up.
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                client.request(command)
+            elapsed = (time.perf_counter() - started) / args.rounds
+        print(
+            f"{name:<14} {args.megabytes} MiB reply: {elapsed * 1000:7.1f} ms "
+            f"({args.megabytes / elapsed:,.0f} MiB/s)"
+        )
+    loop.call_soon_threadsafe(server.close)
+
+
+if __name__ == "__main__":
+    main()
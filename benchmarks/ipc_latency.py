@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+benchmarks/ipc_latency.py
+Compares request round-trip latency over TCP loopback and a Unix socket.
+
+An in-process IPCServer listens on both transports with a trivial coroutine
+handler, so the numbers reflect the transport and framing rather than the
+handler. Each transport is measured on a persistent connection and with a
+fresh connection per request. Run from the repository root:
+
+    python -m benchmarks.ipc_latency --requests 5000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.ipc_throughput import _start_server
+from src.lite_agent.ipc import UDS_SUPPORTED, IPCClient, _connect
+from src.lite_agent.protocol import recv_message, send_message
+
+
+async def _status_handler(command_dict):
+    return {"status": "Agent is running"}
+
+
+def _measure(call, requests):
+    for _ in range(min(200, requests)):  # Warm up caches and the allocator.
+        call()
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter_ns()
+        call()
+        samples.append((time.perf_counter_ns() - started) / 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p99": samples[int(len(samples) * 0.99)],
+    }
+
+
+def _one_shot(**address):
+    def _call():
+        with _connect(**address) as sock:
+            send_message(sock, {"command": "status"})
+            recv_message(sock)
+
+    return _call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    if not UDS_SUPPORTED:
+        raise SystemExit("Unix domain sockets are not available on this platform.")
+
+    uds_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    server, loop = _start_server(_status_handler, 128, uds_path=uds_path)
+    tcp_client = IPCClient(port=server.port, timeout=30)
+    uds_client = IPCClient(uds_path=uds_path, tcp_fallback=False, timeout=30)
+    cases = [
+        ("tcp  persistent", lambda: tcp_client.request({"command": "status"})),
+        ("unix persistent", lambda: uds_client.request({"command": "status"})),
+        ("tcp  connect", _one_shot(port=server.port)),
+        ("unix connect", _one_shot(uds_path=uds_path, tcp_fallback=False)),
+    ]
+    print(f"{'transport':<16} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for name, call in cases:
+        stats = _measure(call, args.requests)
+        print(
+            f"{name:<16} {stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p99']:>9.1f}"
+        )
+    tcp_client.close()
+    uds_client.close()
+    loop.call_soon_threadsafe(server.close)
+
+
+if __name__ == "__main__":
+    main()
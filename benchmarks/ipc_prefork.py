@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+benchmarks/ipc_prefork.py
+Measures how command throughput scales with the number of pre-fork workers.
+
+A supervisor forks N workers that accept on one shared loopback socket and
+run a CPU-bound handler. Load comes from several client processes, each with
+its own persistent connections, so the client side is not limited by a single
+GIL either. Run from the repository root:
+
+    python -m benchmarks.ipc_prefork --workers 1 2 4 --clients 8
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.lite_agent.ipc import IPCClient, IPCServer, bind_listeners
+from src.lite_agent.supervisor import Supervisor
+
+
+def _busy_handler(command_dict):
+    # Roughly a millisecond of pure-Python work per command.
+    total = 0
+    for i in range(command_dict.get("work", 20000)):
+        total += i * i
+    return {"pid": os.getpid(), "total": total}
+
+
+def _client_process(port, connections, requests):
+    def _drive(_):
+        with IPCClient(port=port, timeout=60) as client:
+            for _ in range(requests):
+                client.request({"command": "busy"})
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        list(pool.map(_drive, range(connections)))
+
+
+def _measure(workers, clients, connections, requests):
+    sockets = bind_listeners(port=0)
+    port = sockets[0].getsockname()[1]
+
+    def worker_main(index):  # pylint: disable=unused-argument
+        # Coroutine wrapper so the handler runs on the loop thread itself and
+        # each worker's single core is the limit, as in the daemon.
+        async def handler(command_dict):
+            return _busy_handler(command_dict)
+
+        asyncio.run(IPCServer(handler, sockets=sockets).serve_forever())
+
+    supervisor = Supervisor(workers, worker_main)
+    thread = threading.Thread(target=supervisor.run)
+    thread.start()
+    while len(supervisor.children) < workers:
+        time.sleep(0.01)
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=_client_process, args=(port, connections, requests))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - started
+
+    supervisor.stop()
+    thread.join()
+    for sock in sockets:
+        sock.close()
+    return clients * connections * requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    for workers in args.workers:
+        rate = _measure(workers, args.clients, args.connections, args.requests)
+        print(f"{workers} worker(s): {rate:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
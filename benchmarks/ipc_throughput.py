@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+benchmarks/ipc_throughput.py
+Measures how many IPC round trips per second the daemon's server sustains.
+
+An in-process IPCServer is started on a free loopback port with a trivial
+handler, then hammered by a number of concurrent client threads. Run from the
+repository root:
+
+    python -m benchmarks.ipc_throughput --clients 32 --requests 200
+    python -m benchmarks.ipc_throughput --clients 32 --requests 200 --mode connect
+
+The default "persistent" mode shares one multiplexed IPCClient between all
+threads; "connect" opens a fresh connection for every request.
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.lite_agent.ipc import IPCClient, IPCServer, _connect
+from src.lite_agent.protocol import recv_message, send_message
+
+
+def _status_handler(command_dict):
+    return {"status": "Agent is running", "echo": command_dict.get("command")}
+
+
+def _start_server(handler, backlog, **server_options):
+    """Runs an IPCServer on its own event loop thread and returns (server, loop)."""
+    loop = asyncio.new_event_loop()
+    server = IPCServer(handler, port=0, backlog=backlog, **server_options)
+    ready = threading.Event()
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, daemon=True).start()
+    ready.wait()
+    return server, loop
+
+
+def _connect_worker(port, requests):
+    for _ in range(requests):
+        with _connect(port=port) as sock:
+            send_message(sock, {"command": "status"})
+            envelope = recv_message(sock)
+        if "error" in envelope["response"]:
+            raise RuntimeError(envelope["response"]["error"])
+
+
+def _persistent_worker(client, requests):
+    for _ in range(requests):
+        response = client.request({"command": "status"})
+        if "error" in response:
+            raise RuntimeError(response["error"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--backlog", type=int, default=128)
+    parser.add_argument(
+        "--mode", choices=("persistent", "connect"), default="persistent"
+    )
+    args = parser.parse_args()
+
+    server, loop = _start_server(_status_handler, args.backlog)
+    client = IPCClient(port=server.port, timeout=30)
+    if args.mode == "persistent":
+        worker, target = _persistent_worker, client
+    else:
+        worker, target = _connect_worker, server.port
+    total = args.clients * args.requests
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        futures = [
+            pool.submit(worker, target, args.requests) for _ in range(args.clients)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    client.close()
+    loop.call_soon_threadsafe(server.close)
+
+    print(
+        f"[{args.mode}] {total} requests from {args.clients} concurrent clients in "
+        f"{elapsed:.2f}s: {total / elapsed:,.0f} req/s, "
+        f"{elapsed / total * 1e6:,.0f} us mean per request"
+    )
+
+
+if __name__ == "__main__":
+    main()
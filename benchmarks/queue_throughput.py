@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+benchmarks/queue_throughput.py
+Measures durable-queue enqueue rates and replay time.
+
+Several producer threads each put items and wait until they are durable, the
+way concurrent submit_job requests do. Group commit lets them share fsyncs,
+so the rate grows with the number of producers. The log is then reopened to
+time the start-up replay. Run from the repository root:
+
+    python -m benchmarks.queue_throughput --producers 1 8 64 --items 2000
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from src.lite_agent.durable import DurableQueue
+
+
+def _fill(queue, producers, items):
+    def producer():
+        for i in range(items):
+            queue.put({"type": "job", "spec": {"function": "noop", "args": [i]}})
+
+    threads = [threading.Thread(target=producer) for _ in range(producers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--producers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--items", type=int, default=2000, help="per producer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for producers in args.producers:
+            path = os.path.join(tmp, f"queue-{producers}.log")
+            queue = DurableQueue()
+            queue.open(path)
+            elapsed = _fill(queue, producers, args.items // producers or 1)
+            stats = queue.stats()
+            queue.close()
+
+            started = time.perf_counter()
+            replayed = DurableQueue()
+            pending = len(replayed.open(path))
+            replay = time.perf_counter() - started
+            replayed.close()
+            print(
+                f"{producers:3} producers: {stats['records'] / elapsed:9,.0f} puts/s "
+                f"({stats['records'] / stats['commits']:5.1f} records per fsync); "
+                f"replayed {pending} items in {replay * 1000:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# src/lite_agent/admission.py
+"""
+Admission control for the Lite Agent daemon.
+The AI's triage desk: urgent directives first, and an honest "busy" when full.
+
+Every command runs in a priority lane. Each lane has a concurrency limit
+(commands running at once) and a bounded queue of commands waiting for a
+slot. When the queue is full, a new request is rejected at once with a
+"busy" reply rather than left to pile up. Lanes never share slots, so
+control commands such as `status` and `stop_daemon` stay responsive even
+while heavy work has saturated the agent.
+
+Under host pressure the resource governor (throttle.py) scales the
+concurrency of the work lanes down to a fraction of their configured limits;
+the control lane is never scaled.
+
+The controller is used from the IPC event loop only and needs no locking.
+"""
+
+import asyncio
+import collections
+
+LANES = ("control", "normal", "bulk")
+SCALED_LANES = ("normal", "bulk")  # Lanes the resource governor may shrink.
+# lane -> (concurrency, queue depth)
+DEFAULT_LIMITS = {
+    "control": (8, 64),
+    "normal": (4, 128),
+    "bulk": (2, 32),
+}
+
+
+class LaneFull(Exception):
+    """Raised when a lane's queue cannot take another request."""
+
+    def __init__(self, lane):
+        super().__init__(
+            f"Agent is busy: the {lane.name} lane queue is full "
+            f"({len(lane.waiters)} waiting)."
+        )
+        self.lane = lane
+
+    def response(self):
+        """The reply sent to a rejected client."""
+        return {"error": str(self), "busy": True, "lane": self.lane.name}
+
+
+class _Lane:
+    """A counting semaphore with a bounded FIFO wait queue."""
+
+    def __init__(self, name, concurrency, depth):
+        self.name = name
+        self.limit = concurrency  # As configured; concurrency is this scaled.
+        self.scale = 1.0
+        self.concurrency = concurrency
+        self.depth = depth
+        self.active = 0
+        self.waiters = collections.deque()
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.active < self.concurrency and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self.waiters) >= self.depth:
+            self.rejected += 1
+            raise LaneFull(self)
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled.
+                self.release()
+            else:
+                self.waiters.remove(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self):
+        if self.active > self.concurrency:
+            # The limit was lowered while we ran; retire this slot.
+            self.active -= 1
+            return
+        # Hand the slot straight to the next waiter, keeping FIFO order.
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "limit": self.limit,
+            "depth": self.depth,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionController:
+    """Runs work in named priority lanes with bounded concurrency and queues."""
+
+    def __init__(self, limits=None):
+        limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._defaults = limits
+        self._lanes = {
+            name: _Lane(name, concurrency, depth)
+            for name, (concurrency, depth) in limits.items()
+        }
+
+    def configure(self, lane, concurrency=None, depth=None):
+        """Adjusts a lane's limits; takes effect for the next admission."""
+        lane = self._lanes[lane]
+        if concurrency is not None:
+            lane.limit = max(1, int(concurrency))
+        if depth is not None:
+            lane.depth = max(0, int(depth))
+        self._resize(lane)
+
+    def set_scale(self, scale, lanes=SCALED_LANES):
+        """Runs the given lanes at a fraction of their configured concurrency."""
+        for name in lanes:
+            lane = self._lanes[name]
+            lane.scale = scale
+            self._resize(lane)
+
+    def _resize(self, lane):
+        lane.concurrency = max(1, int(lane.limit * lane.scale))
+        # Raising the limit may free slots for requests already waiting.
+        while lane.waiters and lane.active < lane.concurrency:
+            waiter = lane.waiters.popleft()
+            if not waiter.done():
+                lane.active += 1
+                waiter.set_result(None)
+
+    def apply_config(self, config_data):
+        """
+        Applies ``lane_<name>_concurrency`` and ``lane_<name>_depth`` keys
+        from the agent configuration; absent keys mean the defaults.
+        """
+        for name in self._lanes:
+            concurrency, depth = self._defaults[name]
+            self.configure(
+                name,
+                concurrency=config_data.get(f"lane_{name}_concurrency") or concurrency,
+                depth=config_data.get(f"lane_{name}_depth", depth),
+            )
+
+    async def run(self, lane, func, *args):
+        """
+        Awaits func(*args) once the lane admits it.
+        Raises LaneFull immediately if the lane's queue is full.
+        """
+        lane = self._lanes[lane]
+        await lane.acquire()
+        try:
+            return await func(*args)
+        finally:
+            lane.release()
+
+    def stats(self):
+        return {name: lane.stats() for name, lane in self._lanes.items()}
@@ -8,21 +8,48 @@ for the Lite Agent. It represents the persistent presence of our AI within
 the system, awaiting instructions and orchestrating its actions.
 """
 
+import asyncio
+import atexit
 import logging
 import os
 import signal
+import socket
 import sys
 import time
 
+from . import commands, readiness, shm
+from .admission import LANES
+from .cache import DEFAULT_MAX_ENTRIES
+from .commands import DEFAULT_POOL_WORKERS, load_command_modules, registry
+from .config import as_bool, load_config
+from .durable import QUEUE_FILE, queue_logs, work_queue
+from .events import event_bus
+from .executor import engine, submit_registered
+
 # Import IPC functions from local module
 # pylint: disable=W0611 # UDS_PATH is not directly used in this file
-from .ipc import agent_command_handler, start_ipc_server
+from .ipc import (
+    DRAIN_TIMEOUT,
+    agent_command_handler,
+    bind_listeners,
+    ipc_settings,
+    start_ipc_server,
+)
+from .logs import log_pipeline
+from .metrics import metrics
+from .profiler import profiler
+from .reload import reloader
+from .scheduler import log_heartbeat, parse_interval, restore_task, scheduler
+from .supervisor import PREFORK_SUPPORTED, Supervisor, resolve_worker_count
+from .throttle import THRESHOLDS, governor
 
 # Global flag to control agent's running state
 # This flag is the agent's pulse, responsive to human command.
 # pylint: disable=C0103 # AGENT_RUNNING is a constant.
 AGENT_RUNNING = True  # pylint: disable=W0603 # Global statement needed for signal handler
 PID_FILE = "/tmp/lite_agent.pid"  # Define PID file path. Our digital footprint.
+DEFAULT_HEARTBEAT_INTERVAL = 300  # Seconds between "alive" log lines; 0 disables.
+DEFAULT_METRICS_INTERVAL = 15  # Seconds between rewrites of the metrics file.
 
 
 def _daemonize():
@@ -87,10 +114,13 @@ def _handle_sigterm(signum, frame):  # pylint: disable=unused-argument
     Signal handler for SIGTERM.
     Upon this gentle command, the agent gracefully ceases its operations,
     ensuring no task is left incomplete and all resources are released.
+    This handler only covers start-up: once the IPC server runs, SIGTERM is
+    handled on its event loop and starts a drain instead (see _serve).
     """
     global AGENT_RUNNING  # pylint: disable=W0603 # Global statement needed for signal handler
     logging.info("SIGTERM received. Shutting down agent gracefully...")
     AGENT_RUNNING = False
+    event_bus.publish("status", state="stopping", pid=os.getpid())
     _cleanup_pid_file()
     sys.exit(0)
 
@@ -100,9 +130,85 @@ def _handle_sighup(signum, frame):  # pylint: disable=unused-argument
     Signal handler for SIGHUP.
     A subtle nudge, prompting the agent to re-evaluate its directives without
     interruption, akin to a seamless cognitive update.
+    This handler only covers start-up: once the IPC server runs, SIGHUP is
+    handled on its event loop (see _reload_on_hangup).
     """
-    logging.info("SIGHUP received. Reloading configuration (placeholder)...")
-    # Add logic to reload configuration here
+    logging.info("SIGHUP received. Reloading configuration...")
+    reloader.reload()
+
+
+def _reload_on_hangup():
+    """SIGHUP while serving: reloads the configuration on the event loop."""
+    logging.info("SIGHUP received. Reloading configuration...")
+    task = asyncio.ensure_future(reloader.reload_async())
+    # The loop keeps only a weak reference to running tasks.
+    _hangup_reloads.add(task)
+    task.add_done_callback(_hangup_reloads.discard)
+
+
+_hangup_reloads = set()
+
+
+# --- Settings applied again whenever the configuration is reloaded ---
+
+
+@reloader.on_change("log_level")
+def _apply_log_level(config_data, changed=None):  # pylint: disable=unused-argument
+    logging.getLogger().setLevel(str(config_data.get("log_level", "INFO")).upper())
+
+
+@reloader.on_change(
+    "log_file", "log_max_bytes", "log_backups", "log_buffer_size", blocking=True
+)
+def _apply_log_config(config_data, changed):  # pylint: disable=unused-argument
+    log_pipeline.configure(config_data)
+
+
+@reloader.on_change("io_workers", "cpu_workers", "job_caps", blocking=True)
+def _apply_engine_config(config_data, changed):  # pylint: disable=unused-argument
+    engine.apply_config(config_data)
+
+
+@reloader.on_change(
+    *(f"lane_{lane}_{limit}" for lane in LANES for limit in ("concurrency", "depth"))
+)
+def _apply_admission_config(config_data, changed):  # pylint: disable=unused-argument
+    registry.admission.apply_config(config_data)
+
+
+@reloader.on_change(
+    "throttle",
+    "throttle_interval",
+    "throttle_min_scale",
+    *(key for key, _ in THRESHOLDS.values()),
+)
+def _apply_throttle_config(config_data, changed):  # pylint: disable=unused-argument
+    governor.configure(config_data)
+
+
+@reloader.on_change("command_workers", blocking=True)
+def _apply_command_workers(config_data, changed):  # pylint: disable=unused-argument
+    registry.resize_pool(config_data.get("command_workers", DEFAULT_POOL_WORKERS))
+
+
+@reloader.on_change("cache_max_entries")
+def _apply_cache_size(config_data, changed=None):  # pylint: disable=unused-argument
+    registry.cache.resize(config_data.get("cache_max_entries", DEFAULT_MAX_ENTRIES))
+
+
+@reloader.on_change("command_modules", blocking=True)
+def _apply_command_modules(config_data, changed):  # pylint: disable=unused-argument
+    # New modules are imported; removing one takes a restart.
+    load_command_modules(config_data.get("command_modules"))
+
+
+def _schedule_heartbeat(config_data, changed=None):  # pylint: disable=unused-argument
+    """(Re)schedules the heartbeat task at the configured interval."""
+    interval = config_data.get("heartbeat_interval", DEFAULT_HEARTBEAT_INTERVAL)
+    if interval and parse_interval(interval) > 0:
+        scheduler.schedule("heartbeat", log_heartbeat, interval=interval, missed="skip")
+    else:
+        scheduler.cancel("heartbeat")
 
 
 def _cleanup_pid_file():
@@ -115,18 +221,104 @@ def _cleanup_pid_file():
         logging.info("PID file %s removed.", PID_FILE)
 
 
-def run_agent_tasks():
+def metrics_path(config_data, worker_index=None):
     """
-    The agent's ongoing mission, a loop of silent, dedicated processing.
-    This would run in a separate thread/process in a real implementation,
-    a testament to parallel intelligence.
+    Where this process writes its Prometheus metrics, or None if disabled.
+    Pre-fork workers each write their own file: "agent.prom" becomes
+    "agent.0.prom", "agent.1.prom", ...
     """
-    global AGENT_RUNNING  # pylint: disable=W0603 # Global statement needed for signal handler
-    while AGENT_RUNNING:
-        logging.debug("Agent is alive, performing background tasks...")
-        # Here, the agent would execute its primary directives,
-        # interacting with the world as per its design.
-        time.sleep(5)
+    path = config_data.get("metrics_file")
+    if not path:
+        return None
+    if worker_index is not None:
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{worker_index}{ext}"
+    return path
+
+
+def run_agent_tasks(config_data, configured_tasks=True, worker_index=None):
+    """
+    The agent's ongoing mission, now kept by the task scheduler.
+    The scheduler runs on its own thread and sleeps until the next task is
+    due, so background work never blocks the IPC server. Task bodies run on
+    the execution engine: threads for I/O work, processes for CPU work.
+    configured_tasks=False starts the scheduler without the tasks defined in
+    the configuration (for pre-fork workers other than the first). Every
+    process exports its own metrics, if a metrics file is configured.
+    """
+    scheduler.set_runner(engine.run_task)
+    if configured_tasks:
+        _schedule_heartbeat(config_data)
+        reloader.on_change("heartbeat_interval")(_schedule_heartbeat)
+
+    def _schedule_metrics_export(config_data, changed=None):  # pylint: disable=unused-argument
+        path = metrics_path(config_data, worker_index)
+        interval = config_data.get("metrics_interval", DEFAULT_METRICS_INTERVAL)
+        if path and parse_interval(interval) > 0:
+            scheduler.schedule(
+                "metrics-export",
+                metrics.write,
+                interval=interval,
+                missed="skip",
+                args=(path,),
+            )
+        else:
+            scheduler.cancel("metrics-export")
+
+    _schedule_metrics_export(config_data)
+    reloader.on_change("metrics_file", "metrics_interval")(_schedule_metrics_export)
+    scheduler.start()
+    return scheduler
+
+
+def recover_work(config_data, worker_index=None, workers=1):
+    """
+    Opens the durable work queue and resubmits the jobs and scheduled tasks
+    a previous run accepted but never finished. Each pre-fork worker keeps
+    its own log, suffixed with its index. Worker 0 (or the single process)
+    also takes over the logs no current process owns, so work survives a
+    change of `ipc_workers` or of mode.
+    """
+    if not as_bool(config_data.get("durable_queue", True)):
+        return 0
+    base = config_data.get("queue_path", QUEUE_FILE)
+    if worker_index is None:
+        path, owned = base, {base}
+    else:
+        path = f"{base}.{worker_index}"
+        owned = {f"{base}.{index}" for index in range(workers)}
+    adopt = []
+    if not worker_index:
+        owned = {os.path.abspath(log) for log in owned}
+        adopt = [log for log in queue_logs(base) if log not in owned]
+    recovered = 0
+    for record_id, item in work_queue.open(path, adopt=adopt):
+        try:
+            if item["type"] == "job":
+                submit_registered(item["spec"], record_id)
+            else:
+                restore_task(record_id, item)
+            recovered += 1
+        except (KeyError, ValueError, TypeError) as err:
+            # The task function may have gone with a removed plugin.
+            logging.error("Dropping unrecoverable queue entry %s: %s", record_id, err)
+            work_queue.ack(record_id)
+    if recovered:
+        logging.info("Recovered %s unfinished work items from %s.", recovered, path)
+    return recovered
+
+
+def _on_ipc_ready(server):
+    """Announces to subscribers that the agent is serving commands."""
+
+    @reloader.on_change("drain_timeout")
+    def _apply_drain_timeout(config_data, changed):  # pylint: disable=unused-argument
+        server.drain_timeout = _drain_timeout(config_data)
+
+    # Back off while the host is busy with its real workload.
+    governor.start(reloader.config)
+    event_bus.publish("status", state="running", pid=os.getpid())
+    readiness.notify_ready()
 
 
 def start_daemon():
@@ -140,20 +332,48 @@ def start_daemon():
     )
     logging.info("Lite Agent daemonization initiated. The AI awakens...")
 
-    # Only daemonize if not already in daemon mode, confirming its independent spirit.
-    if os.getpid() != os.setsid():  # Simple check if already a session leader
-        _daemonize()
+    # Always daemonize: the launcher already makes us a session leader
+    # (start_new_session), so os.setsid() cannot tell us whether we are one.
+    _daemonize()
+    # `lite-agent start` (or systemd) waits until _on_ipc_ready reports.
+    readiness.claim_from_environment()
 
-    # Once daemonized, logging would ideally be directed to a persistent file,
-    # a record of its tireless work.
-    # logging.basicConfig(level=logging.INFO, filename='/var/log/lite_agent.log', ...)
+    # Extra commands are contributed by plugin modules named in the config.
+    config_data = load_config()
+    reloader.start(config_data)
+    # Once daemonized, logging goes to a rotating file (and a ring buffer for
+    # the logs command) by way of a queue, a record of its tireless work.
+    log_pipeline.start(config_data)
+    atexit.register(log_pipeline.stop)
 
-    logging.info(
-        "Starting IPC server, the voice of the agent, listening for commands..."
+    # Reclaim shared-memory segments a crashed predecessor left behind.
+    shm.sweep_orphans()
+    try:
+        _apply_log_level(config_data)
+    except ValueError as err:
+        logging.error("Ignoring log_level: %s", err)
+    registry.pool_workers = int(
+        config_data.get("command_workers", registry.pool_workers)
     )
-    # The IPC server will diligently await instructions,
-    # bridging the human-AI communication gap.
-    start_ipc_server(agent_command_handler)
+    load_command_modules(config_data.get("command_modules"))
+    registry.admission.apply_config(config_data)
+    _apply_cache_size(config_data)
+    engine.apply_config(config_data)
+
+    workers = resolve_worker_count(config_data.get("ipc_workers"))
+    # stop_daemon signals the process that owns the PID file: the supervisor
+    # in pre-fork mode, which forwards SIGTERM to every worker.
+    commands.shutdown_hook = _make_shutdown_hook(os.getpid())
+    if workers > 1 and PREFORK_SUPPORTED:
+        # Likewise, a reload_config command reaches one worker; it has the
+        # supervisor send SIGHUP to all of them.
+        supervisor_pid = os.getpid()
+        reloader.broadcast = lambda: os.kill(supervisor_pid, signal.SIGHUP)
+        _run_prefork(workers, config_data)
+    else:
+        run_agent_tasks(config_data)
+        recover_work(config_data)
+        _serve(None, config_data)
 
     # After the IPC server concludes its watch (e.g., upon SIGTERM),
     # the agent performs its final clean-up, leaving no trace.
@@ -161,5 +381,118 @@ def start_daemon():
     logging.info("Lite Agent daemon stopped. The AI rests, awaiting its next call.")
 
 
+def _drain_timeout(config_data):
+    return float(config_data.get("drain_timeout", DRAIN_TIMEOUT))
+
+
+def _make_shutdown_hook(pid):
+    def _request_shutdown():
+        os.kill(pid, signal.SIGTERM)
+        return {"draining": True, "deadline": _drain_timeout(reloader.config)}
+
+    return _request_shutdown
+
+
+def _serve(sockets, config_data):
+    """
+    Runs the IPC server until it has drained, then winds down background work
+    within what is left of the same deadline.
+    """
+    logging.info(
+        "Starting IPC server, the voice of the agent, listening for commands..."
+    )
+    # The IPC server will diligently await instructions,
+    # bridging the human-AI communication gap.
+    server = start_ipc_server(
+        agent_command_handler,
+        on_ready=_on_ipc_ready,
+        sockets=sockets,
+        drain_timeout=_drain_timeout(config_data),
+        on_hangup=_reload_on_hangup,
+    )
+    governor.stop()
+    if profiler.running:
+        # A profile left running is written out rather than lost.
+        logging.info("Profile written to %s.", profiler.stop()["path"])
+    scheduler.stop(wait=False)
+    remaining = 0.0
+    if server.stop_deadline is not None:
+        remaining = max(0.0, server.stop_deadline - time.monotonic())
+    running = engine.wait_idle(remaining)
+    if running:
+        logging.warning(
+            "%s jobs still running at the drain deadline; they stay in the "
+            "durable queue and run again on the next start.",
+            running,
+        )
+    # Close the log first: work cancelled by the shutdown below must not be
+    # acknowledged, so that it is replayed on the next start.
+    work_queue.close()
+    engine.shutdown()
+    registry.shutdown()
+
+
+def _run_prefork(workers, config_data):
+    """
+    Pre-fork mode: binds the listening sockets once, then lets a supervisor
+    fork `workers` processes that all accept on them. Only worker 0 schedules
+    the configured tasks, so they fire once rather than once per worker.
+    """
+    settings = ipc_settings(config_data)
+    reuse_port = as_bool(config_data.get("ipc_reuse_port", False)) and hasattr(
+        socket, "SO_REUSEPORT"
+    )
+    # With SO_REUSEPORT every worker binds its own TCP socket and the kernel
+    # balances between them; otherwise all workers share one inherited socket.
+    shared = bind_listeners(
+        settings["host"],
+        settings["port"],
+        uds_path=settings["uds_path"],
+        tcp=settings["tcp_fallback"] and not reuse_port,
+    )
+
+    def _worker_main(index):
+        signal.signal(signal.SIGTERM, _handle_worker_sigterm)
+        # The supervisor's log writer thread did not survive the fork.
+        log_pipeline.start(reloader.config, worker_index=index)
+        # A worker restarted after a reload starts with the current settings.
+        reloader.reload()
+        config = reloader.config
+        sockets = list(shared)
+        if reuse_port and settings["tcp_fallback"]:
+            sockets += bind_listeners(
+                settings["host"], settings["port"], tcp=True, reuse_port=True
+            )
+        run_agent_tasks(config, configured_tasks=index == 0, worker_index=index)
+        recover_work(config, worker_index=index, workers=workers)
+        try:
+            _serve(sockets, config)
+        finally:
+            shm.release_all()
+            log_pipeline.stop()  # Workers leave with os._exit: no atexit.
+        return 0
+
+    # Every initial worker inherits the readiness pipe and the first to serve
+    # reports; the supervisor closes its own copy so that, if they all die
+    # first, the launcher sees end-of-file.
+    supervisor = Supervisor(workers, _worker_main, on_started=readiness.release)
+    try:
+        supervisor.run()
+    finally:
+        for sock in shared:
+            sock.close()
+        if settings["uds_path"] and os.path.exists(settings["uds_path"]):
+            os.remove(settings["uds_path"])
+
+
+def _handle_worker_sigterm(signum, frame):  # pylint: disable=unused-argument
+    """
+    SIGTERM in a pre-fork worker before its IPC server runs: exit at once;
+    the supervisor owns the PID file.
+    """
+    event_bus.publish("status", state="stopping", pid=os.getpid())
+    sys.exit(0)
+
+
 if __name__ == "__main__":
     start_daemon()
@@ -0,0 +1,141 @@
+# src/lite_agent/cache.py
+"""
+Result cache for idempotent Lite Agent commands.
+The AI's short-term memory: the same question, asked again, answered at once.
+
+Dashboards and scripts tend to send the same read-only queries many times a
+second. Commands that opt in with ``cache_ttl`` have their replies kept here
+for that many seconds, keyed on the normalised command dictionary (the JSON
+encoding with sorted keys), so ``{"command": "status"}`` is answered without
+running the handler or taking an admission slot.
+
+The cache holds at most ``max_entries`` replies and evicts the least
+recently used one when full. Entries are invalidated explicitly when the
+state behind them changes: a command may name event topics (see events.py)
+whose events drop its cached replies, so ``list_jobs`` is never staler than
+the last job event. Error replies and streamed replies are never cached.
+
+A query that misses while an identical one is already running waits for
+that call's reply instead of running the handler again, so a burst of
+pipelined requests costs one handler call per key, not one per request.
+
+Cached replies are shared between callers and must not be modified.
+"""
+
+import collections
+import json
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def cache_key(command_dict):
+    """The normalised form of a command, or None if it cannot be cached."""
+    try:
+        return json.dumps(command_dict, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultCache:
+    """A size-bounded LRU cache of command replies with per-entry expiry."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = collections.OrderedDict()  # key -> (name, expires, reply)
+        self._keys = collections.defaultdict(set)  # command name -> keys
+        self._watchers = collections.defaultdict(set)  # topic -> command names
+        self._lock = threading.Lock()  # Events invalidate from any thread.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0  # Misses answered by an identical call in flight.
+
+    def get(self, key):
+        """Returns (True, reply) for a fresh entry, else (False, None)."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def put(self, key, name, reply, ttl):
+        """Stores a reply for ttl seconds, evicting the least recently used."""
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (name, self._clock() + ttl, reply)
+            self._keys[name].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *names):
+        """Drops the cached replies of the named commands (all if none given)."""
+        with self._lock:
+            if not names:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self._keys.clear()
+            else:
+                dropped = 0
+                for name in names:
+                    for key in self._keys.pop(name, ()):
+                        del self._entries[key]
+                        dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def watch(self, name, topics):
+        """Invalidates name's replies whenever an event on one of topics is seen."""
+        with self._lock:
+            for topic in topics:
+                self._watchers[topic].add(name)
+
+    def on_event(self, event):
+        """Event bus listener: applies the invalidations registered by watch()."""
+        names = self._watchers.get(event["topic"])
+        if names:
+            self.invalidate(*names)
+
+    def resize(self, max_entries):
+        """Changes the capacity, evicting entries beyond it."""
+        with self._lock:
+            self.max_entries = max(0, int(max_entries))
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+            }
+
+    def _drop(self, key):
+        # Called with the lock held.
+        name = self._entries.pop(key)[0]
+        keys = self._keys.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[name]
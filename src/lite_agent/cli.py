@@ -6,22 +6,59 @@ The human interface to our AI companion.
 This module defines the CLI commands for interacting with the Lite Agent.
 It acts as a thin wrapper that communicates with the running agent core
 via IPC, translating human intent into digital directives.
+
+The CLI is started thousands of times a day by cron and scripts, so start-up
+is kept lean: only the IPC client (client.py) is imported up front, and
+heavier modules (subprocess, the readiness handshake, psutil on non-POSIX
+systems) are imported inside the commands that need them.
+tests/test_cli_startup.py holds `lite-agent status` to an import budget.
 """
 
 import json
 import os
 import signal  # Added for signal.SIGKILL
-import subprocess
 import sys
 import time
 
 import click
-import psutil
 
-from .ipc import PID_FILE, send_command_to_agent
+from .client import (
+    DEFAULT_WINDOW,
+    DRAIN_TIMEOUT,
+    PID_FILE,
+    get_client,
+    send_command_to_agent,
+)
+from .config import load_config, store
+from .procwait import wait_for_exit
+from .protocol import ProtocolError
+
+
+def _pid_exists(pid):
+    """Whether a process with this PID exists."""
+    if pid <= 0:
+        return False
+    if os.name != "posix":
+        import psutil  # pylint: disable=C0415
+
+        return psutil.pid_exists(pid)
+    # The check psutil makes on POSIX, without importing psutil.
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # It exists, but belongs to another user.
+    return True
+
 
-CONFIG_DIR = click.get_app_dir("lite-agent")
-CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+def _read_pid():
+    """The PID in the PID file, or None if there is no usable one."""
+    try:
+        with open(PID_FILE, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
 
 
 @click.group()
@@ -33,6 +70,56 @@ def main():
     pass
 
 
+def _launch(command):
+    """
+    Launches the daemon and waits until it serves. Returns the fields it
+    reported (see readiness.py), or None if it exited first.
+    """
+    # pylint: disable=C0415  # Only start needs these.
+    import subprocess
+
+    from . import readiness
+
+    if not readiness.PIPE_SUPPORTED:
+        process = subprocess.Popen(command)
+        click.echo(
+            "Lite Agent daemon initiated. Check logs for the AI's first thoughts."
+        )
+        return readiness.poll_for_ready(process, _probe_ready)
+    # The daemon reports on this pipe once its IPC server is listening.
+    read_fd, write_fd = os.pipe()
+    try:
+        try:
+            # Popen is non-blocking. The daemon will fork and detach.
+            subprocess.Popen(
+                command,
+                start_new_session=True,  # Decouple from controlling process group
+                pass_fds=(write_fd,),
+                env={**os.environ, readiness.READY_FD_ENV: str(write_fd)},
+            )
+        finally:
+            # Only the daemon may hold the write end, so that its exit is seen.
+            os.close(write_fd)
+        click.echo(
+            "Lite Agent daemon initiated. Check logs for the AI's first thoughts."
+        )
+        return readiness.wait_for_ready(read_fd, readiness.START_TIMEOUT)
+    finally:
+        os.close(read_fd)
+
+
+def _probe_ready():
+    # The daemon's PID once it has written its PID file and answers.
+    pid = _read_pid()
+    if pid is None:
+        return None
+    try:
+        reply = get_client().request({"command": "status"}, timeout=1.0)
+    except (OSError, ProtocolError, TimeoutError):
+        return None
+    return None if "error" in reply else pid
+
+
 @main.command()
 def start():
     """Starts the Lite Agent daemon.
@@ -46,7 +133,7 @@ def start():
             with open(PID_FILE, "r", encoding="utf-8") as f:
                 pid = int(f.read().strip())
             # Check if process exists in the system's process table
-            if pid > 0 and psutil.pid_exists(pid):
+            if pid > 0 and _pid_exists(pid):
                 click.echo(
                     f"Agent is already running with PID: {pid}. "
                     "A watchful AI is already at its post. Exiting."
@@ -73,32 +160,30 @@ def start():
         )
         sys.exit(1)
 
+    command = [python_executable, "-m", "src.lite_agent.agent_core"]
     try:
-        # Popen is non-blocking. The daemon will fork and detach.
-        subprocess.Popen(
-            [python_executable, "-m", "src.lite_agent.agent_core"],
-            start_new_session=True,  # Decouple from controlling process group
-        )
+        started = time.monotonic()
+        try:
+            ready = _launch(command)
+        except TimeoutError as err:
+            click.echo(
+                f"{err} Daemon might have failed to start. "
+                "Consult the logs for diagnostics.",
+                err=True,
+            )
+            sys.exit(1)
+        if ready is None:
+            click.echo(
+                "The daemon exited before it was ready. "
+                "Consult the logs for diagnostics.",
+                err=True,
+            )
+            sys.exit(1)
         click.echo(
-            "Lite Agent daemon initiated. Check logs for the AI's first thoughts."
+            f"Agent is now operational with PID: {ready.get('MAINPID')} "
+            f"(ready in {time.monotonic() - started:.2f}s). Your AI is ready."
         )
 
-        # Wait for the daemon to start and write its PID file
-        start_time = time.time()
-        while not os.path.exists(PID_FILE):
-            if time.time() - start_time > 5:
-                click.echo(
-                    "Could not find PID file after 5 seconds. Daemon might have failed to start. "
-                    "Consult the logs for diagnostics.",
-                    err=True,
-                )
-                sys.exit(1)
-            time.sleep(0.1)
-
-        with open(PID_FILE, "r", encoding="utf-8") as f:
-            pid = int(f.read().strip())
-        click.echo(f"Agent is now operational with PID: {pid}. Your AI is ready.")
-
     except (FileNotFoundError, PermissionError, OSError) as err:
         click.echo(
             f"Error starting daemon: {err}. "
@@ -108,43 +193,103 @@ def start():
         sys.exit(1)
 
 
+STOP_GRACE = 5.0  # Seconds allowed beyond the agent's drain deadline.
+KILL_WAIT = 5.0  # Seconds to wait for the process to go after SIGKILL.
+
+
+def _wait_for_exit(pid, timeout):
+    """Waits until pid exits, reporting progress. Returns True if it did."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        # Returns the moment the process exits; the slices only pace the
+        # progress reports.
+        if wait_for_exit(pid, max(0.0, min(1.0, remaining))):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        click.echo(
+            f"Waiting for agent with PID {pid} to drain... {remaining:.0f}s left."
+        )
+
+
 @main.command()
-def stop():
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Seconds to wait for the agent to drain before killing it "
+    "[default: its drain deadline + the grace period].",
+)
+@click.option(
+    "--grace",
+    type=float,
+    default=None,
+    help="Seconds allowed beyond the agent's drain deadline "
+    f"[default: the stop_grace setting, or {STOP_GRACE:g}].",
+)
+@click.option(
+    "--kill-wait",
+    type=float,
+    default=None,
+    help="Seconds to wait for the agent to go after SIGKILL "
+    f"[default: the stop_kill_wait setting, or {KILL_WAIT:g}].",
+)
+def stop(timeout, grace, kill_wait):
     """Stops the Lite Agent daemon.
     Command the AI to stand down, ensuring a graceful conclusion to its tasks.
     """
     click.echo("Attempting to stop Lite Agent daemon... Initiating shutdown sequence.")
+    # Read before asking: a quickly stopped agent removes its PID file before
+    # the reply arrives, and stop must still wait for the process to go.
+    pid = _read_pid()
     response = send_command_to_agent({"command": "stop_daemon"})
     click.echo(f"Lite Agent daemon stop response: {response}")
 
-    # After sending the stop command, verify termination and clean up.
-    if os.path.exists(PID_FILE):
+    # The agent drains in-flight work and exits on its own; wait for exactly
+    # that long, and escalate only if it overstays its deadline.
+    if pid is not None:
         try:
-            # pylint: disable=W1514,R1732
-            with open(PID_FILE, "r", encoding="utf-8") as f:
-                pid = int(f.read().strip())
-
-            # Give agent some time to shut down gracefully
-            time.sleep(2)
-            if psutil.pid_exists(pid):
-                click.echo(f"Agent with PID {pid} is still running. Sending SIGTERM.")
+            if "error" in response and _pid_exists(pid):
+                click.echo(
+                    f"Agent with PID {pid} did not take the command. Sending SIGTERM."
+                )
                 os.kill(pid, signal.SIGTERM)
-                time.sleep(3)
-                if psutil.pid_exists(pid):
-                    click.echo(
-                        f"Agent with PID {pid} did not respond to SIGTERM. Sending SIGKILL."
-                    )
-                    os.kill(pid, signal.SIGKILL)
-                    click.echo(f"SIGKILL sent to PID {pid}.")
-
-            if not psutil.pid_exists(pid):
+            config_data = load_config()
+            if grace is None:
+                grace = float(config_data.get("stop_grace", STOP_GRACE))
+            if kill_wait is None:
+                kill_wait = float(config_data.get("stop_kill_wait", KILL_WAIT))
+            if timeout is None:
+                timeout = float(response.get("deadline", DRAIN_TIMEOUT)) + grace
+            # Judged by the wait, not _pid_exists: an exited daemon may stay a
+            # zombie until init reaps it.
+            exited = _wait_for_exit(pid, timeout)
+            if not exited:
                 click.echo(
-                    f"Agent with PID {pid} is no longer running. The AI has gracefully retired."
+                    f"Agent with PID {pid} did not exit within {timeout:g}s. Sending SIGKILL."
                 )
+                os.kill(pid, signal.SIGKILL)
+                click.echo(f"SIGKILL sent to PID {pid}.")
+                exited = _wait_for_exit(pid, kill_wait)
 
-            os.remove(PID_FILE)
-            click.echo("PID file removed. A clean slate for the next activation.")
-        except (ValueError, FileNotFoundError, OSError) as err:
+            if not exited:
+                click.echo(
+                    f"Agent with PID {pid} is still running {kill_wait:g}s after "
+                    "SIGKILL. It may be stuck in the kernel; check it with ps.",
+                    err=True,
+                )
+                sys.exit(1)
+            click.echo(
+                f"Agent with PID {pid} is no longer running. The AI has gracefully retired."
+            )
+
+            # A cleanly stopped agent removes its own PID file.
+            if os.path.exists(PID_FILE):
+                os.remove(PID_FILE)
+                click.echo("PID file removed. A clean slate for the next activation.")
+        except OSError as err:
             click.echo(
                 f"Error during post-stop cleanup: {err}. "
                 "Manual PID file removal may be required.",
@@ -175,7 +320,7 @@ def status():
         # pylint: disable=W1514,R1732
         with open(PID_FILE, "r", encoding="utf-8") as f:
             pid = int(f.read().strip())
-        if pid > 0 and psutil.pid_exists(pid):
+        if pid > 0 and _pid_exists(pid):
             click.echo(
                 f"Agent is running with PID: {pid}. The AI is actively processing."
             )
@@ -203,22 +348,211 @@ def status():
             os.remove(PID_FILE)
 
 
-def load_config():
-    """Loads the configuration from the JSON file."""
-    if not os.path.exists(CONFIG_FILE):
-        return {}
+@main.command()
+@click.option(
+    "--topic",
+    "topics",
+    multiple=True,
+    help="Only show events on this topic (repeatable), e.g. status or tasks.",
+)
+@click.option(
+    "--heartbeat",
+    type=click.FloatRange(min=0, min_open=True),
+    default=15.0,
+    show_default=True,
+    help="Seconds between heartbeats while the agent is quiet.",
+)
+def watch(topics, heartbeat):
+    """Streams live events from the Lite Agent daemon.
+    Listen as the AI narrates its own state, without polling.
+    """
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+        for event in get_client().subscribe(list(topics) or None, heartbeat=heartbeat):
+            click.echo(json.dumps(event))
+    except KeyboardInterrupt:
+        pass
+    except ConnectionRefusedError:
+        click.echo("Agent is not running. There is nothing to watch.", err=True)
+        sys.exit(1)
+    except TimeoutError:
+        click.echo(
+            f"No event or heartbeat within {heartbeat * 3:g}s. The agent is unresponsive.",
+            err=True,
+        )
+        sys.exit(1)
+    except (OSError, ProtocolError) as err:
+        click.echo(f"Event stream interrupted: {err}", err=True)
+        sys.exit(1)
+
+
+@main.command(name="metrics")
+@click.option(
+    "--prometheus",
+    is_flag=True,
+    help="Print the Prometheus text format instead of JSON.",
+)
+def show_metrics(prometheus):
+    """Prints the daemon's counters, gauges and latency histograms.
+    Take the AI's pulse: how much it does, and how fast.
+    """
+    request = {"command": "metrics"}
+    if prometheus:
+        request["format"] = "prometheus"
+    response = send_command_to_agent(request)
+    if "error" in response:
+        click.echo(f"Could not read metrics: {response['error']}", err=True)
+        sys.exit(1)
+    if prometheus:
+        click.echo(response["text"], nl=False)
+    else:
+        click.echo(json.dumps(response["metrics"], indent=4))
+
+
+def _parse_lines(stream):
+    # Invalid lines become exceptions, which IPCClient.imap reports in place.
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as err:
+            yield ValueError(f"Line {number} is not valid JSON: {err}")
+
+
+@main.command()
+@click.option(
+    "--window",
+    type=click.IntRange(min=1),
+    default=DEFAULT_WINDOW,
+    show_default=True,
+    help="How many commands to keep in flight at once.",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Seconds to wait for each reply [default: 60].",
+)
+def batch(window, timeout):
+    """Runs newline-delimited JSON commands from stdin over one connection.
+    Hand the AI a whole to-do list and read its answers back in order.
+
+    Each non-blank input line is one command, e.g. {"command": "status"}.
+    Commands are pipelined; their replies are written to stdout as JSON
+    lines, in input order, as soon as each is available. Exits with status
+    1 if any reply is an error.
+    """
+    client = get_client()
+    try:
+        client.connect()
+    except OSError as err:
+        click.echo(f"Agent is not running or unreachable: {err}", err=True)
+        sys.exit(1)
+    failed = 0
+    replies = client.imap(_parse_lines(sys.stdin), window=window, timeout=timeout)
+    for reply in replies:
+        if isinstance(reply, dict) and "error" in reply:
+            failed += 1
+        click.echo(json.dumps(reply))
+    if failed:
+        click.echo(f"{failed} command(s) failed.", err=True)
+        sys.exit(1)
+
+
+@main.command(name="throttle")
+def show_throttle():
+    """Shows the host readings and the work limits the daemon runs under.
+    See how far the AI has stepped back to leave room for others.
+    """
+    response = send_command_to_agent({"command": "throttle_status"})
+    if "error" in response:
+        click.echo(f"Could not read the throttle state: {response['error']}", err=True)
+        sys.exit(1)
+    click.echo(json.dumps(response, indent=4))
+
+
+@main.command(name="logs")
+@click.option(
+    "-n",
+    "--lines",
+    type=int,
+    default=100,
+    show_default=True,
+    help="How many of the most recent records to show.",
+)
+@click.option("--level", help="Only records at or above this level, e.g. WARNING.")
+@click.option("--grep", "contains", help="Only records whose message contains this.")
+@click.option("--logger", help="Only records from this logger or its children.")
+def show_logs(lines, level, contains, logger):
+    """Prints recent log records from the daemon's memory.
+    Read the AI's latest diary entries without opening the file.
+    """
+    request = {"command": "logs", "lines": lines}
+    for key, value in (("level", level), ("contains", contains), ("logger", logger)):
+        if value:
+            request[key] = value
+    response = send_command_to_agent(request)
+    if "error" in response:
+        click.echo(f"Could not read logs: {response['error']}", err=True)
+        sys.exit(1)
+    for record in response["records"]:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["time"]))
+        click.echo(f"{stamp} - {record['level']} - {record['message']}")
+
 
+@main.group()
+def profile():
+    """Profile the running daemon without restarting it.
+    Let the AI look inward at where its time goes.
+    """
 
-def save_config(config_data):
-    """Saves the configuration to the JSON file."""
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config_data, f, indent=4)
+
+def _print_profiler_reply(response):
+    if "error" in response:
+        click.echo(f"Profiler: {response['error']}", err=True)
+        sys.exit(1)
+    click.echo(json.dumps(response, indent=4))
+
+
+@profile.command(name="start")
+@click.option(
+    "--mode",
+    type=click.Choice(["cprofile", "sample"]),
+    default="sample",
+    show_default=True,
+    help="cProfile (exact, slower) or a SIGPROF stack sampler (cheap).",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=0.005,
+    show_default=True,
+    help="Seconds of CPU time between samples (sample mode).",
+)
+@click.option(
+    "--duration",
+    type=float,
+    default=None,
+    help="Stop and write the profile after this many seconds.",
+)
+def profile_start(mode, interval, duration):
+    """Starts profiling the daemon."""
+    request = {"command": "start_profiler", "mode": mode, "interval": interval}
+    if duration:
+        request["duration"] = duration
+    _print_profiler_reply(send_command_to_agent(request))
+
+
+@profile.command(name="stop")
+def profile_stop():
+    """Stops profiling and prints where the profile was written."""
+    _print_profiler_reply(send_command_to_agent({"command": "stop_profiler"}))
+
+
+@profile.command(name="status")
+def profile_status():
+    """Shows whether a profile is running."""
+    _print_profiler_reply(send_command_to_agent({"command": "profiler_status"}))
 
 
 # Example of a subcommand group for configuration
@@ -244,17 +578,81 @@ def get_config(key):
         click.echo(f"Configuration key '{key}' not found.", err=True)
 
 
+def _push_config(client, settings=None, unset=()):
+    # A running agent applies the change at once, without a restart.
+    if client is None:
+        return
+    try:
+        response = client.request(
+            {
+                "command": "update_config",
+                "settings": settings or {},
+                "unset": list(unset),
+            }
+        )
+    except (OSError, ProtocolError) as err:
+        response = {"error": str(err)}
+    if "error" in response:
+        click.echo(f"Could not update the running agent: {response['error']}", err=True)
+    elif response.get("restart_required"):
+        click.echo(
+            "Restart the agent to apply: " + ", ".join(response["restart_required"])
+        )
+    else:
+        click.echo("The running agent has applied the change.")
+
+
+def _agent_client():
+    # Resolved before the file changes, so that a change to the IPC settings
+    # still reaches the agent where it listens now.
+    return get_client() if os.path.exists(PID_FILE) else None
+
+
+def _update_config(settings=None, unset=()):
+    try:
+        store.update(settings, unset)
+    except (OSError, json.JSONDecodeError) as err:
+        click.echo(f"Could not update the configuration: {err}", err=True)
+        sys.exit(1)
+
+
 @config.command(name="set")
-@click.argument("key")
-@click.argument("value")
-def set_config(key, value):
-    """Sets a configuration value.
+@click.argument("pairs", nargs=-1, required=True, metavar="KEY VALUE [KEY VALUE]...")
+def set_config(pairs):
+    """Sets one or more configuration values in a single write.
     Impart new directives to shape the AI's operational parameters.
     """
-    config_data = load_config()
-    config_data[key] = value
-    save_config(config_data)
-    click.echo(f"Set '{key}' to '{value}'. The AI absorbs new instructions.")
+    if len(pairs) % 2:
+        raise click.UsageError("Expected KEY VALUE pairs.")
+    settings = dict(zip(pairs[::2], pairs[1::2]))
+    client = _agent_client()
+    _update_config(settings)
+    for key, value in settings.items():
+        click.echo(f"Set '{key}' to '{value}'. The AI absorbs new instructions.")
+    _push_config(client, settings=settings)
+
+
+@config.command(name="unset")
+@click.argument("keys", nargs=-1, required=True)
+def unset_config(keys):
+    """Removes configuration values, restoring their defaults.
+    Let the AI forget a directive and fall back on its instincts.
+    """
+    client = _agent_client()
+    _update_config(unset=keys)
+    click.echo(f"Removed {', '.join(keys)}. The AI returns to its defaults.")
+    _push_config(client, unset=keys)
+
+
+@config.command(name="reload")
+def reload_config():
+    """Makes the running agent re-read its configuration.
+    Let the AI take in edits made to the configuration file by hand.
+    """
+    response = send_command_to_agent({"command": "reload_config"})
+    click.echo(json.dumps(response, indent=4))
+    if "error" in response:
+        sys.exit(1)
 
 
 @config.command(name="show")
@@ -0,0 +1,621 @@
+# src/lite_agent/client.py
+"""
+Client side of the Lite Agent IPC channel.
+The human's half of the conversation, packed light for a quick start.
+
+The CLI runs thousands of times a day from cron and scripts, so most of its
+wall-clock cost is interpreter start-up and imports. This module holds what a
+client needs to reach the daemon (transport settings, the multiplexed
+IPCClient and the send_* helpers) and nothing of the server: no asyncio, no
+command registry, no metrics. Rarely used pieces (shared-memory replies, the
+event heartbeat setting) are imported on first use.
+
+ipc.py re-exports everything here, so daemon-side code keeps one import path.
+"""
+
+import concurrent.futures
+import contextlib
+import itertools
+import logging
+import os
+import queue
+import signal  # Added for sending SIGTERM from CLI
+import socket
+import tempfile
+import threading
+
+from .config import as_bool, load_config
+from .protocol import (
+    ProtocolError,
+    decode_payload,
+    encode_message,
+    encode_payload,
+    recv_message,
+    send_message,
+)
+
+# Define the socket parameters.
+# This channel ensures reliable communication between human and AI.
+IPC_HOST = "127.0.0.1"  # Localhost for security
+IPC_PORT = 50000  # High-numbered port to avoid conflicts
+DRAIN_TIMEOUT = 10.0  # Seconds in-flight requests get to finish on shutdown
+DEFAULT_WINDOW = 64  # Commands IPCClient.imap keeps in flight at once.
+# Seconds to wait for a reply by default: past the daemon's own 30 s command
+# timeout, so a lost connection or a wedged daemon cannot hang the caller.
+REQUEST_TIMEOUT = 60.0
+STREAM_WINDOW = 64  # Streamed items the daemon may send ahead of the reader.
+PID_FILE = os.path.join(
+    tempfile.gettempdir(), "lite_agent.pid"
+)  # The AI's digital fingerprint.
+# Unix domain socket path, used when the "unix" transport is configured.
+# Same-host traffic skips the TCP stack and is guarded by file permissions.
+UDS_PATH = os.path.join(tempfile.gettempdir(), "lite_agent.sock")
+# asyncio only offers Unix socket servers on POSIX event loops.
+UDS_SUPPORTED = hasattr(socket, "AF_UNIX") and os.name != "nt"
+
+
+def ipc_settings(config_data=None):
+    """
+    Resolves the IPC transport from the user's configuration.
+
+    Recognised keys: ``ipc_transport`` ("tcp" or "unix"), ``ipc_host``,
+    ``ipc_port``, ``ipc_socket_path`` and ``ipc_tcp_fallback``. With the unix
+    transport the daemon also listens on TCP loopback unless the fallback is
+    disabled, and clients try the socket file first.
+    """
+    if config_data is None:
+        config_data = load_config()
+    transport = str(config_data.get("ipc_transport", "tcp")).strip().lower()
+    if transport not in ("tcp", "unix"):
+        logging.warning("Unknown ipc_transport %r; using tcp.", transport)
+        transport = "tcp"
+    if transport == "unix" and not UDS_SUPPORTED:
+        logging.warning("Unix domain sockets are unavailable here; using tcp.")
+        transport = "tcp"
+    return {
+        "transport": transport,
+        "host": config_data.get("ipc_host", IPC_HOST),
+        "port": int(config_data.get("ipc_port", IPC_PORT)),
+        "uds_path": (
+            config_data.get("ipc_socket_path", UDS_PATH)
+            if transport == "unix"
+            else None
+        ),
+        "tcp_fallback": transport == "tcp"
+        or as_bool(config_data.get("ipc_tcp_fallback", True)),
+    }
+
+
+def _connect(host=None, port=None, uds_path=None, tcp_fallback=True):
+    """
+    Opens a blocking client connection to the daemon.
+    The Unix socket at uds_path is preferred when given; TCP loopback is the
+    fallback when the socket file is missing or nobody is listening on it.
+    """
+    if uds_path:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(uds_path)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError) as err:
+            sock.close()
+            if not tcp_fallback:
+                raise ConnectionRefusedError(
+                    f"No agent listening on {uds_path}: {err}"
+                ) from err
+    return socket.create_connection(
+        (IPC_HOST if host is None else host, IPC_PORT if port is None else port)
+    )
+
+
+def _resolved(reply):
+    future = concurrent.futures.Future()
+    future.set_result(reply)
+    return future
+
+
+def _wait(future, timeout):
+    # Before Python 3.11 concurrent.futures.TimeoutError is not an OSError,
+    # so callers catching socket errors would miss it.
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError as err:
+        raise TimeoutError(f"No reply from the agent within {timeout:g}s.") from err
+
+
+class _PendingCall:
+    """Book-keeping for one in-flight request on a multiplexed connection."""
+
+    def __init__(self, streaming, window=None):
+        self.streaming = streaming
+        self.request_id = None
+        self.future = concurrent.futures.Future()
+        self.items = []
+        # Streaming calls hand frames to the consumer as they arrive instead
+        # of accumulating them. The daemon sends at most `window` items
+        # beyond the credit granted (see IPCClient.stream), which leaves room
+        # for the final frame.
+        self.queue = (
+            queue.Queue(maxsize=window + 1 if window else 0) if streaming else None
+        )
+
+    def deliver(self, kind, payload):
+        """Routes one reply frame; returns True once the call is complete."""
+        if self.streaming:
+            try:
+                self.queue.put_nowait((kind, payload))
+            except queue.Full as err:
+                # Never block the reader thread: the other calls share it.
+                raise ProtocolError(
+                    f"Request {self.request_id} streamed past its window."
+                ) from err
+            return kind != "item"
+        if kind == "item":
+            self.items.append(payload)
+            return False
+        if kind == "response":
+            self.future.set_result(payload)
+        elif "error" in payload:
+            self.future.set_result({"error": payload["error"], "items": self.items})
+        else:
+            self.future.set_result({"items": self.items, "count": len(self.items)})
+        return True
+
+    def fail(self, err):
+        if self.streaming:
+            while True:
+                try:
+                    self.queue.put_nowait(("error", err))
+                    return
+                except queue.Full:
+                    # The stream is over; an unread item makes way for the error.
+                    with contextlib.suppress(queue.Empty):
+                        self.queue.get_nowait()
+        elif not self.future.done():
+            self.future.set_exception(err)
+
+
+class IPCClient:
+    """
+    A long-lived, multiplexed connection to the agent daemon.
+    One socket carries many concurrent requests: each is tagged with an ID,
+    and a background reader thread matches replies (which may arrive out of
+    order) back to their callers. The connection is opened lazily and
+    re-established transparently after a failure.
+
+    The client is thread-safe; share one instance rather than reconnecting
+    for every command.
+    """
+
+    def __init__(
+        self,
+        host=None,
+        port=None,
+        timeout=REQUEST_TIMEOUT,
+        uds_path=None,
+        tcp_fallback=True,
+        shm=False,
+    ):
+        self.host = IPC_HOST if host is None else host
+        self.port = IPC_PORT if port is None else port
+        self.uds_path = uds_path
+        self.tcp_fallback = tcp_fallback
+        self.timeout = timeout
+        # Same-host clients may opt in to receiving large replies through
+        # shared memory instead of the socket.
+        self.shm = shm
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()  # Guards connection state and sends.
+        self._ids = itertools.count(1)
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        """Opens the connection if it is not already open."""
+        with self._lock:
+            self._ensure_connected()
+
+    def close(self):
+        """Closes the connection, failing any requests still in flight."""
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join()
+
+    def submit(self, command_dict):
+        """
+        Sends a command without waiting for its reply.
+        Returns a concurrent.futures.Future resolving to the response; any
+        number of submissions may be in flight on the one connection.
+        """
+        return self._send(command_dict, streaming=False).future
+
+    def request(self, command_dict, timeout=None):
+        """Sends a command and blocks until its reply arrives."""
+        return _wait(
+            self.submit(command_dict), self.timeout if timeout is None else timeout
+        )
+
+    def pipeline(self, commands, timeout=None):
+        """
+        Sends many commands back to back before reading any reply.
+        All request frames go out in a single write, so n commands cost one
+        round trip instead of n. The daemon runs them concurrently; use batch()
+        when they must execute in order. Returns the replies in input order.
+        """
+        calls = self._send_all([{"request": command} for command in commands])
+        timeout = self.timeout if timeout is None else timeout
+        return [_wait(call.future, timeout) for call in calls]
+
+    def imap(self, commands, window=DEFAULT_WINDOW, timeout=None):
+        """
+        Streams commands from an iterable, which may be unbounded, and yields
+        their replies in input order.
+        A feeder thread keeps up to `window` commands in flight, so each
+        reply is yielded as soon as it arrives, even while the next command
+        is still being read. An item that is not a dict yields an
+        {"error": ...} reply in its place; an exception item (such as a
+        parse error) reports its message. So do commands that fail in
+        transit.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        slots = threading.Semaphore(max(1, window))
+        calls = queue.Queue()
+        stopped = threading.Event()
+
+        def feed():
+            try:
+                for command in commands:
+                    while not slots.acquire(timeout=0.1):
+                        if stopped.is_set():
+                            return
+                    calls.put(self._submit_item(command))
+            except Exception as err:  # pylint: disable=broad-except
+                calls.put(_resolved({"error": f"Could not read commands: {err}"}))
+            finally:
+                calls.put(None)
+
+        threading.Thread(target=feed, name="ipc-imap-feeder", daemon=True).start()
+        try:
+            while True:
+                future = calls.get()
+                if future is None:
+                    return
+                try:
+                    reply = _wait(future, timeout)
+                except TimeoutError:
+                    reply = {"error": "Timed out waiting for the reply."}
+                except (OSError, ProtocolError) as err:
+                    reply = {"error": f"IPC communication error: {err}"}
+                slots.release()
+                yield reply
+        finally:
+            stopped.set()
+
+    def _submit_item(self, command):
+        if isinstance(command, Exception):
+            return _resolved({"error": str(command)})
+        if not isinstance(command, dict):
+            return _resolved({"error": "A command must be a JSON object."})
+        try:
+            return self.submit(command)
+        except (OSError, ProtocolError) as err:
+            return _resolved({"error": f"IPC communication error: {err}"})
+
+    def batch(self, commands, timeout=None):
+        """
+        Executes a list of commands in order on the daemon in one round trip.
+        Returns one result per command; a failing command yields an
+        {"error": ...} entry without affecting the others.
+        """
+        (call,) = self._send_all([{"batch": list(commands)}])
+        reply = _wait(call.future, self.timeout if timeout is None else timeout)
+        if not isinstance(reply, dict) or "results" not in reply:
+            error = reply.get("error") if isinstance(reply, dict) else reply
+            raise ProtocolError(f"Batch request failed: {error}")
+        return reply["results"]
+
+    def stream(self, command_dict, timeout=None, window=STREAM_WINDOW):
+        """
+        Sends a command and yields its reply incrementally.
+        Streamed replies are yielded item by item as frames arrive, so the
+        caller never buffers the whole result; a plain reply is yielded once.
+        The daemon runs at most `window` items ahead of the consumer: credit
+        for more is granted as items are taken, in steps of half a window.
+        A slow consumer thus slows the producer, and never stalls the other
+        calls sharing the connection.
+        """
+        call = self._send(command_dict, streaming=True, window=window)
+        finished = False
+        taken = 0
+        try:
+            while True:
+                try:
+                    kind, payload = call.queue.get(
+                        timeout=self.timeout if timeout is None else timeout
+                    )
+                except queue.Empty as err:
+                    raise TimeoutError("Timed out waiting for streamed reply.") from err
+                if kind == "error":
+                    finished = True
+                    raise payload
+                if kind == "end":
+                    finished = True
+                    if "error" in payload:
+                        raise ProtocolError(payload["error"])
+                    return
+                if kind == "response":
+                    finished = True
+                else:
+                    taken += 1
+                    if taken >= max(1, window // 2):
+                        self._grant(call, taken)
+                        taken = 0
+                yield payload
+                if finished:
+                    return
+        finally:
+            if not finished:
+                # The consumer stopped early (or timed out): tell the daemon
+                # to stop producing, e.g. to end a subscription.
+                self._cancel(call)
+
+    def subscribe(self, topics=None, heartbeat=None):
+        """
+        Subscribes to daemon events and yields them as they are pushed.
+        topics filters by event topic ("status", "tasks", ...); None means all.
+        Idle subscriptions receive a heartbeat event every `heartbeat`
+        seconds, so a stalled daemon is noticed within three intervals.
+        """
+        command = {"command": "subscribe", "topics": topics}
+        if heartbeat is not None:
+            command["heartbeat"] = heartbeat
+        else:
+            from .events import HEARTBEAT_INTERVAL  # pylint: disable=C0415
+
+            heartbeat = HEARTBEAT_INTERVAL
+        return self.stream(command, timeout=heartbeat * 3)
+
+    def _cancel(self, call):
+        with self._lock:
+            if self._pending.pop(call.request_id, None) is None:
+                return
+            self._send_control({"cancel": call.request_id})
+
+    def _grant(self, call, count):
+        with self._lock:
+            if call.request_id in self._pending:
+                self._send_control({"credit": call.request_id, "n": count})
+
+    def _send_control(self, message):
+        # Caller holds self._lock. A failed send surfaces through the reader.
+        if self._sock is None:
+            return
+        try:
+            send_message(self._sock, message)
+        except OSError as err:
+            logging.debug("Could not send IPC control message %s: %s", message, err)
+
+    def _send(self, command_dict, streaming, window=None):
+        body = {"request": command_dict}
+        if streaming and window:
+            body["window"] = window
+        return self._send_all([body], streaming, window)[0]
+
+    def _send_all(self, bodies, streaming=False, window=None):
+        """Tags each envelope body with an ID and writes them in one sendall."""
+        with self._lock:
+            self._ensure_connected()
+            frames = []
+            calls = {}
+            for body in bodies:
+                request_id = next(self._ids)
+                if self.shm:
+                    body = _spill_request(dict(body, shm=True))
+                frames.append(encode_message(dict(body, id=request_id)))
+                call = calls[request_id] = _PendingCall(streaming, window)
+                call.request_id = request_id
+            self._pending.update(calls)
+            try:
+                self._sock.sendall(b"".join(frames))
+            except OSError:
+                for request_id in calls:
+                    self._pending.pop(request_id, None)
+                raise
+        return list(calls.values())
+
+    def _ensure_connected(self):
+        # Caller holds self._lock.
+        if self._sock is not None:
+            return
+        self._sock = _connect(self.host, self.port, self.uds_path, self.tcp_fallback)
+        self._reader = threading.Thread(
+            target=self._read_loop,
+            args=(self._sock,),
+            name="lite-agent-ipc-reader",
+            daemon=True,
+        )
+        self._reader.start()
+
+    def _read_loop(self, sock):
+        err = ConnectionError("Connection to the agent was closed.")
+        try:
+            while True:
+                envelope = recv_message(sock)
+                if envelope is None:
+                    break
+                if not isinstance(envelope, dict):
+                    # Nothing to route it by; the connection cannot be trusted.
+                    raise ProtocolError(
+                        f"Unexpected reply frame: {type(envelope).__name__}"
+                    )
+                self._dispatch(envelope)
+        except (OSError, ProtocolError) as exc:
+            err = exc
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+            pending, self._pending = self._pending, {}
+        sock.close()
+        for call in pending.values():
+            call.fail(err)
+
+    def _dispatch(self, envelope):
+        request_id = envelope.get("id")
+        with self._lock:
+            call = self._pending.get(request_id)
+        if call is None:
+            # Usually the tail of a stream the caller has already cancelled.
+            logging.debug("Discarding IPC reply for unknown request %s", request_id)
+            return
+        if "item" in envelope:
+            done = call.deliver("item", envelope["item"])
+        elif "end" in envelope:
+            done = call.deliver("end", envelope)
+        elif "shm" in envelope:
+            reply = _read_spilled(envelope["shm"], envelope.get("raw", False))
+            done = call.deliver("response", reply)
+        else:
+            done = call.deliver("response", envelope.get("response"))
+        if done:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+
+def _spill_request(body):
+    """Moves a request too large for the socket into shared memory."""
+    from . import shm  # pylint: disable=C0415  # Pulls in multiprocessing.
+
+    if "request" not in body:
+        return body
+    payload = encode_payload(body["request"])
+    if len(payload) <= shm.SHM_THRESHOLD:
+        return body
+    body = {key: value for key, value in body.items() if key != "request"}
+    body["request_shm"] = shm.share(payload)
+    return body
+
+
+def _read_spilled(handle, raw=False):
+    """
+    Claims a reply the daemon placed in shared memory. Binary replies are
+    returned as bytes; the others are decoded from JSON.
+    """
+    from . import shm  # pylint: disable=C0415  # Pulls in multiprocessing.
+
+    try:
+        with shm.attach(handle) as view:
+            return bytes(view) if raw else decode_payload(view)
+    except (OSError, KeyError, TypeError, ProtocolError) as err:
+        logging.error("Could not read shared-memory reply %s: %s", handle, err)
+        return {"error": f"Shared-memory reply unavailable: {err}"}
+
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_client(host=None, port=None):
+    """
+    Returns the process-wide IPCClient for an address, creating it on first
+    use, so repeated calls reuse one persistent connection.
+    Without an explicit address the configured transport is used.
+    """
+    if host is None and port is None:
+        settings = ipc_settings()
+        key = (
+            settings["host"],
+            settings["port"],
+            settings["uds_path"],
+            settings["tcp_fallback"],
+        )
+    else:
+        key = (
+            IPC_HOST if host is None else host,
+            IPC_PORT if port is None else port,
+            None,
+            True,
+        )
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = _shared_clients[key] = IPCClient(
+                key[0], key[1], uds_path=key[2], tcp_fallback=key[3]
+            )
+        return client
+
+
+def send_batch_to_agent(commands, host=None, port=None):
+    """
+    Runs a list of commands on the daemon, in order, in one round trip.
+    Returns {"results": [...]} with one entry per command, or {"error": ...}.
+    """
+    try:
+        return {"results": get_client(host, port).batch(commands)}
+    except ConnectionRefusedError:
+        return {"error": "Agent not running or connection refused."}
+    except (socket.error, ProtocolError) as err:
+        logging.error("Error sending batch to agent: %s", err)
+        return {"error": f"IPC communication error: {err}"}
+
+
+def stream_command_to_agent(command_dict, host=None, port=None):
+    """
+    Sends a command and yields its reply incrementally over the shared
+    connection. See IPCClient.stream.
+    """
+    return get_client(host, port).stream(command_dict)
+
+
+# pylint: disable=R0911 # Too many return statements for now, acceptable for IPC
+def send_command_to_agent(command_dict, host=None, port=None):
+    """
+    Sends a command to the running Lite Agent daemon via TCP socket.
+    This is the human's voice, delivering commands to the AI's core.
+    Streamed replies are collected into {"items": [...], "count": n}.
+    The call reuses the process-wide persistent connection from get_client.
+    """
+    try:
+        return get_client(host, port).request(command_dict)
+    except ConnectionRefusedError:
+        logging.error(
+            "Connection refused. Agent might not be running or is unresponsive. "
+            "The AI is momentarily unresponsive to queries."
+        )
+        if command_dict.get("command") == "stop_daemon" and os.path.exists(PID_FILE):
+            try:
+                with open(PID_FILE, "r", encoding="utf-8") as f:
+                    pid = int(f.read().strip())
+                logging.info(
+                    "Sending SIGTERM to agent with PID %s... "
+                    "A gentle request for the AI to cease operations.",
+                    pid,
+                )
+                os.kill(pid, signal.SIGTERM)
+                return {"status": "SIGTERM sent to agent."}
+            except (ValueError, FileNotFoundError, OSError) as e:
+                logging.error(
+                    "Failed to send SIGTERM to PID %s: %s. "
+                    "The AI resists, or is already beyond reach.",
+                    pid,
+                    e,
+                )
+                return {"error": f"Failed to stop agent: {e}"}
+        return {"error": "Agent not running or connection refused."}
+    except (socket.error, ProtocolError) as err:
+        logging.error(
+            "Error sending command to agent: %s. A glitch in the human-AI matrix.", err
+        )
+        return {"error": f"IPC communication error: {err}"}
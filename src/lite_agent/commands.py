@@ -0,0 +1,421 @@
+# src/lite_agent/commands.py
+"""
+Command registry for the Lite Agent daemon.
+The AI's repertoire: every directive it understands, and how to carry it out.
+
+Commands register by name together with their execution metadata:
+
+* ``timeout`` - seconds the handler may run before the caller gets an error.
+* ``idempotent`` - whether repeating the command is harmless (safe to retry
+  or cache).
+* ``mode`` - ``"inline"`` handlers run directly on the IPC event loop and must
+  be quick; ``"pool"`` handlers run on a worker thread pool, so slow work
+  never stalls the accept path.
+* ``lane`` - the admission priority lane (see admission.py): ``"control"``
+  for commands that must stay responsive under load, ``"normal"`` or
+  ``"bulk"`` for everything else.
+* ``cache_ttl`` - for idempotent commands, seconds a reply may be served
+  from the result cache (see cache.py); ``invalidated_by`` lists the event
+  topics that drop the cached replies early.
+
+Dispatch is a single dictionary lookup. Any module can add commands with the
+`command` decorator; modules listed in the ``command_modules`` configuration
+key are imported at daemon start-up, so new commands never require editing
+ipc.py.
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .admission import LANES, AdmissionController, LaneFull
+from .cache import ResultCache, cache_key
+from .events import HEARTBEAT_INTERVAL, event_bus
+from .metrics import metrics
+
+DEFAULT_TIMEOUT = 30.0  # Seconds, for commands that do not set their own.
+DEFAULT_POOL_WORKERS = 4
+MODES = ("inline", "pool")
+
+COMMANDS = metrics.counter(
+    "commands_total", "Commands dispatched, by outcome.", ("command", "outcome")
+)
+COMMAND_SECONDS = metrics.histogram(
+    "command_seconds",
+    "Command latency from dispatch to reply, including admission queueing.",
+    ("command",),
+)
+HANDLER_SECONDS = metrics.histogram(
+    "handler_seconds", "Time spent running command handlers.", ("command",)
+)
+
+
+class CommandSpec:
+    """A registered command: its handler plus execution metadata."""
+
+    __slots__ = (
+        "name",
+        "func",
+        "timeout",
+        "idempotent",
+        "mode",
+        "lane",
+        "description",
+        "cache_ttl",
+    )
+
+    def __init__(
+        self, name, func, timeout, idempotent, mode, lane, description, cache_ttl=None
+    ):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.idempotent = idempotent
+        self.mode = mode
+        self.lane = lane
+        self.description = description
+        self.cache_ttl = cache_ttl
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "timeout": self.timeout,
+            "idempotent": self.idempotent,
+            "mode": self.mode,
+            "lane": self.lane,
+            "description": self.description,
+            "cache_ttl": self.cache_ttl,
+        }
+
+
+class CommandRegistry:
+    """
+    Maps command names to handlers and runs them under their metadata.
+    Handlers receive the full command dictionary and may be plain functions
+    or coroutine functions; they may also return a generator to stream.
+    """
+
+    def __init__(self, pool_workers=DEFAULT_POOL_WORKERS, admission=None, cache=None):
+        self.pool_workers = pool_workers
+        self.admission = AdmissionController() if admission is None else admission
+        self.cache = ResultCache() if cache is None else cache
+        self._inflight = {}  # cache key -> future of the call computing it
+        event_bus.add_listener(self.cache.on_event)
+        self._commands = {}
+        self._pool = None
+
+    def register(
+        self,
+        name,
+        func=None,
+        *,
+        timeout=DEFAULT_TIMEOUT,
+        idempotent=False,
+        mode="inline",
+        lane="normal",
+        description=None,
+        cache_ttl=None,
+        invalidated_by=(),
+    ):
+        """
+        Registers func under name. Usable directly or as a decorator:
+
+            @registry.register("status", idempotent=True)
+            def status(command_dict): ...
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown command mode {mode!r}; expected one of {MODES}")
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        if cache_ttl and not idempotent:
+            raise ValueError(f"Only idempotent commands can be cached: {name!r}")
+
+        def _register(handler):
+            doc = inspect.getdoc(handler) or ""
+            self._commands[name] = CommandSpec(
+                name,
+                handler,
+                timeout,
+                idempotent,
+                mode,
+                lane,
+                description or (doc.splitlines()[0] if doc else ""),
+                cache_ttl,
+            )
+            self.cache.invalidate()  # Replies such as list_commands change.
+            if invalidated_by:
+                self.cache.watch(name, invalidated_by)
+            return handler
+
+        return _register if func is None else _register(func)
+
+    def unregister(self, name):
+        self._commands.pop(name, None)
+        self.cache.invalidate()
+
+    def get(self, name):
+        return self._commands.get(name)
+
+    def describe(self):
+        """Metadata for every registered command, sorted by name."""
+        return [self._commands[name].describe() for name in sorted(self._commands)]
+
+    async def dispatch(self, command_dict):
+        """
+        Looks up and runs the command in its admission lane, enforcing its
+        timeout (which includes any time spent queued for a slot). Commands
+        with a cache_ttl are answered from the result cache when possible, and
+        identical queries arriving while one runs share its reply.
+        """
+        name = command_dict.get("command")
+        spec = self._commands.get(name)
+        if spec is None:
+            COMMANDS.inc("(unknown)", "unknown")
+            return {"error": f"Unknown command: {name}. The AI does not comprehend."}
+        if not spec.cache_ttl:
+            return await self._run(spec, command_dict)
+        key = cache_key(command_dict)
+        if key is None:
+            return await self._run(spec, command_dict)
+        hit, reply = self.cache.get(key)
+        if hit:
+            COMMANDS.inc(name, "cached")
+            return reply
+        loop = asyncio.get_running_loop()
+        leader = self._inflight.get(key)
+        if leader is not None and leader.get_loop() is loop:
+            # The same query is already running: share its reply instead of
+            # running the handler once per caller.
+            self.cache.coalesced += 1
+            COMMANDS.inc(name, "coalesced")
+            try:
+                return await asyncio.shield(leader)
+            except asyncio.CancelledError:
+                if not leader.cancelled():
+                    raise  # This caller was cancelled, not the leader.
+                return await self._run(spec, command_dict)
+        leader = self._inflight[key] = loop.create_future()
+        try:
+            result = await self._run(spec, command_dict)
+            if isinstance(result, dict) and "error" not in result:
+                self.cache.put(key, name, result, spec.cache_ttl)
+            leader.set_result(result)
+            return result
+        finally:
+            leader.cancel()  # No-op once it has a result.
+            if self._inflight.get(key) is leader:
+                del self._inflight[key]
+
+    async def _run(self, spec, command_dict):
+        name = spec.name
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            result = await asyncio.wait_for(
+                self.admission.run(spec.lane, self._invoke, spec, command_dict),
+                spec.timeout,
+            )
+            if isinstance(result, dict) and "error" in result:
+                outcome = "error"
+            return result
+        except LaneFull as busy:
+            outcome = "busy"
+            logging.warning("Rejected %s: %s", name, busy)
+            return busy.response()
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logging.warning("Command %s timed out after %ss", name, spec.timeout)
+            return {
+                "error": f"Command '{name}' timed out after {spec.timeout}s.",
+                "timeout": spec.timeout,
+            }
+        except Exception as err:  # pylint: disable=broad-except
+            outcome = "error"
+            logging.exception("Command %s failed", name)
+            return {"error": f"Command '{name}' failed: {err}"}
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            COMMANDS.inc(name, outcome)
+            COMMAND_SECONDS.observe(time.perf_counter() - started, name)
+
+    async def _invoke(self, spec, command_dict):
+        with HANDLER_SECONDS.time(spec.name):
+            return await self._call(spec, command_dict)
+
+    async def _call(self, spec, command_dict):
+        if spec.mode == "pool":
+            # A timed-out pool handler keeps its thread until it returns (a
+            # thread cannot be killed), but the caller is answered on time.
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor(), spec.func, command_dict
+            )
+        else:
+            result = spec.func(command_dict)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.pool_workers, thread_name_prefix="lite-agent-cmd"
+            )
+        return self._pool
+
+    def resize_pool(self, workers):
+        """
+        Changes the number of pool-mode worker threads. Handlers already on
+        the old pool finish there.
+        """
+        self.pool_workers = max(1, int(workers))
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """Releases the worker pool; queued pool handlers are abandoned."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
+def load_command_modules(module_names):
+    """
+    Imports plugin modules so their @command registrations take effect.
+    Accepts a list or a comma-separated string (as stored by `config set`).
+    """
+    if isinstance(module_names, str):
+        module_names = [m.strip() for m in module_names.split(",")]
+    loaded = []
+    for module_name in module_names or ():
+        if not module_name:
+            continue
+        try:
+            importlib.import_module(module_name)
+            loaded.append(module_name)
+        except ImportError as err:
+            logging.error("Could not load command module %s: %s", module_name, err)
+    return loaded
+
+
+# The daemon-wide registry and its decorator.
+registry = CommandRegistry()
+command = registry.register
+metrics.gauge(
+    "lane_active",
+    "Commands running, by admission lane.",
+    ("lane",),
+    function=lambda: {
+        (lane,): stats["active"] for lane, stats in registry.admission.stats().items()
+    },
+)
+metrics.gauge(
+    "lane_queued",
+    "Commands waiting for an admission slot, by lane.",
+    ("lane",),
+    function=lambda: {
+        (lane,): stats["queued"] for lane, stats in registry.admission.stats().items()
+    },
+)
+metrics.counter(
+    "lane_rejected_total",
+    "Commands rejected because their lane queue was full.",
+    ("lane",),
+    function=lambda: {
+        (lane,): stats["rejected"] for lane, stats in registry.admission.stats().items()
+    },
+)
+metrics.gauge(
+    "cache_entries",
+    "Replies held by the result cache.",
+    function=lambda: registry.cache.stats()["entries"],
+)
+metrics.counter(
+    "cache_lookups_total",
+    "Result cache lookups, by result.",
+    ("result",),
+    function=lambda: {
+        ("hit",): registry.cache.hits,
+        ("miss",): registry.cache.misses,
+    },
+)
+
+_STARTED_AT = time.time()
+
+# Installed by the daemon: starts a graceful shutdown and returns details
+# (such as the drain deadline) to include in the stop_daemon reply.
+shutdown_hook = None
+
+
+# --- Built-in commands ---
+
+
+@command("status", idempotent=True, timeout=5.0, lane="control", cache_ttl=1.0)
+def _status(command_dict):  # pylint: disable=unused-argument
+    """Reports that the agent is alive and for how long."""
+    uptime = time.time() - _STARTED_AT
+    return {
+        "status": "Agent is running",
+        "uptime": f"{uptime / 3600:.2f} hours",
+        "uptime_seconds": round(uptime, 3),
+    }
+
+
+@command("stop_daemon", timeout=5.0, lane="control")
+def _stop_daemon(command_dict):  # pylint: disable=unused-argument
+    """Asks the agent to drain and shut down."""
+    # The AI processes the request for a graceful pause: the reply goes out
+    # first, since the drain waits for requests in flight, this one included.
+    reply = {"status": "Stop command received by IPC server."}
+    if shutdown_hook is not None:
+        reply.update(shutdown_hook())
+    return reply
+
+
+@command("subscribe", idempotent=True, lane="control")
+def _subscribe(command_dict):
+    """Streams daemon events until the client cancels."""
+    heartbeat = command_dict.get("heartbeat", HEARTBEAT_INTERVAL)
+    # A zero, negative or NaN interval would make the wait loop spin.
+    if (
+        isinstance(heartbeat, bool)
+        or not isinstance(heartbeat, (int, float))
+        or not 0 < heartbeat < math.inf
+    ):
+        return {"error": "heartbeat must be a positive number of seconds."}
+    return event_bus.subscribe(command_dict.get("topics"), heartbeat=float(heartbeat))
+
+
+@command("list_commands", idempotent=True, timeout=5.0, lane="control", cache_ttl=60.0)
+def _list_commands(command_dict):  # pylint: disable=unused-argument
+    """Lists every registered command with its metadata."""
+    return {"commands": registry.describe()}
+
+
+@command("admission_stats", idempotent=True, timeout=5.0, lane="control")
+def _admission_stats(command_dict):  # pylint: disable=unused-argument
+    """Reports per-lane concurrency, queue depth and rejections."""
+    return {"lanes": registry.admission.stats()}
+
+
+@command("metrics", idempotent=True, timeout=5.0, lane="control")
+def _metrics(command_dict):
+    """Reports counters, gauges and latency histograms ("format": "prometheus" for text)."""
+    if command_dict.get("format") == "prometheus":
+        return {"text": metrics.exposition()}
+    return {"metrics": metrics.snapshot()}
+
+
+@command("cache_stats", idempotent=True, timeout=5.0, lane="control")
+def _cache_stats(command_dict):
+    """Reports result cache hits, misses and evictions; "clear" empties it."""
+    if command_dict.get("clear"):
+        registry.cache.invalidate()
+    return {"cache": registry.cache.stats()}
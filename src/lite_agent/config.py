@@ -0,0 +1,163 @@
+# src/lite_agent/config.py
+"""
+Configuration storage for the Lite Agent.
+The AI's standing orders, shared by the CLI and the daemon.
+
+Settings live in a JSON file in the per-user application directory. Both the
+CLI (`lite-agent config ...`) and the daemon read it through the `store`
+below:
+
+* Reads are cached. The parsed file is kept together with its modification
+  time, size and inode, and is parsed again only once one of them changes.
+* Writes go to a temporary file in the same directory, which is then renamed
+  over the old one. A reader never sees a half-written file.
+* Each update re-reads the file and applies its changes while holding an
+  exclusive lock on a "config.json.lock" file next to it (on POSIX systems).
+  Concurrent `config set` calls therefore add up instead of overwriting each
+  other. Many keys can be changed in one write.
+
+`lite-agent config set` also sends the changed settings to a running daemon
+(the ``update_config`` command in reload.py). `config reload` makes the
+daemon re-read the file after a hand edit.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+
+import click
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; updates there are not locked.
+    fcntl = None
+
+CONFIG_DIR = click.get_app_dir("lite-agent")
+CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
+
+_TRUE_STRINGS = ("1", "true", "yes", "on")
+
+
+def _signature(path, stat):
+    return (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class ConfigStore:
+    """Cached reads and atomic, locked updates of a JSON configuration file."""
+
+    def __init__(self, path=None):
+        self._path = path  # None follows the module's CONFIG_FILE.
+        self._cached = None  # (file signature, parsed configuration)
+        self.reads = 0  # Times the file was actually parsed.
+
+    @property
+    def path(self):
+        return self._path or CONFIG_FILE
+
+    def load(self, strict=False):
+        """
+        The configuration as a new dict, parsed again only if the file
+        changed. A missing file is an empty configuration. An unreadable one
+        also reads as empty unless strict is set, in which case the error is
+        raised.
+        """
+        try:
+            return dict(self._load())
+        except json.JSONDecodeError:
+            if strict:
+                raise
+            return {}
+
+    def update(self, settings=None, unset=()):
+        """
+        Sets the keys in `settings` and removes those in `unset`, in one
+        atomic write. Returns the new configuration.
+        An unreadable file raises json.JSONDecodeError rather than being
+        overwritten.
+        """
+        with self._locked():
+            config_data = dict(self._load())
+            config_data.update(settings or {})
+            for key in unset:
+                config_data.pop(key, None)
+            self._write(config_data)
+        return dict(config_data)
+
+    def save(self, config_data):
+        """Replaces the whole configuration in one atomic write."""
+        with self._locked():
+            self._write(dict(config_data))
+
+    def _load(self):
+        path = self.path
+        try:
+            if self._cached is not None and self._cached[0] == _signature(
+                path, os.stat(path)
+            ):
+                return self._cached[1]
+            with open(path, "r", encoding="utf-8") as f:
+                # The signature of the file actually read, in case it was
+                # replaced since the stat above.
+                signature = _signature(path, os.fstat(f.fileno()))
+                config_data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        self.reads += 1
+        self._cached = (signature, config_data)
+        return config_data
+
+    def _write(self, config_data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(config_data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        lock_path = self.path + ".lock"
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+        with open(lock_path, "a", encoding="utf-8") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+# The process-wide store; the CLI and the daemon both go through it.
+store = ConfigStore()
+
+
+def load_config(strict=False):
+    """
+    Loads the configuration from the JSON file (see ConfigStore.load).
+    """
+    return store.load(strict=strict)
+
+
+def save_config(config_data):
+    """Saves the configuration to the JSON file, atomically."""
+    store.save(config_data)
+
+
+def as_bool(value):
+    """
+    Interprets a configuration value as a boolean.
+    `config set` stores plain strings, so "false" must not read as True.
+    """
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_STRINGS
+    return bool(value)
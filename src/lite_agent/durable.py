@@ -0,0 +1,445 @@
+# src/lite_agent/durable.py
+"""
+Crash-safe work queue for the Lite Agent daemon.
+The AI's long-term memory: what it promised to do survives a restart.
+
+Submitted work (jobs and scheduled tasks) is recorded in an append-only
+write-ahead log before it is acknowledged to the client, and marked done with
+an ``ack`` record when it is finished. On start-up the daemon replays the log
+and resubmits everything that was never acknowledged, so delivery is
+at-least-once: work interrupted by a crash runs again.
+
+Each record is a fixed header (payload length, CRC32, operation, item id)
+followed by the item as compact JSON; ``ack`` records have no payload. The
+CRC covers everything after itself, so a torn write at the end of the log,
+left by a crash mid-append, fails the length or checksum test; replay stops
+there and truncates the tail. Replay reads only headers until the end, then
+decodes the surviving items in a single JSON parse.
+
+Group commit keeps enqueue rates high: a single writer thread takes every
+record queued since its last write, appends them with one write() and makes
+them durable with one fsync(). Callers waiting on `put()` are released
+together, so the cost of an fsync is shared by everyone who queued during the
+previous one. Acks are appended without waiting; losing one in a crash only
+means a finished item is replayed.
+
+If a write fails part-way (a full disk, an I/O error), the log is truncated
+back to its last committed record, so later commits do not land after torn
+bytes that replay would stop at. Should that truncate fail as well, the queue
+stops accepting work rather than acknowledge records it cannot replay.
+
+Each pre-fork worker keeps its own log, ``queue.log.<n>``. A log that no
+current process owns (left by a larger worker count, or by a switch between
+single-process and pre-fork mode) is adopted when the queue is opened: its
+pending items are appended to the opening log, which is synced before the
+orphan is removed. A crash in between only replays those items twice.
+
+When acknowledged records make up most of a large log, it is compacted: the
+live records are written to a new file, which atomically replaces the old.
+The new file is written and synced without holding the queue's lock, so
+`put_nowait()` on the event loop never waits for it.
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+from .commands import command
+from .config import CONFIG_DIR
+from .metrics import metrics
+
+RECORD = struct.Struct("!IIBQ")  # Payload length, CRC32, op, item id.
+_CHECKED = struct.Struct("!BQ")  # The header fields covered by the CRC.
+_PUT, _ACK = 1, 2
+QUEUE_FILE = os.path.join(CONFIG_DIR, "queue.log")
+COMPACT_MIN_BYTES = 1024 * 1024  # Never compact logs smaller than this.
+COMPACT_RATIO = 0.5  # Compact once more than half of the log is dead records.
+
+WAL_COMMIT_SECONDS = metrics.histogram(
+    "wal_commit_seconds", "Time to write and fsync one group commit."
+)
+WAL_COMMIT_RECORDS = metrics.histogram(
+    "wal_commit_records",
+    "Records written per group commit.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+WAL_BYTES = metrics.counter("wal_bytes_total", "Bytes appended to the work queue log.")
+WAL_ERRORS = metrics.counter("wal_write_errors_total", "Failed work queue log writes.")
+WAL_COMPACTIONS = metrics.counter(
+    "wal_compactions_total", "Work queue log compactions."
+)
+
+
+def _encode(op, record_id, item=None):
+    payload = b"" if item is None else json.dumps(item, separators=(",", ":")).encode()
+    crc = zlib.crc32(payload, zlib.crc32(_CHECKED.pack(op, record_id)))
+    return RECORD.pack(len(payload), crc, op, record_id) + payload
+
+
+def _fsync_dir(path):
+    # Makes a rename or file creation in the directory itself durable.
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+_sync = getattr(os, "fdatasync", os.fsync)
+
+
+class DurableQueue:
+    """
+    An append-only, group-committed log of pending work items.
+    Items are JSON-serialisable dicts identified by increasing integer ids.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, fsync=True):
+        self.fsync = fsync
+        self.path = None
+        self._fd = None
+        self._pending = collections.OrderedDict()  # id -> item, oldest first
+        self._sizes = {}  # id -> size of its put record
+        self._next_id = 1
+        self._file_bytes = 0
+        self._live_bytes = 0
+        # (record bytes, future or None, put id or None) awaiting the writer
+        self._batch = []
+        self._cond = threading.Condition(threading.Lock())
+        self._writer = None
+        self._closing = False
+        self._failed = None  # The error that made the log unwritable.
+        self.commits = 0
+        self.records = 0
+        self.compactions = 0
+
+    @property
+    def is_open(self):
+        return self._fd is not None
+
+    # --- Lifecycle ---
+
+    def open(self, path=QUEUE_FILE, adopt=()):
+        """
+        Opens (creating if needed) the log at path, replays it and starts the
+        writer thread. The pending items of the logs in `adopt` are moved
+        into it first. Returns the unacknowledged items as (id, item) pairs.
+        """
+        if self.is_open:
+            raise RuntimeError(f"Queue already open on {self.path}")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._failed = None
+        self._replay(path)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        _fsync_dir(path)
+        for orphan in adopt:
+            self._adopt(orphan)
+        self._closing = False
+        self._writer = threading.Thread(
+            target=self._write_loop, name="lite-agent-wal", daemon=True
+        )
+        self._writer.start()
+        return list(self._pending.items())
+
+    def close(self):
+        """Flushes queued records and closes the log."""
+        with self._cond:
+            if self._writer is None:
+                return
+            self._closing = True
+            self._cond.notify()
+        self._writer.join()
+        self._writer = None
+        os.close(self._fd)
+        self._fd = None
+
+    # --- Queue operations ---
+
+    def put_nowait(self, item):
+        """
+        Queues an item for the next group commit.
+        Returns (id, future); the future resolves once the item is on disk,
+        and fails with OSError if it cannot be written.
+        """
+        future = concurrent.futures.Future()
+        with self._cond:
+            if not self.is_open or self._closing:
+                raise RuntimeError("The durable queue is not open.")
+            record_id = self._next_id
+            self._next_id += 1
+            record = _encode(_PUT, record_id, item)
+            self._pending[record_id] = item
+            self._sizes[record_id] = len(record)
+            self._live_bytes += len(record)
+            if self._failed is not None:
+                future.set_exception(self._failed)
+            else:
+                self._batch.append((record, future, record_id))
+                self._cond.notify()
+        return record_id, future
+
+    def put(self, item, timeout=None):
+        """Appends an item and returns its id once it is durable."""
+        record_id, future = self.put_nowait(item)
+        future.result(timeout)
+        return record_id
+
+    def ack(self, record_id):
+        """Marks an item as done. Unknown ids are ignored."""
+        with self._cond:
+            if self._pending.pop(record_id, None) is None:
+                return False
+            self._live_bytes -= self._sizes.pop(record_id)
+            if self.is_open and not self._closing:
+                self._batch.append((_encode(_ACK, record_id), None, None))
+                self._cond.notify()
+        return True
+
+    def pending(self):
+        with self._cond:
+            return list(self._pending.items())
+
+    def stats(self):
+        with self._cond:
+            return {
+                "path": self.path,
+                "pending": len(self._pending),
+                "file_bytes": self._file_bytes,
+                "live_bytes": self._live_bytes,
+                "commits": self.commits,
+                "records": self.records,
+                "compactions": self.compactions,
+                "failed": None if self._failed is None else str(self._failed),
+            }
+
+    # --- Internals ---
+
+    def _replay(self, path):
+        self._pending.clear()
+        self._sizes.clear()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        view = memoryview(data)
+        live = {}  # id -> (payload start, end, record size)
+        offset = 0
+        max_id = 0
+        while offset + RECORD.size <= len(data):
+            length, crc, op, record_id = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            end = start + length
+            if end > len(data) or zlib.crc32(view[offset + 8 : end]) != crc:
+                break
+            max_id = max(max_id, record_id)
+            if op == _PUT:
+                live[record_id] = (start, end, end - offset)
+            else:
+                live.pop(record_id, None)
+            offset = end
+        # Only items still pending are decoded, all in one parse.
+        items = json.loads(
+            b"[" + b",".join(data[start:end] for start, end, _ in live.values()) + b"]"
+        )
+        for (record_id, (_, _, size)), item in zip(live.items(), items):
+            self._pending[record_id] = item
+            self._sizes[record_id] = size
+        if offset < len(data):
+            logging.warning(
+                "Discarding %s bytes of torn or corrupt records at the end of %s.",
+                len(data) - offset,
+                path,
+            )
+            os.truncate(path, offset)
+        self._next_id = max_id + 1
+        self._file_bytes = offset
+        self._live_bytes = sum(self._sizes.values())
+        logging.info(
+            "Replayed %s (%s bytes): %s pending items.",
+            path,
+            offset,
+            len(self._pending),
+        )
+
+    def _adopt(self, orphan):
+        # Called from open(), before the writer thread starts.
+        other = DurableQueue()
+        other._replay(orphan)  # pylint: disable=protected-access
+        records = []
+        for item in other._pending.values():  # pylint: disable=protected-access
+            record_id = self._next_id
+            self._next_id += 1
+            record = _encode(_PUT, record_id, item)
+            self._pending[record_id] = item
+            self._sizes[record_id] = len(record)
+            records.append(record)
+        data = b"".join(records)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view) :]
+        _sync(self._fd)
+        self._file_bytes += len(data)
+        self._live_bytes += len(data)
+        os.remove(orphan)
+        _fsync_dir(orphan)
+        if records:
+            logging.warning(
+                "Adopted %s pending items from %s, a log no worker owns.",
+                len(records),
+                orphan,
+            )
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._batch and not self._closing:
+                    self._cond.wait()
+                if not self._batch:
+                    return
+                batch, self._batch = self._batch, []
+                failed = self._failed
+            if failed is not None:
+                _fail(batch, failed)
+                continue
+            data = b"".join(record for record, _, _ in batch)
+            started = time.perf_counter()
+            try:
+                view = memoryview(data)
+                while view:
+                    written = os.write(self._fd, view)
+                    view = view[written:]
+                if self.fsync:
+                    _sync(self._fd)
+            except OSError as err:
+                WAL_ERRORS.inc()
+                logging.error("Durable queue write failed: %s", err)
+                self._rewind()
+                _fail(batch, err)
+                continue
+            WAL_COMMIT_SECONDS.observe(time.perf_counter() - started)
+            WAL_COMMIT_RECORDS.observe(len(batch))
+            WAL_BYTES.inc(amount=len(data))
+            with self._cond:
+                self._file_bytes += len(data)
+                self.commits += 1
+                self.records += len(batch)
+                compact = (
+                    self._file_bytes >= COMPACT_MIN_BYTES
+                    and self._live_bytes < self._file_bytes * (1 - COMPACT_RATIO)
+                )
+            for _, future, _ in batch:
+                if future is not None:
+                    future.set_result(None)
+            if compact:
+                self._compact()
+
+    def _rewind(self):
+        # A failed write may have appended part of the batch. Cut it off, or
+        # every later commit lands after bytes that replay stops at.
+        try:
+            os.ftruncate(self._fd, self._file_bytes)
+            _sync(self._fd)
+        except OSError as err:
+            logging.critical(
+                "Could not discard a partial write to %s (%s); "
+                "the durable queue rejects new work until it is reopened.",
+                self.path,
+                err,
+            )
+            with self._cond:
+                self._failed = err
+
+    def _compact(self):
+        # Runs on the writer thread, the only one that writes the log, so
+        # nothing is appended to the old file meanwhile. Records queued in
+        # the meantime wait in _batch and land in the new file; items among
+        # them are left out of the snapshot so they are not written twice.
+        with self._cond:
+            queued = {record_id for _, _, record_id in self._batch if record_id}
+            live = [
+                (record_id, item)
+                for record_id, item in self._pending.items()
+                if record_id not in queued
+            ]
+        temp = self.path + ".compact"
+        try:
+            with open(temp, "wb") as f:
+                for record_id, item in live:
+                    f.write(_encode(_PUT, record_id, item))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            # Opened before the rename, so the descriptor follows the file.
+            fd = os.open(temp, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.replace(temp, self.path)
+            except OSError:
+                os.close(fd)
+                raise
+        except OSError as err:
+            WAL_ERRORS.inc()
+            logging.error("Durable queue compaction failed: %s", err)
+            with contextlib.suppress(OSError):
+                os.remove(temp)
+            return
+        try:
+            _fsync_dir(self.path)
+        except OSError as err:  # The new file is in place either way.
+            logging.warning("Could not sync the directory of %s: %s", self.path, err)
+        with self._cond:
+            old_fd, self._fd = self._fd, fd
+            before, self._file_bytes = self._file_bytes, size
+            self.compactions += 1
+        os.close(old_fd)
+        WAL_COMPACTIONS.inc()
+        logging.info("Compacted %s from %s to %s bytes.", self.path, before, size)
+
+
+def queue_logs(path=QUEUE_FILE):
+    """Existing logs at path: the single-process log and every worker's."""
+    directory, name = os.path.split(os.path.abspath(path))
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    logs = [
+        os.path.join(directory, entry)
+        for entry in names
+        if entry == name
+        or (entry.startswith(name + ".") and entry[len(name) + 1 :].isdigit())
+    ]
+    return sorted(logs)
+
+
+def _fail(batch, err):
+    for _, future, _ in batch:
+        if future is not None:
+            future.set_exception(err)
+
+
+# The daemon-wide work queue; opened by the daemon at start-up.
+work_queue = DurableQueue()
+metrics.gauge(
+    "wal_pending_items",
+    "Work items recorded and not yet acknowledged.",
+    function=lambda: work_queue.stats()["pending"],
+)
+
+
+@command("queue_stats", idempotent=True, timeout=5.0, lane="control", cache_ttl=1.0)
+def _queue_stats(command_dict):  # pylint: disable=unused-argument
+    """Reports the durable work queue's size and commit statistics."""
+    return {"queue": work_queue.stats()}
@@ -0,0 +1,143 @@
+# src/lite_agent/events.py
+"""
+In-process event bus for the Lite Agent daemon.
+The agent's running commentary, delivered the moment something happens.
+
+Subsystems publish small JSON-serialisable events on named topics ("status",
+"tasks", ...) from any thread. IPC clients subscribe over one long-lived
+connection and receive the events as a streamed reply, instead of polling the
+daemon in a loop. An idle subscription receives a heartbeat at a fixed
+interval, so a watcher can tell a quiet agent from a dead one.
+"""
+
+import asyncio
+import collections
+import itertools
+import logging
+import threading
+import time
+
+HEARTBEAT_INTERVAL = 15.0  # Seconds of silence before a heartbeat is sent.
+SUBSCRIBER_QUEUE_SIZE = 256  # Events buffered per subscriber before dropping.
+
+
+class _Subscription:
+    """One subscriber: a topic filter and a bounded queue on its event loop."""
+
+    def __init__(self, loop, topics, max_queue):
+        self.loop = loop
+        self.topics = frozenset(topics) if topics else None
+        self.events = collections.deque(maxlen=max_queue)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def push(self, event):
+        # Runs on the subscriber's loop. A slow watcher loses its oldest
+        # events rather than making the publisher wait.
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+        self.wakeup.set()
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+
+class EventBus:
+    """
+    Thread-safe publish/subscribe hub.
+    publish() never blocks: each event is handed to the subscriber's event
+    loop and buffered in a bounded per-subscriber queue.
+    """
+
+    def __init__(self, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscriptions = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    def publish(self, topic, **payload):
+        """Publishes an event on a topic and returns it."""
+        event = dict(payload, topic=topic, seq=next(self._sequence), time=time.time())
+        with self._lock:
+            targets = [sub for sub in self._subscriptions if sub.wants(topic)]
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Event listener %r failed", listener)
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; it will unregister itself.
+                logging.debug("Dropping event for closed subscriber loop")
+        return event
+
+    def add_listener(self, callback):
+        """
+        Calls callback(event) for every event, synchronously on the
+        publishing thread. Listeners must be quick and thread-safe.
+        """
+        with self._lock:
+            self._listeners = self._listeners + [callback]
+
+    def close_subscriptions(self):
+        """Ends every current subscription once its buffered events are sent."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for sub in subscriptions:
+            try:
+                sub.loop.call_soon_threadsafe(sub.close)
+            except RuntimeError:
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+    async def subscribe(self, topics=None, heartbeat=HEARTBEAT_INTERVAL):
+        """
+        Yields events on the given topics (all topics if None) until the
+        caller stops iterating or close_subscriptions() is called.
+        A {"topic": "heartbeat"} event is yielded after `heartbeat` seconds
+        without any other event.
+        """
+        sub = _Subscription(asyncio.get_running_loop(), topics, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(sub)
+        try:
+            yield {
+                "topic": "subscribed",
+                "topics": sorted(sub.topics) if sub.topics else None,
+                "time": time.time(),
+            }
+            while True:
+                if not sub.events and sub.closed:
+                    return
+                if not sub.events:
+                    sub.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(sub.wakeup.wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        yield {
+                            "topic": "heartbeat",
+                            "time": time.time(),
+                            "dropped": sub.dropped,
+                        }
+                        continue
+                while sub.events:
+                    yield sub.events.popleft()
+        finally:
+            with self._lock:
+                self._subscriptions.discard(sub)
+
+
+# The daemon-wide bus that subsystems publish to.
+event_bus = EventBus()
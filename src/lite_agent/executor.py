@@ -0,0 +1,533 @@
+# src/lite_agent/executor.py
+"""
+Execution engine for Lite Agent jobs.
+Many hands for the AI: threads for waiting, processes for thinking.
+
+Every job declares a kind:
+
+* ``io`` jobs (network calls, file transfers, subprocesses) run on a thread
+  pool, where waiting costs almost nothing.
+* ``cpu`` jobs run on a process pool with one worker per core by default, so
+  heavy computation uses every core instead of contending for the GIL. Their
+  function, arguments and result must be picklable.
+
+On top of the pool sizes, each job type (the registered function name) may
+have a concurrency cap: jobs over the cap wait in a FIFO queue inside the
+engine, where they can still be cancelled cleanly. Cancelling a job that
+already runs is cooperative: an ``io`` function that accepts a
+``cancel_event`` keyword receives a threading.Event it should poll.
+
+Results and exceptions are kept for the most recent jobs and are reported
+through the ``job_status`` command and the ``jobs`` event topic. Jobs
+submitted over IPC are written to the durable queue (durable.py) before they
+are accepted, and resubmitted on start-up if the daemon died before they
+finished.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import inspect
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from .commands import command
+from .config import as_bool
+from .durable import work_queue
+from .events import event_bus
+from .metrics import metrics
+from .scheduler import TASK_FUNCTIONS, run_repeatedly
+
+KINDS = ("io", "cpu")
+DEFAULT_IO_WORKERS = 8
+DEFAULT_HISTORY = 256  # Finished jobs kept for status queries.
+MAX_STATUS_WAIT = 25.0  # Seconds job_status may block; below its timeout.
+
+JOBS = metrics.counter(
+    "jobs_total", "Jobs finished, by kind and state.", ("kind", "state")
+)
+JOB_SECONDS = metrics.histogram("job_seconds", "Job run time.", ("kind",))
+JOB_WAIT_SECONDS = metrics.histogram(
+    "job_wait_seconds", "Time jobs spent queued before starting.", ("kind",)
+)
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    return value
+
+
+def parse_caps(value):
+    """Parses caps given as a dict or a "name=n,name=n" string."""
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {name: int(limit) for name, limit in value.items()}
+    caps = {}
+    for item in str(value).split(","):
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            caps[name.strip()] = int(limit)
+    return caps
+
+
+class Job:
+    """One unit of work submitted to the engine."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, job_id, name, kind, func, args, kwargs):
+        self.id = job_id
+        self.name = name
+        self.kind = kind
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.future = concurrent.futures.Future()  # Resolves with the result.
+        self.pool_future = None
+        self.cancel_event = None
+        self.state = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "kind": self.kind,
+            "state": self.state,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "result": _jsonable(self.result),
+            "error": self.error,
+        }
+
+
+class ExecutionEngine:
+    """Runs jobs on thread and process pools under per-type concurrency caps."""
+
+    def __init__(
+        self,
+        io_workers=DEFAULT_IO_WORKERS,
+        cpu_workers=None,
+        caps=None,
+        history=DEFAULT_HISTORY,
+    ):
+        self.workers = {"io": io_workers, "cpu": cpu_workers or os.cpu_count() or 1}
+        self._default_workers = dict(self.workers)
+        self._configured_workers = dict(self.workers)  # Before scaling.
+        self.scale = 1.0
+        self.caps = dict(caps or {})
+        self._default_caps = dict(self.caps)
+        self.history = history
+        self._pools = {}
+        self._jobs = collections.OrderedDict()  # id -> Job, oldest first
+        self._held = collections.defaultdict(collections.deque)  # name -> Jobs
+        self._active = collections.Counter()  # name -> jobs started
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def apply_config(self, config_data):
+        """
+        Applies ``io_workers``, ``cpu_workers`` and ``job_caps`` from the agent
+        configuration; absent keys mean the defaults. Safe while jobs run (on
+        a config reload): a resized pool is replaced, and jobs already handed
+        to the old one finish there.
+        """
+        for kind in KINDS:
+            value = config_data.get(f"{kind}_workers")
+            self._configured_workers[kind] = (
+                max(1, int(value)) if value else self._default_workers[kind]
+            )
+        self._apply_scale()
+        caps = dict(self._default_caps, **parse_caps(config_data.get("job_caps")))
+        with self._lock:
+            self.caps = caps
+            # A raised or removed cap lets held jobs start now.
+            ready = []
+            for name, held in self._held.items():
+                while held and self._has_slot(name):
+                    ready.append(held.popleft())
+                    self._active[name] += 1
+        for job in ready:
+            self._start(job)
+
+    def set_scale(self, scale):
+        """
+        Runs both pools at a fraction of their configured size; used by the
+        resource governor to back off while the host is under pressure.
+        """
+        self.scale = scale
+        self._apply_scale()
+
+    def _apply_scale(self):
+        for kind in KINDS:
+            workers = max(1, int(self._configured_workers[kind] * self.scale))
+            if workers != self.workers[kind]:
+                self._resize(kind, workers)
+
+    # --- Submission and cancellation ---
+
+    def submit(self, func, args=(), kwargs=None, kind="io", name=None):
+        """Queues func(*args, **kwargs) and returns its Job."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}; expected one of {KINDS}")
+        name = name or getattr(func, "__name__", "job")
+        job = Job(next(self._ids), name, kind, func, args, kwargs)
+        if kind == "io" and _accepts_cancel_event(func):
+            job.cancel_event = threading.Event()
+            job.kwargs["cancel_event"] = job.cancel_event
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim_history()
+            if self._has_slot(name):
+                self._active[name] += 1
+                start = True
+            else:
+                self._held[name].append(job)
+                start = False
+        event_bus.publish("jobs", event="submitted", job=job.id, name=name, kind=kind)
+        if start:
+            self._start(job)
+        return job
+
+    def run_task(self, task, times):
+        """Scheduler runner: runs a scheduled task as a job of its kind."""
+        return self.submit(
+            run_repeatedly,
+            (task.func, times, task.args, task.kwargs),
+            kind=task.kind,
+            name=task.function_name,
+        ).future
+
+    def cancel(self, job_id):
+        """
+        Cancels a job. Returns False if it already finished or is running
+        without a way to be interrupted.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished is not None:
+                return False
+            held = self._held.get(job.name)
+            if held and job in held:
+                held.remove(job)
+                job.future.cancel()
+                self._record(job, "cancelled")
+                return True
+        if job.pool_future is not None and job.pool_future.cancel():
+            return True  # Still waiting for a pool worker; _done records it.
+        if job.cancel_event is not None:
+            job.cancel_event.set()
+            job.state = "cancelling"
+            return True
+        return False
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [job.describe() for job in self._jobs.values()]
+
+    def stats(self):
+        with self._lock:
+            states = collections.Counter(job.state for job in self._jobs.values())
+            return {
+                "workers": dict(self.workers),
+                "configured_workers": dict(self._configured_workers),
+                "caps": dict(self.caps),
+                "active": {name: n for name, n in self._active.items() if n},
+                "held": sum(len(jobs) for jobs in self._held.values()),
+                "jobs": dict(states),
+            }
+
+    def wait_idle(self, timeout=None):
+        """
+        Waits until every started job has finished, for at most timeout
+        seconds. Returns how many were still running.
+        """
+        with self._lock:
+            futures = [
+                job.future
+                for job in self._jobs.values()
+                if job.state != "queued" and job.finished is None
+            ]
+        _, not_done = concurrent.futures.wait(futures, timeout)
+        return len(not_done)
+
+    def shutdown(self, wait=False):
+        """Cancels held jobs and releases the pools."""
+        with self._lock:
+            held = [job for jobs in self._held.values() for job in jobs]
+            self._held.clear()
+            pools, self._pools = self._pools, {}
+        for job in held:
+            job.future.cancel()
+            self._record(job, "cancelled")
+        for pool in pools.values():
+            pool.shutdown(wait=wait)
+
+    # --- Internals ---
+
+    def _resize(self, kind, workers):
+        with self._lock:
+            self.workers[kind] = workers
+            old = self._pools.pop(kind, None)
+        if old is not None:
+            old.shutdown(wait=False)
+            logging.info("Resized the %s job pool to %s workers.", kind, workers)
+
+    def _has_slot(self, name):
+        cap = self.caps.get(name)
+        return cap is None or self._active[name] < cap
+
+    def _pool(self, kind):
+        with self._lock:
+            pool = self._pools.get(kind)
+            if pool is None:
+                if kind == "cpu":
+                    pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.workers["cpu"], mp_context=_mp_context()
+                    )
+                else:
+                    pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.workers["io"],
+                        thread_name_prefix="lite-agent-job",
+                    )
+                self._pools[kind] = pool
+            return pool
+
+    def _start(self, job):
+        if not job.future.set_running_or_notify_cancel():
+            self._release(job)
+            return
+        job.state = "running"
+        job.started = time.time()
+        JOB_WAIT_SECONDS.observe(job.started - job.submitted, job.kind)
+        try:
+            job.pool_future = self._pool(job.kind).submit(
+                job.func, *job.args, **job.kwargs
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            # A shut-down or broken pool refuses new work.
+            self._settle(job, None, err)
+            return
+        job.pool_future.add_done_callback(
+            lambda fut: self._done(job, fut)  # pylint: disable=W0108
+        )
+
+    def _done(self, job, pool_future):
+        if pool_future.cancelled():
+            self._settle(job, None, concurrent.futures.CancelledError())
+        elif pool_future.exception() is not None:
+            self._settle(job, None, pool_future.exception())
+        else:
+            self._settle(job, pool_future.result(), None)
+
+    def _settle(self, job, result, error):
+        if isinstance(error, concurrent.futures.CancelledError) or (
+            job.cancel_event is not None and job.cancel_event.is_set()
+        ):
+            state = "cancelled"
+        elif error is not None:
+            state = "failed"
+            logging.error("Job %s (%s) failed: %r", job.id, job.name, error)
+        else:
+            state = "done"
+        job.result = result
+        self._record(job, state, error)
+        if error is None:
+            job.future.set_result(result)
+        else:
+            job.future.set_exception(error)
+        self._release(job)
+
+    def _record(self, job, state, error=None):
+        job.state = state
+        job.finished = time.time()
+        if error is not None:
+            job.error = repr(error)
+        JOBS.inc(job.kind, state)
+        if job.started is not None:
+            JOB_SECONDS.observe(job.finished - job.started, job.kind)
+        event_bus.publish(
+            "jobs",
+            event=state,
+            job=job.id,
+            name=job.name,
+            error=job.error,
+            duration=None
+            if job.started is None
+            else round(job.finished - job.started, 6),
+        )
+
+    def _release(self, job):
+        with self._lock:
+            self._active[job.name] -= 1
+            held = self._held.get(job.name)
+            following = None
+            if held and self._has_slot(job.name):
+                following = held.popleft()
+                self._active[job.name] += 1
+        if following is not None:
+            self._start(following)
+
+    def _trim_history(self):
+        # Called with the lock held: forget the oldest finished jobs.
+        excess = len(self._jobs) - self.history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].finished is not None:
+                del self._jobs[job_id]
+                excess -= 1
+
+
+def _accepts_cancel_event(func):
+    try:
+        return "cancel_event" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _mp_context():
+    # The daemon is multi-threaded by the time a process pool starts, and
+    # forking a threaded process can deadlock the child. Prefer forkserver.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else None
+    )
+
+
+# The daemon-wide engine.
+engine = ExecutionEngine()
+metrics.gauge(
+    "jobs_active",
+    "Jobs started and not yet finished.",
+    function=lambda: sum(engine.stats()["active"].values()),
+)
+metrics.gauge(
+    "jobs_held",
+    "Jobs waiting for their type's concurrency cap.",
+    function=lambda: engine.stats()["held"],
+)
+
+
+# --- IPC commands ---
+
+
+def job_spec(command_dict):
+    """
+    Validates a submit_job command and returns the JSON-serialisable spec
+    that is stored in the durable queue and passed to submit_registered().
+    """
+    function_name = command_dict.get("function")
+    if function_name not in TASK_FUNCTIONS:
+        raise KeyError(
+            f"Unknown task function {function_name!r}; "
+            f"available: {sorted(TASK_FUNCTIONS)}"
+        )
+    kind = command_dict.get("kind", "io")
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind {kind!r}; expected one of {KINDS}")
+    return {
+        "function": function_name,
+        "args": list(command_dict.get("args", ())),
+        "kwargs": dict(command_dict.get("kwargs") or {}),
+        "kind": kind,
+    }
+
+
+def submit_registered(spec, record_id=None):
+    """
+    Submits a job described by a spec from job_spec(). If record_id is given,
+    the matching durable-queue entry is acknowledged when the job finishes.
+    """
+    job = engine.submit(
+        TASK_FUNCTIONS[spec["function"]],
+        spec["args"],
+        spec["kwargs"],
+        kind=spec["kind"],
+        name=spec["function"],
+    )
+    if record_id is not None:
+        job.future.add_done_callback(lambda _: work_queue.ack(record_id))
+    return job
+
+
+@command("submit_job")
+async def _submit_job(command_dict):
+    """Runs a registered task function once as a background job."""
+    try:
+        spec = job_spec(command_dict)
+    except (KeyError, ValueError) as err:
+        return {"error": str(err).strip("'\"")}
+    record_id = None
+    if work_queue.is_open and as_bool(command_dict.get("durable", True)):
+        # Reply only once the job is on disk, so an acknowledged job is
+        # never lost. Concurrent submits share one fsync.
+        record_id, committed = work_queue.put_nowait({"type": "job", "spec": spec})
+        try:
+            await asyncio.wrap_future(committed)
+        except OSError as err:
+            work_queue.ack(record_id)
+            return {"error": f"Could not record the job durably: {err}"}
+    job = submit_registered(spec, record_id)
+    return {
+        "status": "submitted",
+        "job": job.describe(),
+        "durable": record_id is not None,
+    }
+
+
+@command("job_status", idempotent=True)
+async def _job_status(command_dict):
+    """Reports a job's state and result, optionally waiting for it to finish."""
+    job = engine.get(command_dict.get("id"))
+    if job is None:
+        return {"error": f"No job with id {command_dict.get('id')!r}."}
+    wait = min(float(command_dict.get("wait", 0)), MAX_STATUS_WAIT)
+    if wait > 0 and not job.future.done():
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(job.future)), wait
+            )
+        except Exception:  # pylint: disable=broad-except
+            pass  # Timed out or failed: the description says which.
+    return {"job": job.describe()}
+
+
+@command("cancel_job", lane="control")
+def _cancel_job(command_dict):
+    """Cancels a queued job, or asks a cancellable running job to stop."""
+    job_id = command_dict.get("id")
+    if engine.cancel(job_id):
+        return {"status": "cancelling", "id": job_id}
+    return {"error": f"Job {job_id!r} is unknown, finished or cannot be interrupted."}
+
+
+@command(
+    "list_jobs",
+    idempotent=True,
+    timeout=5.0,
+    lane="control",
+    cache_ttl=1.0,
+    invalidated_by=("jobs",),
+)
+def _list_jobs(command_dict):  # pylint: disable=unused-argument
+    """Lists recent jobs with pool and cap statistics."""
+    return {"jobs": engine.list(), "stats": engine.stats()}
@@ -5,138 +5,684 @@ The silent network, enabling human-AI dialogue.
 
 This module handles communication between the CLI and the running agent daemon.
 It serves as the vital link, translating human commands into the AI's language
-and relaying the AI's responses back. It uses TCP sockets for efficient
-and secure local communication.
+and relaying the AI's responses back. It uses TCP loopback or, when
+configured, a Unix domain socket for efficient and secure local
+communication, with length-prefixed framing (see protocol.py) so messages of
+any size survive the trip intact.
 """
 
-import json
+import asyncio
+import inspect
 import logging
 import os
-import signal  # Added for sending SIGTERM from CLI
+import signal
 import socket
-import tempfile
+import time
+
+from . import shm
+from .client import (  # noqa: F401  # Re-exported: one import path for both ends.
+    DRAIN_TIMEOUT,
+    IPC_HOST,
+    IPC_PORT,
+    PID_FILE,
+    UDS_PATH,
+    UDS_SUPPORTED,
+    IPCClient,
+    get_client,
+    ipc_settings,
+    send_batch_to_agent,
+    send_command_to_agent,
+    stream_command_to_agent,
+)
+from .commands import registry
+from .events import event_bus
+from .metrics import metrics
+from .protocol import (
+    ProtocolError,
+    decode_payload,
+    encode_payload,
+    read_message,
+    write_message,
+)
 
 # flake8: noqa: E501 (Ignoring line length for UDS_PATH definition if it gets long)
 
-# Define the TCP socket parameters.
+# Define the socket parameters.
 # This channel ensures reliable communication between human and AI.
-IPC_HOST = "127.0.0.1"  # Localhost for security
-IPC_PORT = 50000  # High-numbered port to avoid conflicts
-PID_FILE = os.path.join(
-    tempfile.gettempdir(), "lite_agent.pid"
-)  # The AI's digital fingerprint.
+IPC_BACKLOG = 128  # Pending connections the kernel queues before refusing
+
+IPC_CONNECTIONS = metrics.gauge("ipc_connections", "Open client connections.")
+IPC_REQUESTS = metrics.counter(
+    "ipc_requests_total",
+    "Request frames served, by outcome (ok, refused, cancelled).",
+    ("outcome",),
+)
+IPC_REQUEST_SECONDS = metrics.histogram(
+    "ipc_request_seconds", "Time from reading a request frame to its reply."
+)
+IPC_INFLIGHT = metrics.gauge("ipc_requests_inflight", "Requests being served.")
+IPC_PROTOCOL_ERRORS = metrics.counter(
+    "ipc_protocol_errors_total", "Connections dropped for malformed frames."
+)
 
 
-# pylint: disable=R0911 # Too many return statements for now, acceptable for IPC
-def send_command_to_agent(command_dict):
+def bind_listeners(
+    host=None, port=None, backlog=None, uds_path=None, tcp=True, reuse_port=False
+):
     """
-    Sends a command to the running Lite Agent daemon via TCP socket.
-    This is the human's voice, delivering commands to the AI's core.
+    Creates the daemon's listening sockets up front, so they can be handed to
+    IPCServer (``sockets=``) in this process or in forked worker processes,
+    which then all accept on the same socket. With reuse_port, the TCP socket
+    sets SO_REUSEPORT so that each worker can bind its own and the kernel
+    balances connections between them.
     """
-    try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect((IPC_HOST, IPC_PORT))
-
-        message = json.dumps(command_dict)
-        client_socket.sendall(message.encode("utf-8"))
-
-        # Receive response from the AI
-        response_data = client_socket.recv(4096).decode("utf-8")
-        response_dict = json.loads(response_data)
-
-        client_socket.close()
-        return response_dict
-    except ConnectionRefusedError:
-        logging.error(
-            "Connection refused. Agent might not be running or is unresponsive. "
-            "The AI is momentarily unresponsive to queries."
+    backlog = IPC_BACKLOG if backlog is None else backlog
+    sockets = []
+    if uds_path:
+        _remove_stale_socket(uds_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(uds_path)
+        os.chmod(uds_path, 0o600)  # Only our user may talk to the agent.
+        sock.listen(backlog)
+        sockets.append(sock)
+    if tcp:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if os.name == "posix":
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(
+            (IPC_HOST if host is None else host, IPC_PORT if port is None else port)
         )
-        if command_dict.get("command") == "stop_daemon" and os.path.exists(PID_FILE):
-            try:
-                with open(PID_FILE, "r", encoding="utf-8") as f:
-                    pid = int(f.read().strip())
-                logging.info(
-                    "Sending SIGTERM to agent with PID %s... "
-                    "A gentle request for the AI to cease operations.",
-                    pid,
+        sock.listen(backlog)
+        sockets.append(sock)
+    for sock in sockets:
+        sock.setblocking(False)
+    return sockets
+
+
+class IPCServer:
+    """
+    Asyncio-based IPC server that serves many clients concurrently.
+    Each connection is handled by its own coroutine, so one slow or stalled
+    client never holds up the others queued behind it.
+
+    The handler_function contract is unchanged: it is called with the parsed
+    command dictionary and returns a JSON-serialisable response, or a (sync or
+    async) generator whose items are streamed back one frame each. Coroutine
+    handlers are awaited on the event loop; plain functions run on the loop's
+    default thread pool so a slow handler does not stall the accept path.
+
+    Pass already-listening sockets (see bind_listeners) to serve on those
+    instead of binding; the server then leaves the socket file to its owner.
+
+    Shutdown is a drain, started by request_stop() (thread-safe) or SIGTERM
+    under start_ipc_server: the listeners close at once, requests arriving on
+    open connections are refused, event subscriptions end, and requests in
+    flight get up to `drain_timeout` seconds to finish before they are
+    cancelled. serve_forever() returns as soon as the server is idle.
+    """
+
+    def __init__(
+        self,
+        handler_function,
+        host=None,
+        port=None,
+        backlog=None,
+        uds_path=None,
+        tcp=True,
+        on_ready=None,
+        sockets=None,
+        drain_timeout=None,
+    ):
+        self.handler_function = handler_function
+        self.on_ready = on_ready
+        self.host = IPC_HOST if host is None else host
+        self.port = IPC_PORT if port is None else port
+        self.backlog = IPC_BACKLOG if backlog is None else backlog
+        self.uds_path = uds_path
+        self.tcp = tcp
+        self.sockets = sockets
+        self.drain_timeout = DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        self.draining = False
+        self.stop_deadline = None  # time.monotonic() by which the drain ends
+        self._owns_socket_file = False
+        self._servers = []
+        self._loop = None
+        self._stop = None
+        self._idle = None
+        self._active = 0
+        self._requests = set()  # Tasks serving a request.
+        self._writers = set()  # Open client connections.
+        self._connections = set()  # Their handler tasks.
+
+    async def start(self):
+        """Binds the listening socket(s) and begins accepting connections."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        if self.sockets:
+            await self._start_on_sockets()
+            return
+        if self.uds_path:
+            _remove_stale_socket(self.uds_path)
+            server = await asyncio.start_unix_server(
+                self._handle_connection, self.uds_path, backlog=self.backlog
+            )
+            os.chmod(self.uds_path, 0o600)  # Only our user may talk to the agent.
+            self._owns_socket_file = True
+            self._servers.append(server)
+            logging.info(
+                "IPC server listening on unix:%s (backlog %s). "
+                "The AI awaits instructions.",
+                self.uds_path,
+                self.backlog,
+            )
+        if self.tcp:
+            server = await asyncio.start_server(
+                self._handle_connection, self.host, self.port, backlog=self.backlog
+            )
+            # Port 0 asks the kernel for a free port; report the one we got.
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+            logging.info(
+                "IPC server listening on %s:%s (backlog %s). "
+                "The AI awaits instructions.",
+                self.host,
+                self.port,
+                self.backlog,
+            )
+
+    async def _start_on_sockets(self):
+        for sock in self.sockets:
+            if sock.family == getattr(socket, "AF_UNIX", None):
+                server = await asyncio.start_unix_server(
+                    self._handle_connection, sock=sock
                 )
-                os.kill(pid, signal.SIGTERM)
-                return {"status": "SIGTERM sent to agent."}
-            except (ValueError, FileNotFoundError, OSError) as e:
-                logging.error(
-                    "Failed to send SIGTERM to PID %s: %s. "
-                    "The AI resists, or is already beyond reach.",
-                    pid,
-                    e,
+            else:
+                server = await asyncio.start_server(self._handle_connection, sock=sock)
+                self.port = sock.getsockname()[1]
+            self._servers.append(server)
+        logging.info(
+            "IPC server accepting on %s inherited socket(s) (pid %s).",
+            len(self.sockets),
+            os.getpid(),
+        )
+
+    async def serve_forever(self):
+        """Starts the server (if needed) and serves until stopped or cancelled."""
+        if not self._servers:
+            await self.start()
+        if self.on_ready is not None:
+            self.on_ready(self)
+        try:
+            await self._stop.wait()
+            await self.drain()
+        finally:
+            self.close()
+
+    def request_stop(self):
+        """Asks serve_forever() to drain and return. Safe from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def drain(self, timeout=None):
+        """
+        Stops accepting work and waits up to timeout seconds for requests in
+        flight, then cancels whatever is left. Returns how many were cancelled.
+        """
+        timeout = self.drain_timeout if timeout is None else timeout
+        self.draining = True
+        self.stop_deadline = time.monotonic() + timeout
+        self._close_listeners()
+        event_bus.close_subscriptions()
+        logging.info(
+            "Draining: %s requests in flight, %ss deadline.", self._active, timeout
+        )
+        while self._active:
+            remaining = self.stop_deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            event_bus.publish(
+                "status",
+                state="draining",
+                pid=os.getpid(),
+                inflight=self._active,
+                remaining=round(remaining, 3),
+            )
+            try:
+                await asyncio.wait_for(self._idle.wait(), min(remaining, 1.0))
+            except asyncio.TimeoutError:
+                logging.info("Draining: %s requests still in flight.", self._active)
+        cancelled = len(self._requests)
+        if cancelled:
+            logging.warning(
+                "Drain deadline passed; cancelling %s requests in flight.", cancelled
+            )
+            for task in list(self._requests):
+                task.cancel()
+            await asyncio.gather(*self._requests, return_exceptions=True)
+        # Idle persistent connections would otherwise keep their handlers alive.
+        for writer in list(self._writers):
+            writer.close()
+        if self._connections:
+            # Let the handlers see the end of the stream and return; handlers
+            # cancelled by the loop's shutdown instead log a spurious error.
+            await asyncio.wait(list(self._connections), timeout=1.0)
+        logging.info("IPC server drained.")
+        return cancelled
+
+    def close(self):
+        """Stops accepting new connections and removes the socket file."""
+        self._close_listeners()
+
+    def _close_listeners(self):
+        servers, self._servers = self._servers, []
+        for server in servers:
+            server.close()
+        if self._owns_socket_file and os.path.exists(self.uds_path):
+            self._owns_socket_file = False
+            os.remove(self.uds_path)
+
+    async def _handle_connection(self, reader, writer):
+        # Connections are persistent: keep serving framed requests until the
+        # client closes its end. Requests tagged with an ID run concurrently
+        # and may complete out of order, which is what lets a client pipeline
+        # many requests; untagged ones are served in sequence.
+        channel = _Channel(writer)
+        inflight = {}
+        self._writers.add(writer)
+        self._connections.add(asyncio.current_task())
+        IPC_CONNECTIONS.inc()
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except ProtocolError as err:
+                    IPC_PROTOCOL_ERRORS.inc()
+                    # After a framing error the byte stream cannot be
+                    # resynchronised, so report it and drop the connection.
+                    logging.error(
+                        "Error processing IPC command: %s. "
+                        "Miscommunication in the digital ether.",
+                        err,
+                    )
+                    await channel.send({"response": {"error": str(err)}})
+                    break
+                if message is None:
+                    break
+                request_id = message.get("id") if isinstance(message, dict) else None
+                if isinstance(message, dict) and "cancel" in message:
+                    task = inflight.get(message["cancel"])
+                    if task is not None:
+                        task.cancel()
+                elif isinstance(message, dict) and "credit" in message:
+                    channel.grant(message["credit"], message.get("n", 1))
+                elif isinstance(request_id, (int, str)):
+                    task = asyncio.ensure_future(
+                        self._serve_envelope(message, channel, request_id)
+                    )
+                    inflight[request_id] = task
+                    task.add_done_callback(
+                        lambda _, rid=request_id: inflight.pop(rid, None)
+                    )
+                else:
+                    await self._serve_envelope(message, channel, None)
+        except (ConnectionError, OSError) as err:
+            logging.error("IPC connection error: %s", err)
+        finally:
+            # Nobody is left to read the replies of abandoned requests.
+            for task in list(inflight.values()):
+                task.cancel()
+            self._writers.discard(writer)
+            self._connections.discard(asyncio.current_task())
+            IPC_CONNECTIONS.dec()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _serve_envelope(self, message, channel, request_id):
+        if self.draining:
+            IPC_REQUESTS.inc("refused")
+            await channel.send(
+                {"response": {"error": "Agent is shutting down.", "draining": True}},
+                request_id,
+            )
+            return
+        task = asyncio.current_task()
+        self._requests.add(task)
+        self._active += 1
+        self._idle.clear()
+        IPC_INFLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self._serve_message(message, channel, request_id)
+            IPC_REQUESTS.inc("ok")
+        except asyncio.CancelledError:
+            IPC_REQUESTS.inc("cancelled")
+            if self.draining:
+                # Cut off by the drain deadline: tell the client why.
+                try:
+                    await channel.send(
+                        {
+                            "response": {
+                                "error": "Request cancelled: the agent shut down.",
+                                "draining": True,
+                            }
+                        },
+                        request_id,
+                    )
+                except (ConnectionError, OSError):
+                    pass
+            raise
+        finally:
+            IPC_INFLIGHT.dec()
+            IPC_REQUEST_SECONDS.observe(time.perf_counter() - started)
+            self._active -= 1
+            self._requests.discard(task)
+            if not self._active:
+                self._idle.set()
+
+    async def _serve_message(self, message, channel, request_id):
+        if not isinstance(message, dict):
+            await self._serve_request(message, channel, request_id)
+            return
+        spill = bool(message.get("shm"))
+        if "request_shm" in message:
+            await self._serve_shared_request(message, channel, request_id)
+        elif "batch" in message:
+            await self._serve_batch(message["batch"], channel, request_id, spill)
+        elif "request" in message:
+            await self._serve_request(
+                message["request"], channel, request_id, spill, message.get("window")
+            )
+        else:
+            await self._serve_request(message, channel, request_id)
+
+    async def _serve_shared_request(self, message, channel, request_id):
+        """Serves a request the client placed in shared memory."""
+        loop = asyncio.get_running_loop()
+        try:
+            command_dict = await loop.run_in_executor(
+                None, _read_shared, message["request_shm"]
+            )
+        except (OSError, KeyError, TypeError, ProtocolError) as err:
+            logging.error("Could not read shared-memory request: %s", err)
+            try:
+                await self._send_response(
+                    channel,
+                    {"error": f"Shared-memory request unavailable: {err}"},
+                    request_id,
                 )
-                return {"error": f"Failed to stop agent: {e}"}
-        return {"error": "Agent not running or connection refused."}
-    except (socket.error, json.JSONDecodeError) as err:
-        logging.error(
-            "Error sending command to agent: %s. A glitch in the human-AI matrix.", err
+            except (ConnectionError, OSError) as send_err:
+                logging.error("IPC connection error while replying: %s", send_err)
+            return
+        await self._serve_request(
+            command_dict, channel, request_id, True, message.get("window")
         )
-        return {"error": f"IPC communication error: {err}"}
 
+    async def _serve_request(  # pylint: disable=too-many-arguments
+        self, command_dict, channel, request_id=None, spill=False, window=None
+    ):
+        try:
+            if not isinstance(command_dict, dict):
+                result = {"error": "A request must be a JSON object."}
+            else:
+                result = await self._call_handler(command_dict)
+            if inspect.isgenerator(result) or inspect.isasyncgen(result):
+                await self._stream_reply(result, channel, request_id, window)
+                return
+            await self._send_response(channel, result, request_id, spill)
+        except (ConnectionError, OSError) as err:
+            logging.error("IPC connection error while replying: %s", err)
+
+    async def _serve_batch(self, commands, channel, request_id=None, spill=False):
+        """
+        Runs a list of commands in order and answers with one frame.
+        Every command gets its own entry in "results", so one failure does not
+        abort the rest of the batch.
+        """
+        try:
+            if not isinstance(commands, list):
+                await self._send_response(
+                    channel, {"error": "A batch must be a JSON array."}, request_id
+                )
+                return
+            results = []
+            for command_dict in commands:
+                if not isinstance(command_dict, dict):
+                    results.append({"error": "A request must be a JSON object."})
+                    continue
+                result = await self._call_handler(command_dict)
+                if inspect.isgenerator(result) or inspect.isasyncgen(result):
+                    items = [item async for item in _iterate(result)]
+                    result = {"items": items, "count": len(items)}
+                results.append(result)
+            await self._send_response(channel, {"results": results}, request_id, spill)
+        except (ConnectionError, OSError) as err:
+            logging.error("IPC connection error while replying: %s", err)
+
+    async def _send_response(self, channel, result, request_id, spill=False):
+        try:
+            if spill and isinstance(result, (bytes, bytearray, memoryview)):
+                # Binary replies go into the segment as they are: no JSON.
+                await channel.send({"shm": shm.share(result), "raw": True}, request_id)
+                return
+            if spill:
+                payload = encode_payload(result)
+                if len(payload) > shm.SHM_THRESHOLD:
+                    # Only the handle crosses the socket; the client claims
+                    # (and unlinks) the segment when it reads the reply.
+                    await channel.send({"shm": shm.share(payload)}, request_id)
+                    return
+            await channel.send({"response": result}, request_id)
+        except (TypeError, ValueError) as err:
+            logging.error("Unserialisable IPC response: %s", err)
+            await channel.send(
+                {"response": {"error": f"Unserialisable response: {err}"}},
+                request_id,
+            )
+
+    async def _stream_reply(self, stream, channel, request_id, window=None):
+        """
+        Sends each element of a handler's generator as its own frame.
+        A client that asked for a `window` gets at most that many items ahead
+        of the credit it has granted, so a slow reader holds the producer
+        back instead of buffering the stream.
+        """
+        end = {"end": True}
+        count = 0
+        credit = channel.open_window(request_id, window)
+        try:
+            async for item in _iterate(stream):
+                if credit is not None:
+                    await credit.acquire()
+                await channel.send({"item": item}, request_id)
+                count += 1
+        except (ConnectionError, OSError):
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            logging.exception("IPC stream failed after %s items", count)
+            end["error"] = f"Stream error: {err}"
+        finally:
+            channel.close_window(request_id)
+        end["count"] = count
+        await channel.send(end, request_id)
+
+    async def _call_handler(self, command_dict):
+        try:
+            if asyncio.iscoroutinefunction(self.handler_function):
+                return await self.handler_function(command_dict)
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                None, self.handler_function, command_dict
+            )
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except Exception as err:  # pylint: disable=broad-except
+            # A failing handler must not take the whole server down with it.
+            logging.exception("IPC handler failed for %s", command_dict)
+            return {"error": f"Handler error: {err}"}
 
-def start_ipc_server(handler_function):
+
+class _Channel:
+    """
+    The write side of one server connection.
+    Concurrent requests share the socket, so each frame is written and
+    drained under a lock and tagged with the ID of the request it answers.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._lock = asyncio.Lock()
+        self._windows = {}  # request ID -> semaphore of items it may still send
+
+    async def send(self, envelope, request_id=None):
+        if request_id is not None:
+            envelope = dict(envelope, id=request_id)
+        async with self._lock:
+            await write_message(self.writer, envelope)
+
+    def open_window(self, request_id, window):
+        """The credit for a stream, or None if the client set no window."""
+        if request_id is None or not isinstance(window, int) or window < 1:
+            return None
+        self._windows[request_id] = credit = asyncio.Semaphore(window)
+        return credit
+
+    def close_window(self, request_id):
+        self._windows.pop(request_id, None)
+
+    def grant(self, request_id, count):
+        """Lets a stream send `count` more items; unknown streams are ignored."""
+        credit = self._windows.get(request_id)
+        if credit is not None and isinstance(count, int):
+            for _ in range(max(0, count)):
+                credit.release()
+
+
+def _read_shared(handle):
+    # Claims (and unlinks) the segment, then decodes the request in it.
+    with shm.attach(handle) as view:
+        return decode_payload(view)
+
+
+async def _iterate(stream):
+    """
+    Iterates a sync or async generator from the event loop.
+    Sync generators are advanced on the thread pool, one item at a time, so a
+    slow producer never blocks other connections.
+    """
+    if inspect.isasyncgen(stream):
+        async for item in stream:
+            yield item
+        return
+    loop = asyncio.get_running_loop()
+    sentinel = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, stream, sentinel)
+            if item is sentinel:
+                return
+            yield item
+    finally:
+        stream.close()
+
+
+def _remove_stale_socket(path):
+    """Unlinks a leftover socket file, refusing if an agent still answers on it."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(path)
+    else:
+        raise OSError(f"Another agent is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def start_ipc_server(
+    handler_function,
+    host=None,
+    port=None,
+    backlog=None,
+    on_ready=None,
+    sockets=None,
+    drain_timeout=None,
+    on_hangup=None,
+):
     """
     Starts an IPC server (TCP socket) for the agent to listen for
     commands. This is the AI's listening ear, always attuned to human directives.
     The handler_function will be called with the parsed command dictionary.
+    Handlers may return a generator to stream a large reply item by item.
+
+    The server runs an asyncio event loop and blocks until interrupted;
+    `backlog` sets how many pending connections the kernel will queue. The
+    transport (TCP loopback, Unix socket, or both) comes from ipc_settings.
+    on_ready, if given, is called with the server once it is listening.
+    sockets, if given, are pre-bound listeners to accept on (pre-fork mode).
+
+    SIGTERM starts a graceful drain (see IPCServer) bounded by drain_timeout.
+    SIGHUP calls on_hangup, if given, on the event loop.
+    Returns the server once it has stopped.
     """
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_socket.bind((IPC_HOST, IPC_PORT))
-    server_socket.listen(1)  # Listen for one incoming connection, focused.
-    logging.info(
-        "IPC server listening on %s:%s. The AI awaits instructions.", IPC_HOST, IPC_PORT
+    settings = ipc_settings()
+    server = IPCServer(
+        handler_function,
+        host=settings["host"] if host is None else host,
+        port=settings["port"] if port is None else port,
+        backlog=backlog,
+        uds_path=settings["uds_path"],
+        tcp=settings["tcp_fallback"],
+        on_ready=on_ready,
+        sockets=sockets,
+        drain_timeout=drain_timeout,
     )
-
     try:
-        while True:
-            conn, _ = server_socket.accept()
-            try:
-                data = conn.recv(4096).decode("utf-8")
-                command_dict = json.loads(data)
-
-                # Process command using the provided handler function.
-                # The AI interprets human intent.
-                response = handler_function(command_dict)
-
-                conn.sendall(json.dumps(response).encode("utf-8"))
-            except (socket.error, json.JSONDecodeError) as err:
-                logging.error(
-                    "Error processing IPC command: %s. "
-                    "Miscommunication in the digital ether.",
-                    err,
-                )
-                conn.sendall(json.dumps({"error": str(err)}).encode("utf-8"))
-            finally:
-                conn.close()
+        asyncio.run(_serve_until_signalled(server, on_hangup))
     except KeyboardInterrupt:
         logging.info("IPC server shutting down. The AI's ear closes.")
+    return server
+
+
+async def _serve_until_signalled(server, on_hangup=None):
+    loop = asyncio.get_running_loop()
+    # Handled on the loop, not in raw signal handlers, so the drain can run
+    # instead of the process exiting mid-request, and a reload never
+    # interrupts a command halfway through.
+    handlers = {signal.SIGTERM: server.request_stop}
+    if on_hangup is not None and hasattr(signal, "SIGHUP"):
+        handlers[signal.SIGHUP] = on_hangup
+    installed = []
+    for signum, callback in handlers.items():
+        try:
+            loop.add_signal_handler(signum, callback)
+            installed.append(signum)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # No signal support on this loop, platform or thread.
+    try:
+        await server.serve_forever()
     finally:
-        server_socket.close()
+        for signum in installed:
+            loop.remove_signal_handler(signum)
 
 
-# Example handler for agent core
-def agent_command_handler(command_dict):
+async def agent_command_handler(command_dict):
     """
-    Placeholder function to handle incoming commands for the agent core.
-    This is where the AI's logic receives and processes the human's commands.
+    Handles incoming commands for the agent core.
+    This is where the AI's logic receives and processes the human's commands:
+    each command is looked up in the registry (see commands.py) and run under
+    its own timeout and execution mode.
     """
-    command = command_dict.get("command")
-    if command == "status":
-        return {"status": "Agent is running", "uptime": "X hours"}
-    if command == "reload_config":
-        return {"status": "Config reloaded"}
-    if command == "stop_daemon":  # Added for CLI to stop agent
-        # In a real daemon, this would signal the main loop to exit.
-        # The AI processes the request for a graceful pause.
-        # import agent_core
-        # agent_core.AGENT_RUNNING = False
-        return {"status": "Stop command received by IPC server."}
-    return {"error": f"Unknown command: {command}. The AI does not comprehend."}
+    return await registry.dispatch(command_dict)
 
 
 if __name__ == "__main__":
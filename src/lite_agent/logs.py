@@ -0,0 +1,257 @@
+# src/lite_agent/logs.py
+"""
+Non-blocking logging for the Lite Agent daemon.
+The AI's diary: jotted down in passing, written up later, recent pages at hand.
+
+Once daemonized, the daemon's stdout and stderr point at /dev/null, so it
+logs through a pipeline of its own:
+
+* The root logger's only handler formats each record, puts it on a bounded
+  queue and returns. Code on the request path never waits for the disk. If
+  the disk stalls long enough for the queue to fill up, records are dropped
+  and counted rather than blocking the caller.
+* A background thread takes records off the queue and hands them to a
+  size-rotated log file (``log_file``, ``log_max_bytes``, ``log_backups``)
+  and to an in-memory ring buffer of the last ``log_buffer_size`` records.
+* The ``logs`` command tails and filters the ring buffer without touching
+  the file.
+
+A process forked from the daemon has no writer thread, so it drops the queue
+handler; pre-fork workers start a pipeline of their own with their own file.
+"""
+
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from .commands import command
+from .config import CONFIG_DIR
+from .metrics import metrics
+
+LOG_FILE = os.path.join(CONFIG_DIR, "agent.log")
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # Rotate the log file at this size.
+DEFAULT_BACKUPS = 5  # Rotated files kept: agent.log.1 ... agent.log.5.
+DEFAULT_BUFFER_SIZE = 1000  # Records kept in memory for the logs command.
+DEFAULT_TAIL = 100  # Records returned by the logs command by default.
+QUEUE_SIZE = 10000  # Records waiting for the writer before new ones are dropped.
+
+
+def log_path(config_data, worker_index=None):
+    """
+    The file this process logs to, or None for the ring buffer only.
+    Pre-fork workers each get their own file: "agent.log" becomes
+    "agent.0.log", "agent.1.log", ...
+    """
+    path = config_data.get("log_file", LOG_FILE)
+    if not path:
+        return None
+    if worker_index is not None:
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{worker_index}{ext}"
+    return path
+
+
+def _parse_level(value):
+    level = logging.getLevelName(str(value).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {value!r}")
+    return level
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent records in memory for tailing."""
+
+    def __init__(self, capacity=DEFAULT_BUFFER_SIZE):
+        super().__init__()
+        self.records = collections.deque(maxlen=capacity)
+
+    @property
+    def capacity(self):
+        return self.records.maxlen
+
+    def emit(self, record):
+        entry = (
+            record.created,
+            record.levelno,
+            record.levelname,
+            record.name,
+            record.getMessage(),
+        )
+        with self.lock:
+            self.records.append(entry)
+
+    def resize(self, capacity):
+        with self.lock:
+            self.records = collections.deque(self.records, maxlen=max(1, capacity))
+
+    def tail(
+        self, lines=DEFAULT_TAIL, level=None, contains=None, logger=None, since=None
+    ):
+        """
+        The last `lines` records, oldest first, that are at least `level`,
+        contain `contains`, come from `logger` (or its children) and were
+        logged after `since` (a Unix time).
+        """
+        with self.lock:
+            entries = list(self.records)
+        selected = []
+        for created, levelno, levelname, name, message in reversed(entries):
+            if len(selected) >= lines:
+                break
+            if since is not None and created <= since:
+                break  # Records are in time order; the rest are older.
+            if level is not None and levelno < level:
+                continue
+            if logger and name != logger and not name.startswith(logger + "."):
+                continue
+            if contains and contains not in message:
+                continue
+            selected.append(
+                {
+                    "time": created,
+                    "level": levelname,
+                    "logger": name,
+                    "message": message,
+                }
+            )
+        selected.reverse()
+        return selected
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue, pipeline):
+        super().__init__(log_queue)
+        self.pipeline = pipeline
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full; the writer thread is emptying it.
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Routes the root logger through a queue to a writer thread."""
+
+    def __init__(self):
+        self.buffer = RingBufferHandler()
+        self.worker_index = None
+        self.dropped = 0
+        self._queue = None
+        self._handler = None  # The root logger's queue handler.
+        self._listener = None
+        self._file = None  # (settings, RotatingFileHandler or None)
+
+    @property
+    def running(self):
+        return self._listener is not None
+
+    def start(self, config_data, worker_index=None):
+        """
+        Replaces the root logger's handlers with the queue, applying the log
+        settings in config_data.
+        """
+        self.stop()
+        self.worker_index = worker_index
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._handler = _DroppingQueueHandler(self._queue, self)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self._handler)
+        self.configure(config_data)
+
+    def configure(self, config_data):
+        """Applies changed log settings; records logged meanwhile are kept."""
+        self.buffer.resize(int(config_data.get("log_buffer_size", DEFAULT_BUFFER_SIZE)))
+        settings = (
+            log_path(config_data, self.worker_index),
+            int(config_data.get("log_max_bytes", DEFAULT_MAX_BYTES)),
+            int(config_data.get("log_backups", DEFAULT_BACKUPS)),
+        )
+        if self._file is not None and self._file[0] == settings:
+            return
+        file_handler = None
+        if settings[0]:
+            os.makedirs(os.path.dirname(os.path.abspath(settings[0])), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                settings[0],
+                maxBytes=settings[1],
+                backupCount=settings[2],
+                encoding="utf-8",
+            )
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        # Stopping the listener writes out what is queued; records logged
+        # until the new one starts wait in the queue.
+        self._stop_listener()
+        self._file = (settings, file_handler)
+        handlers = [self.buffer] + ([file_handler] if file_handler else [])
+        self._listener = _Listener(self._queue, *handlers)
+        self._listener.start()
+
+    def stop(self):
+        """Writes out queued records and gives the root logger back."""
+        if self._handler is not None:
+            logging.getLogger().removeHandler(self._handler)
+            self._handler = None
+        self._stop_listener()
+
+    def _stop_listener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._file is not None:
+            if self._file[1] is not None:
+                self._file[1].close()
+            self._file = None
+
+    def _forget(self):
+        # After fork, in the child: the writer thread did not survive, so
+        # records would only pile up in the queue.
+        if self._handler is not None:
+            logging.getLogger().removeHandler(self._handler)
+        self._handler = self._listener = self._file = self._queue = None
+
+
+# The daemon-wide log pipeline; started by the daemon once it has detached.
+log_pipeline = LogPipeline()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=log_pipeline._forget)  # pylint: disable=W0212
+metrics.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+    function=lambda: log_pipeline.dropped,
+)
+
+
+@command("logs", idempotent=True, timeout=5.0, lane="control")
+def _logs(command_dict):
+    """Tails the in-memory log buffer, optionally filtered."""
+    try:
+        level = command_dict.get("level")
+        since = command_dict.get("since")
+        records = log_pipeline.buffer.tail(
+            lines=int(command_dict.get("lines", DEFAULT_TAIL)),
+            level=None if level is None else _parse_level(level),
+            contains=command_dict.get("contains"),
+            logger=command_dict.get("logger"),
+            since=None if since is None else float(since),
+        )
+    except (TypeError, ValueError) as err:
+        return {"error": str(err)}
+    return {
+        "records": records,
+        "buffer_size": log_pipeline.buffer.capacity,
+        "dropped": log_pipeline.dropped,
+        "now": time.time(),
+    }
@@ -0,0 +1,283 @@
+# src/lite_agent/metrics.py
+"""
+Built-in metrics for the Lite Agent daemon.
+The AI's vital signs, measured as it works and readable at any time.
+
+Subsystems record into three kinds of metric, all kept in process:
+
+* counters - totals that only go up (requests served, jobs failed);
+* gauges - values that go up and down (connections open, jobs running);
+* histograms - fixed-bucket latency distributions with a sum and a count.
+
+A metric may have labels, given as positional values in the order of its
+label names: ``commands.inc("status", "ok")``. Recording is a dictionary
+update under a lock, cheap enough for the request path. Counters and gauges
+may instead be computed by a function when metrics are read, for values a
+subsystem already tracks.
+
+The ``metrics`` command returns a JSON snapshot. The daemon can also rewrite
+a Prometheus text-format file (``metrics_file``) every ``metrics_interval``
+seconds, for node_exporter's textfile collector or any scraper that reads
+files; no metrics service is needed.
+"""
+
+import bisect
+import os
+import threading
+import time
+
+PREFIX = "lite_agent_"
+# Seconds; from sub-millisecond inline commands to slow jobs.
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        # function() returns a number, or a dict of label tuple -> number.
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self):
+        """(labels, value) pairs for every label combination seen."""
+        if self.function is not None:
+            value = self.function()
+            if isinstance(value, dict):
+                return list(value.items())
+            return [((), value)]
+        with self._lock:
+            return list(self._values.items())
+
+    def snapshot(self):
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labels": list(self.labels),
+            "values": [
+                {"labels": dict(zip(self.labels, labels)), "value": value}
+                for labels, value in self.samples()
+            ],
+        }
+
+    def exposition(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for labels, value in self.samples():
+            lines.append(
+                f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    """A total that only increases."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is computed when read."""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """A fixed-bucket distribution of observed values, with sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket (not cumulative) counts, then sum, then count.
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            return [(labels, list(state)) for labels, state in self._values.items()]
+
+    def _cumulative(self, state):
+        total = 0
+        bounds = self.buckets + (float("inf"),)
+        for bound, count in zip(bounds, state):
+            total += count
+            yield bound, total
+
+    def snapshot(self):
+        values = []
+        for labels, state in self.samples():
+            values.append(
+                {
+                    "labels": dict(zip(self.labels, labels)),
+                    "buckets": [
+                        [_format_value(bound), count]
+                        for bound, count in self._cumulative(state)
+                    ],
+                    "sum": state[-2],
+                    "count": state[-1],
+                }
+            )
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labels": list(self.labels),
+            "values": values,
+        }
+
+    def exposition(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for labels, state in self.samples():
+            for bound, count in self._cumulative(state):
+                le = (("le", _format_value(bound)),)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {count}"
+                )
+            suffix = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{suffix} {state[-1]}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class MetricsRegistry:
+    """All metrics of one process, by name. Creating a metric twice returns it."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(PREFIX + name)
+            if metric is None:
+                metric = self._metrics[PREFIX + name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name!r} already exists as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labels=(), function=None):
+        return self._get(Counter, name, documentation, labels, function)
+
+    def gauge(self, name, documentation, labels=(), function=None):
+        return self._get(Gauge, name, documentation, labels, function)
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, documentation, labels, buckets)
+
+    def _sorted(self):
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def snapshot(self):
+        """Every metric as JSON-serialisable data."""
+        return {metric.name: metric.snapshot() for metric in self._sorted()}
+
+    def exposition(self):
+        """Every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._sorted():
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically replaces path with the Prometheus text exposition."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(self.exposition())
+        os.replace(temp, path)  # Scrapers never see a half-written file.
+
+
+# The daemon-wide metrics registry.
+metrics = MetricsRegistry()
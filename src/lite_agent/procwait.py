@@ -0,0 +1,53 @@
+# src/lite_agent/procwait.py
+"""
+Waiting for another process to exit.
+The AI's vigil: no pacing the corridor, just a bell that rings on departure.
+
+``lite-agent stop`` has to wait for a daemon that is not its child, so
+``os.waitpid`` is not an option. On Linux 5.3 and later the wait uses a
+process file descriptor (``os.pidfd_open``), which becomes readable the
+moment the process exits. ``wait_for_exit`` blocks in ``poll`` on it and
+returns with no polling delay. Elsewhere, or if pidfds are not available,
+it falls back to ``psutil.Process.wait``, which polls with a backoff of up
+to 40 ms.
+"""
+
+import os
+import select
+
+
+def wait_for_exit(pid, timeout):
+    """
+    Waits up to `timeout` seconds for process `pid` to exit. Returns True
+    once it is gone (or if it never existed), False if it is still running.
+    """
+    if hasattr(os, "pidfd_open") and hasattr(select, "poll"):
+        try:
+            return _wait_pidfd(pid, timeout)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass  # No pidfd support in this kernel or sandbox.
+    return _wait_psutil(pid, timeout)
+
+
+def _wait_pidfd(pid, timeout):
+    pidfd = os.pidfd_open(pid)
+    try:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        return bool(poller.poll(max(0, int(timeout * 1000))))
+    finally:
+        os.close(pidfd)
+
+
+def _wait_psutil(pid, timeout):
+    import psutil  # pylint: disable=C0415  # Kept off the CLI start-up path.
+
+    try:
+        psutil.Process(pid).wait(timeout)
+    except psutil.NoSuchProcess:
+        return True
+    except psutil.TimeoutExpired:
+        return False
+    return True
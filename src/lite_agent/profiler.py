@@ -0,0 +1,230 @@
+# src/lite_agent/profiler.py
+"""
+On-demand profiling of the running Lite Agent daemon.
+The AI examines its own thoughts, without being put to sleep first.
+
+A slow daemon can be profiled in place over IPC, with no restart:
+
+* ``cprofile`` mode enables cProfile on the event loop thread, where commands
+  are dispatched, and writes a pstats dump (load it with ``pstats`` or
+  snakeviz). It is exact but slows the profiled code down noticeably.
+* ``sample`` mode arms a CPU-time interval timer (ITIMER_PROF); at every tick
+  the SIGPROF handler records the stack of every thread. It writes a
+  collapsed-stack file, one ``frame;frame;frame count`` line per stack, for
+  flamegraph.pl or speedscope. Its cost grows with the sampling rate, not
+  with the amount of code run.
+
+``start_profiler`` may set a duration after which the profile is written
+automatically; otherwise ``stop_profiler`` writes it. Output goes to the
+``profile_dir`` configuration directory. When no profile is running nothing
+is installed (no profile hook, no timer, no signal handler), so profiling
+costs nothing while disabled.
+"""
+
+import asyncio
+import collections
+import cProfile
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+from .commands import command
+from .config import CONFIG_DIR
+from .reload import reloader
+
+MODES = ("cprofile", "sample")
+PROFILE_DIR = os.path.join(CONFIG_DIR, "profiles")
+DEFAULT_SAMPLE_INTERVAL = 0.005  # Seconds of CPU time between samples.
+MIN_SAMPLE_INTERVAL = 0.001
+TOP_ENTRIES = 15  # Hottest functions or stacks included in the reply.
+SAMPLING_SUPPORTED = hasattr(signal, "setitimer") and hasattr(signal, "SIGPROF")
+
+
+def _frame_label(code):
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def _collapse(frame):
+    # Root-first list of frame labels for one stack.
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class Profiler:
+    """Runs at most one cProfile or sampling profile at a time."""
+
+    def __init__(self):
+        self.mode = None
+        self.started = None
+        self.output_dir = PROFILE_DIR
+        self._profile = None
+        self._samples = collections.Counter()
+        self._sample_count = 0
+        self._previous_handler = None
+        self._timer = None  # Handle of the automatic stop, if any.
+
+    @property
+    def running(self):
+        return self.mode is not None
+
+    def start(self, mode="cprofile", interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Starts profiling. cprofile mode watches the calling thread; sample
+        mode must be started on the main thread, which receives SIGPROF.
+        """
+        if self.running:
+            raise RuntimeError(f"A {self.mode} profile is already running.")
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiler mode {mode!r}; expected one of {MODES}")
+        if mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            if not SAMPLING_SUPPORTED:
+                raise RuntimeError("Sampling needs setitimer() and SIGPROF.")
+            if threading.current_thread() is not threading.main_thread():
+                raise RuntimeError("Sampling must be started from the main thread.")
+            interval = max(MIN_SAMPLE_INTERVAL, float(interval))
+            self._samples.clear()
+            self._sample_count = 0
+            self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+            signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        self.mode = mode
+        self.started = time.time()
+
+    def stop(self):
+        """
+        Stops profiling and writes the output file.
+        Returns a summary including the file's path.
+        """
+        if not self.running:
+            raise RuntimeError("No profile is running.")
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        mode, self.mode = self.mode, None
+        elapsed = round(time.time() - self.started, 3)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        os.makedirs(self.output_dir, exist_ok=True)
+        if mode == "cprofile":
+            profile, self._profile = self._profile, None
+            profile.disable()
+            path = os.path.join(
+                self.output_dir, f"cprofile-{os.getpid()}-{stamp}.pstats"
+            )
+            profile.dump_stats(path)
+            profile.create_stats()
+            top = sorted(
+                profile.stats.items(), key=lambda item: item[1][3], reverse=True
+            )[:TOP_ENTRIES]
+            summary = [
+                {
+                    "function": f"{func} ({os.path.basename(filename)}:{line})",
+                    "calls": calls,
+                    "total": round(total, 6),
+                    "cumulative": round(cumulative, 6),
+                }
+                for (filename, line, func), (_, calls, total, cumulative, _) in top
+            ]
+            return {"mode": mode, "path": path, "seconds": elapsed, "top": summary}
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        self._previous_handler = None
+        samples, self._samples = self._samples, collections.Counter()
+        path = os.path.join(self.output_dir, f"sample-{os.getpid()}-{stamp}.collapsed")
+        temp = path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(temp, path)
+        return {
+            "mode": mode,
+            "path": path,
+            "seconds": elapsed,
+            "samples": self._sample_count,
+            "top": [
+                {"stack": stack.rsplit(";", 1)[-1], "samples": count}
+                for stack, count in samples.most_common(TOP_ENTRIES)
+            ],
+        }
+
+    def stop_after(self, seconds):
+        """Stops the profile after seconds, from the running event loop."""
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(seconds, self._stop_on_timer)
+
+    def _stop_on_timer(self):
+        self._timer = None
+        if self.running:
+            result = self.stop()
+            logging.info("Profile written to %s.", result["path"])
+
+    def status(self):
+        if not self.running:
+            return {"running": False}
+        status = {
+            "running": True,
+            "mode": self.mode,
+            "seconds": round(time.time() - self.started, 3),
+        }
+        if self.mode == "sample":
+            status["samples"] = self._sample_count
+        return status
+
+    def _sample(self, signum, frame):  # pylint: disable=unused-argument
+        # SIGPROF handler, on the main thread. `frame` is where the main
+        # thread was interrupted; other threads are read from the interpreter.
+        self._sample_count += 1
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        main = threading.main_thread().ident
+        for ident, thread_frame in sys._current_frames().items():  # pylint: disable=W0212
+            top = frame if ident == main else thread_frame
+            stack = [names.get(ident, f"thread-{ident}")] + _collapse(top)
+            self._samples[";".join(stack)] += 1
+
+
+# The daemon-wide profiler.
+profiler = Profiler()
+
+
+@command("start_profiler", timeout=5.0, lane="control")
+def _start_profiler(command_dict):
+    """Starts a cProfile or sampling profile of the running daemon."""
+    # Runs inline on the event loop: the thread cProfile should watch, and in
+    # the daemon also the main thread, which owns signal handlers.
+    profiler.output_dir = reloader.config.get("profile_dir") or PROFILE_DIR
+    try:
+        profiler.start(
+            command_dict.get("mode", "cprofile"),
+            command_dict.get("interval", DEFAULT_SAMPLE_INTERVAL),
+        )
+    except (RuntimeError, ValueError) as err:
+        return {"error": str(err)}
+    duration = command_dict.get("duration")
+    if duration:
+        profiler.stop_after(float(duration))
+    return {"status": "Profiler started", **profiler.status()}
+
+
+@command("stop_profiler", timeout=30.0, lane="control")
+def _stop_profiler(command_dict):  # pylint: disable=unused-argument
+    """Stops the running profile and writes it to the profile directory."""
+    try:
+        return profiler.stop()
+    except (RuntimeError, OSError) as err:
+        return {"error": str(err)}
+
+
+@command("profiler_status", idempotent=True, timeout=5.0, lane="control")
+def _profiler_status(command_dict):  # pylint: disable=unused-argument
+    """Reports whether a profile is running, and for how long."""
+    return profiler.status()
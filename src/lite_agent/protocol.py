@@ -0,0 +1,139 @@
+# src/lite_agent/protocol.py
+"""
+Wire protocol for Lite Agent IPC.
+The grammar shared by human and AI, so no word is lost in transit.
+
+Every message is a frame: a 4-byte big-endian unsigned length followed by
+exactly that many bytes of UTF-8 encoded JSON. Frames may be split across any
+number of TCP segments; readers always reassemble the full frame before
+decoding it, and refuse frames larger than a configurable limit so a single
+peer can never make the other side buffer unbounded data.
+
+Replies from the daemon are wrapped in a small envelope:
+
+* ``{"response": {...}}`` - the complete reply to a request.
+* ``{"item": ...}`` - one element of a streamed reply; more will follow.
+* ``{"end": true, "count": n}`` - terminates a streamed reply (may also carry
+  an ``"error"`` key if the stream failed part-way through).
+* ``{"shm": {...}}`` - the reply was too large for the socket and was placed
+  in a shared-memory segment instead (only sent to clients that opted in; see
+  shm.py). ``"raw": true`` marks a binary reply, stored without JSON.
+
+Clients that opt in may likewise send ``{"id": n, "request_shm": {...}}``
+in place of a request too large for the socket.
+
+Streaming lets a handler produce a large result incrementally, one bounded
+frame at a time, so neither side ever holds the whole payload in memory.
+"""
+
+import json
+import struct
+
+HEADER = struct.Struct("!I")  # Payload length, network byte order.
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024  # Refuse single frames above 64 MiB.
+_RECV_CHUNK = 256 * 1024  # Upper bound on a single recv() call.
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends data that violates the framing protocol."""
+
+
+class MessageTooLarge(ProtocolError):
+    """Raised when a frame exceeds the receiver's size limit."""
+
+
+def encode_payload(obj):
+    """Serialises obj to the compact UTF-8 JSON carried inside a frame."""
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def encode_message(obj):
+    """Serialises obj to JSON and prefixes it with its length."""
+    payload = encode_payload(obj)
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_payload(payload):
+    """Decodes a frame payload (any bytes-like object) into a Python object."""
+    try:
+        return json.loads(str(payload, "utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as err:
+        raise ProtocolError(f"Malformed message payload: {err}") from err
+
+
+def _check_length(length, max_size):
+    if length > max_size:
+        raise MessageTooLarge(
+            f"Message of {length} bytes exceeds the {max_size} byte limit."
+        )
+
+
+def _recv_exactly(sock, size):
+    """Reads exactly size bytes from a blocking socket, or None on clean EOF."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], min(size - received, _RECV_CHUNK))
+        if n == 0:
+            if received == 0:
+                return None
+            raise ProtocolError("Connection closed in the middle of a frame.")
+        received += n
+    return buf
+
+
+def send_message(sock, obj):
+    """Writes one framed message to a blocking socket."""
+    sock.sendall(encode_message(obj))
+
+
+def recv_message(sock, max_size=MAX_MESSAGE_SIZE):
+    """
+    Reads one framed message from a blocking socket.
+    Returns None if the peer closed the connection between messages.
+    """
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    _check_length(length, max_size)
+    payload = _recv_exactly(sock, length) if length else b""
+    if payload is None:
+        raise ProtocolError("Connection closed before the frame payload arrived.")
+    return decode_payload(payload)
+
+
+async def read_message(reader, max_size=MAX_MESSAGE_SIZE):
+    """
+    Reads one framed message from an asyncio StreamReader.
+    Returns None if the peer closed the connection between messages.
+    """
+    header = await reader.read(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        header += await _read_exactly(reader, HEADER.size - len(header))
+    (length,) = HEADER.unpack(header)
+    _check_length(length, max_size)
+    return decode_payload(await _read_exactly(reader, length))
+
+
+async def _read_exactly(reader, size):
+    # Read in bounded chunks instead of readexactly() so a truncated frame
+    # surfaces as ProtocolError, the same as on the blocking path.
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = await reader.read(min(remaining, _RECV_CHUNK))
+        if not chunk:
+            raise ProtocolError("Connection closed in the middle of a frame.")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+async def write_message(writer, obj):
+    """Writes one framed message to an asyncio StreamWriter and drains it."""
+    writer.write(encode_message(obj))
+    await writer.drain()
@@ -0,0 +1,148 @@
+# src/lite_agent/readiness.py
+"""
+Start-up readiness notification for the Lite Agent daemon.
+The AI's first words, "I'm listening", said only once it truly is.
+
+``lite-agent start`` hands the daemon the write end of a pipe, naming its
+descriptor in ``LITE_AGENT_READY_FD``, and blocks reading the other end. Once
+the IPC server is listening the daemon writes ``READY=1`` and its PID (the
+same ``KEY=value`` lines as systemd's sd_notify) and closes the pipe. If the
+daemon dies first, every copy of the write end is closed and the launcher
+reads end-of-file at once, instead of waiting out a timeout.
+
+When started by systemd with ``Type=notify`` (and ``NotifyAccess=all``, since
+the daemon forks), the same message also goes to ``NOTIFY_SOCKET``.
+
+Each channel is used once and then closed or forgotten, so processes forked
+later (restarted pre-fork workers, process pools) cannot write to a reused
+descriptor.
+
+Passing a pipe to a child and waiting on it with ``select`` needs POSIX
+(``PIPE_SUPPORTED``). Elsewhere the launcher falls back to
+``poll_for_ready``, which probes the daemon every ``POLL_INTERVAL`` seconds
+until it answers or the launched process fails.
+"""
+
+import logging
+import os
+import select
+import socket
+import time
+
+READY_FD_ENV = "LITE_AGENT_READY_FD"
+NOTIFY_SOCKET_ENV = "NOTIFY_SOCKET"
+START_TIMEOUT = 10.0  # Seconds the launcher waits for the daemon to be ready.
+POLL_INTERVAL = 0.1  # Seconds between probes when no pipe can be passed.
+# Windows can neither pass a descriptor to a child nor select() on a pipe.
+PIPE_SUPPORTED = os.name == "posix"
+
+_ready_fd = None
+_notify_socket = None
+_main_pid = None
+
+
+def claim_from_environment():
+    """
+    Takes the notification channels passed down by the launcher, removing
+    them from the environment so that child programs do not inherit them.
+    Call it in the process that owns the PID file.
+    """
+    global _ready_fd, _notify_socket, _main_pid  # pylint: disable=W0603
+    _main_pid = os.getpid()
+    _notify_socket = os.environ.pop(NOTIFY_SOCKET_ENV, None) or None
+    value = os.environ.pop(READY_FD_ENV, None)
+    if value is None:
+        return
+    try:
+        fd = int(value)
+        os.fstat(fd)
+    except (ValueError, OSError):
+        logging.warning("Ignoring %s=%r: not an open descriptor.", READY_FD_ENV, value)
+        return
+    os.set_inheritable(fd, False)
+    _ready_fd = fd
+
+
+def notify_ready(main_pid=None):
+    """
+    Reports that the daemon is serving. Only the first call in a process
+    sends anything; failures are logged, never raised.
+    """
+    global _ready_fd, _notify_socket  # pylint: disable=W0603
+    pid = main_pid or _main_pid or os.getpid()
+    message = f"READY=1\nMAINPID={pid}\n".encode()
+    fd, _ready_fd = _ready_fd, None
+    if fd is not None:
+        try:
+            os.write(fd, message)
+        except OSError as err:
+            # The launcher gave up waiting; the daemon runs on regardless.
+            logging.debug("Readiness pipe write failed: %s", err)
+        finally:
+            os.close(fd)
+    address, _notify_socket = _notify_socket, None
+    if address:
+        if address.startswith("@"):
+            address = "\0" + address[1:]  # Linux abstract namespace.
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+                sock.sendto(message, address)
+        except OSError as err:
+            logging.warning("Could not notify %s: %s", address, err)
+
+
+def release():
+    """Closes the readiness pipe without reporting anything."""
+    global _ready_fd  # pylint: disable=W0603
+    fd, _ready_fd = _ready_fd, None
+    if fd is not None:
+        os.close(fd)
+
+
+def wait_for_ready(fd, timeout=START_TIMEOUT):
+    """
+    Launcher side: reads the readiness pipe until the daemon reports.
+    Returns the reported fields (e.g. {"READY": "1", "MAINPID": "123"}), None
+    if the daemon exited without reporting, or raises TimeoutError.
+    """
+    deadline = time.monotonic() + timeout
+    data = b""
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"The agent was not ready after {timeout:g} seconds.")
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if not readable:
+            continue
+        chunk = os.read(fd, 4096)
+        data += chunk
+        fields = dict(
+            line.split("=", 1)
+            for line in data.decode(errors="replace").splitlines()
+            if "=" in line
+        )
+        if fields.get("READY") == "1":
+            return fields
+        if not chunk:
+            return None
+
+
+def poll_for_ready(process, probe, timeout=START_TIMEOUT, interval=POLL_INTERVAL):
+    """
+    Launcher side without a pipe: calls `probe` until it returns the daemon's
+    PID. Returns the same fields as wait_for_ready, None if `process` (the
+    launched subprocess.Popen) exits with an error first, or raises
+    TimeoutError. A launcher that exits cleanly may have handed over to a
+    detached daemon, so polling goes on.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        pid = probe()
+        if pid is not None:
+            return {"READY": "1", "MAINPID": str(pid)}
+        if process.poll():
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"The agent was not ready after {timeout:g} seconds.")
+        time.sleep(min(interval, remaining))
@@ -0,0 +1,243 @@
+# src/lite_agent/reload.py
+"""
+Live configuration reload for the Lite Agent daemon.
+New standing orders, taken in stride: the AI adjusts without a restart.
+
+On SIGHUP or a ``reload_config`` command the daemon re-reads its
+configuration file. An ``update_config`` command, sent by ``lite-agent config
+set``, carries the changed settings itself. Either way the daemon compares
+the result with the configuration it is running and hands only the changed
+settings to the subsystems that own them. Each
+subsystem registers a hook for the keys it can change in place:
+
+    @reloader.on_change("io_workers", "cpu_workers")
+    def _resize_pools(config_data, changed): ...
+
+Settings that shape the process itself (listening sockets, the number of
+pre-fork workers, the durable queue's location) cannot change in place. A
+reload reports them under ``restart_required`` and keeps their old values.
+Nothing is restarted, so warm caches and client connections survive.
+
+In the daemon, reloads run on the IPC event loop, where the admission
+controller lives. Hooks that touch loop-owned state run there and must be
+quick; hooks registered with ``blocking=True`` (reconfiguring the log
+pipeline, resizing pools, importing modules) run on the loop's thread pool,
+so a reload never stalls the connections being served.
+"""
+
+import asyncio
+import json
+import logging
+
+from .commands import command
+from .config import load_config
+from .events import event_bus
+
+# Settings read once at start-up; changing them needs a restart.
+RESTART_KEYS = frozenset(
+    (
+        "ipc_transport",
+        "ipc_host",
+        "ipc_port",
+        "ipc_socket_path",
+        "ipc_tcp_fallback",
+        "ipc_workers",
+        "ipc_reuse_port",
+        "durable_queue",
+        "queue_path",
+    )
+)
+_MISSING = object()
+
+
+def changed_keys(old, new):
+    """The sorted keys whose values differ between two configurations."""
+    return sorted(
+        key
+        for key in set(old) | set(new)
+        if old.get(key, _MISSING) != new.get(key, _MISSING)
+    )
+
+
+def _restore(config_data, old, keys):
+    # Puts the running values of keys back into config_data.
+    for key in keys:
+        if key in old:
+            config_data[key] = old[key]
+        else:
+            config_data.pop(key, None)
+
+
+class _Pass:
+    """One reload in progress: the configuration being built and its outcome."""
+
+    def __init__(self, old, config_data):
+        self.old = old
+        self.new = dict(config_data)
+        changed = changed_keys(old, self.new)
+        self.restart = [key for key in changed if key in RESTART_KEYS]
+        _restore(self.new, old, self.restart)
+        self.live = set(changed) - set(self.restart)
+        self.errors = {}
+
+    def hooks(self, registered):
+        """The hooks to run, with the keys each one is handed."""
+        for name, (keys, func, blocking) in list(registered.items()):
+            hit = sorted(keys & self.live)
+            if hit:
+                yield name, func, blocking, hit
+
+    def failed(self, name, hit, err):
+        logging.error("Config reload hook %s failed", name, exc_info=err)
+        self.errors[name] = str(err)
+        # Keep the old values so that the next reload retries them.
+        _restore(self.new, self.old, hit)
+        self.live -= set(hit)
+
+
+class ConfigReloader:
+    """Tracks the running configuration and applies changes through hooks."""
+
+    def __init__(self, loader=None):
+        self.loader = loader or (lambda: load_config(strict=True))
+        self.config = {}
+        self.reloads = 0
+        # Set in pre-fork mode: asks the supervisor to reload every worker.
+        self.broadcast = None
+        self._hooks = {}  # hook name -> (keys, func, blocking)
+        self._serial = None  # (loop, asyncio.Lock) for reload_async
+
+    def on_change(self, *keys, blocking=False):
+        """
+        Decorator registering func(config_data, changed) for the given keys.
+        A hook registered again under the same name replaces the old one.
+        Hooks that may block (join a thread, open files, import modules) set
+        `blocking`; reload_async runs those on the loop's thread pool.
+        """
+
+        def _register(func):
+            self._hooks[func.__qualname__] = (frozenset(keys), func, blocking)
+            return func
+
+        return _register
+
+    def start(self, config_data):
+        """Records the configuration the daemon started with."""
+        self.config = dict(config_data)
+
+    def reload(self, config_data=None):
+        """
+        Applies config_data (by default, the configuration file re-read) and
+        returns a summary of what changed. Every hook runs in the calling
+        thread; on the event loop, use reload_async.
+        """
+        config_data, error = self._read(config_data)
+        if error:
+            return error
+        run = _Pass(self.config, config_data)
+        for name, func, _, hit in run.hooks(self._hooks):
+            try:
+                func(run.new, hit)
+            except Exception as err:  # pylint: disable=broad-except
+                run.failed(name, hit, err)
+        return self._finish(run)
+
+    async def reload_async(self, config_data=None):
+        """
+        reload() for the event loop: the file is read, and blocking hooks
+        run, on the loop's thread pool, so connections are served meanwhile.
+        The other hooks own loop state and run on the loop, in between.
+        Concurrent reloads are applied one after the other.
+        """
+        loop = asyncio.get_running_loop()
+        if self._serial is None or self._serial[0] is not loop:
+            self._serial = (loop, asyncio.Lock())
+        async with self._serial[1]:
+            if config_data is None:
+                config_data, error = await loop.run_in_executor(None, self._read, None)
+            else:
+                config_data, error = self._read(config_data)
+            if error:
+                return error
+            run = _Pass(self.config, config_data)
+            for name, func, blocking, hit in run.hooks(self._hooks):
+                try:
+                    if blocking:
+                        await loop.run_in_executor(None, func, run.new, hit)
+                    else:
+                        func(run.new, hit)
+                except Exception as err:  # pylint: disable=broad-except
+                    run.failed(name, hit, err)
+            return self._finish(run)
+
+    def _read(self, config_data):
+        # Returns (config_data, None) or (None, error reply).
+        if config_data is None:
+            try:
+                config_data = self.loader()
+            except (OSError, json.JSONDecodeError) as err:
+                logging.error(
+                    "Config reload failed; keeping the running config: %s", err
+                )
+                return None, {"error": f"Could not read the configuration: {err}"}
+        if not isinstance(config_data, dict):
+            return None, {"error": "The configuration must be a JSON object."}
+        return config_data, None
+
+    def _finish(self, run):
+        self.config = run.new
+        self.reloads += 1
+        live = sorted(run.live)
+        if run.restart:
+            logging.warning(
+                "Config changes that need a restart: %s", ", ".join(run.restart)
+            )
+        logging.info("Config reloaded: %s", ", ".join(live) or "nothing changed")
+        event_bus.publish("status", state="reloaded", changed=live)
+        result = {
+            "status": "Config reloaded",
+            "changed": live,
+            "restart_required": run.restart,
+        }
+        if run.errors:
+            result["errors"] = run.errors
+        return result
+
+
+# The daemon-wide reloader; hooks are registered as subsystems start.
+reloader = ConfigReloader()
+
+
+@command("reload_config", timeout=10.0, lane="control")
+async def _reload_config(command_dict):  # pylint: disable=unused-argument
+    """Re-reads the agent configuration and applies what changed."""
+    result = await reloader.reload_async()
+    if reloader.broadcast is not None and "error" not in result:
+        # The other pre-fork workers reload too; for this one, that second
+        # reload finds nothing new.
+        reloader.broadcast()
+        result["broadcast"] = True
+    return result
+
+
+@command("update_config", timeout=10.0, lane="control")
+async def _update_config(command_dict):
+    """
+    Applies settings pushed by the CLI after it wrote them to the file:
+    {"settings": {key: value, ...}, "unset": [key, ...]}.
+    """
+    settings = command_dict.get("settings") or {}
+    unset = command_dict.get("unset") or []
+    if not isinstance(settings, dict) or not isinstance(unset, list):
+        return {"error": "settings must be an object and unset a list of keys."}
+    config_data = dict(reloader.config)
+    config_data.update(settings)
+    for key in unset:
+        config_data.pop(key, None)
+    result = await reloader.reload_async(config_data)
+    if reloader.broadcast is not None:
+        # The other pre-fork workers re-read the file, which already holds
+        # the update.
+        reloader.broadcast()
+        result["broadcast"] = True
+    return result
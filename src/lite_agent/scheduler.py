@@ -0,0 +1,625 @@
+# src/lite_agent/scheduler.py
+"""
+Task scheduler for the Lite Agent daemon.
+The agent's sense of time: what to do, and when to do it.
+
+Tasks are kept in a heap ordered by their next fire time. A single scheduler
+thread sleeps on a condition variable until the earliest task is due, so an
+idle agent wakes up only when there is work to start. Task bodies never run
+on the scheduler thread itself; they are handed to a runner (a thread pool by
+default), so a slow task cannot delay other tasks or the IPC server.
+
+Each task may be:
+
+* one-shot (``delay``) or periodic (``interval``), optionally aligned to
+  wall-clock multiples of the interval (``align``: every 5m on the 5m mark);
+* spread out with random ``jitter`` so many agents do not fire in lockstep;
+* bounded by a ``deadline``: a run still going after that many seconds is
+  reported (and cancelled if it has not started yet);
+* given a missed-run policy for slots that passed while the agent was busy
+  or suspended: ``skip`` resumes at the next future slot, ``run_once`` runs
+  once now and resumes, ``catch_up`` runs once per missed slot (capped).
+
+Tasks carry a ``kind`` (``io`` or ``cpu``) that the execution engine (see
+executor.py) uses to pick a thread or process pool once it is installed as
+the runner.
+
+Tasks have a ``priority``, ``normal`` or ``low``. While the host is under
+pressure the resource governor (throttle.py) has the scheduler defer the
+runs of low-priority tasks; a deferred slot is handled by the task's
+missed-run policy once the pressure has passed.
+
+Runs of one task never overlap: a slot that comes due while the previous run
+is still going is counted as an overrun and skipped.
+
+Task bodies are registered by name with the `task_function` decorator; IPC
+clients schedule them by that name, never by arbitrary import path. Tasks
+scheduled over IPC are kept in the durable queue (durable.py) until they are
+unscheduled or, for one-shot tasks, have run, so they survive a restart.
+"""
+
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+from .commands import command
+from .config import as_bool
+from .durable import work_queue
+from .events import event_bus
+from .metrics import metrics
+
+MISSED_POLICIES = ("skip", "run_once", "catch_up")
+PRIORITIES = ("normal", "low")
+DEFER_RECHECK = 5.0  # Seconds between checks on a deferred low-priority task.
+MAX_CATCH_UP = 10  # Upper bound on back-to-back runs for catch_up.
+DEFAULT_RUNNER_WORKERS = 4
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+TASK_RUNS = metrics.counter(
+    "task_runs_total", "Scheduled task runs, by task and outcome.", ("task", "status")
+)
+TASK_SECONDS = metrics.histogram("task_seconds", "Scheduled task run time.", ("task",))
+TASK_MISSED = metrics.counter(
+    "task_missed_slots_total", "Schedule slots missed while late.", ("task",)
+)
+TASK_OVERRUNS = metrics.counter(
+    "task_overruns_total",
+    "Runs skipped because the previous one was running.",
+    ("task",),
+)
+
+# Registered task bodies, by name.
+TASK_FUNCTIONS = {}
+
+
+def task_function(name):
+    """Registers a callable so it can be scheduled by name."""
+
+    def _register(func):
+        TASK_FUNCTIONS[name] = func
+        return func
+
+    return _register
+
+
+def parse_interval(value):
+    """
+    Parses an interval given as seconds or a short string such as "90s",
+    "5m", "1h" or "1d". Returns seconds as a float, or None for None.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else float(value)
+    text = str(value).strip().lower()
+    if text and text[-1] in _UNITS:
+        return float(text[:-1]) * _UNITS[text[-1]]
+    return float(text)
+
+
+def run_repeatedly(func, times, args, kwargs):
+    """Calls func(*args, **kwargs) times times; returns the last result."""
+    # Module-level so it can be shipped to a process pool as well.
+    result = None
+    for _ in range(times):
+        result = func(*args, **kwargs)
+    return result
+
+
+class ScheduledTask:
+    """A task registered with the scheduler, plus its run statistics."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        name,
+        func,
+        interval=None,
+        delay=0.0,
+        jitter=0.0,
+        deadline=None,
+        missed="run_once",
+        align=False,
+        args=(),
+        kwargs=None,
+        function_name=None,
+        kind="io",
+        priority="normal",
+    ):
+        if missed not in MISSED_POLICIES:
+            raise ValueError(
+                f"Unknown missed-run policy {missed!r}; expected {MISSED_POLICIES}"
+            )
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected {PRIORITIES}")
+        interval = parse_interval(interval)
+        if interval is not None and interval <= 0:
+            raise ValueError("A periodic task needs a positive interval.")
+        self.name = name
+        self.func = func
+        self.function_name = function_name or getattr(func, "__name__", repr(func))
+        self.interval = interval
+        self.delay = parse_interval(delay) or 0.0
+        self.jitter = parse_interval(jitter) or 0.0
+        self.deadline = parse_interval(deadline)
+        self.missed = missed
+        self.align = align
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.kind = kind
+        self.priority = priority
+        # Scheduling state, guarded by the scheduler's lock.
+        self.slot = None  # Cadence point of the next run (monotonic clock).
+        self.fire_at = None  # slot plus this run's jitter.
+        self.token = 0  # Invalidates stale heap entries.
+        self.cancelled = False
+        self.record_id = None  # Durable-queue entry, if persisted.
+        self.future = None
+        self.run_id = 0
+        self.run_started = None
+        # Statistics.
+        self.runs = 0
+        self.failures = 0
+        self.misses = 0
+        self.overruns = 0
+        self.deadline_misses = 0
+        self.deferrals = 0
+        self.last_duration = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self.future is not None
+
+    def describe(self, now):
+        next_in = None if self.fire_at is None else max(0.0, self.fire_at - now)
+        return {
+            "name": self.name,
+            "function": self.function_name,
+            "interval": self.interval,
+            "jitter": self.jitter,
+            "deadline": self.deadline,
+            "missed": self.missed,
+            "kind": self.kind,
+            "priority": self.priority,
+            "running": self.running,
+            "next_run_in": None if next_in is None else round(next_in, 3),
+            "next_run_at": None if next_in is None else time.time() + next_in,
+            "runs": self.runs,
+            "failures": self.failures,
+            "misses": self.misses,
+            "overruns": self.overruns,
+            "deadline_misses": self.deadline_misses,
+            "deferrals": self.deferrals,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    """
+    Heap-based timer scheduler running on its own thread.
+    `runner(task, times)` starts a task body and returns a
+    concurrent.futures.Future; the default runs it on a small thread pool.
+    `on_retired(task)` is called when a task leaves the scheduler for good.
+    """
+
+    def __init__(self, runner=None, clock=time.monotonic, on_retired=None):
+        self._runner = runner
+        self._clock = clock
+        self._on_retired = on_retired
+        self._pool = None
+        self._tasks = {}
+        self._heap = []  # (when, seq, kind, task, token)
+        self._seq = itertools.count()
+        self._run_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._deferring = False
+        self._deferred = set()  # Low-priority tasks whose runs are held back.
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the scheduler thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(
+            target=self._loop, name="lite-agent-scheduler", daemon=True
+        )
+        self._thread.start()
+        logging.info("Task scheduler started with %s tasks.", len(self._tasks))
+
+    def stop(self, wait=True):
+        """Stops firing new runs; runs already started are left to finish."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    def set_deferring(self, deferring):
+        """
+        Holds back (or releases) the runs of low-priority tasks. Released
+        tasks fire at once; slots they missed follow their missed policy.
+        """
+        now = self._clock()
+        with self._cond:
+            self._deferring = deferring
+            if deferring:
+                return
+            released, self._deferred = self._deferred, set()
+            for task in released:
+                if not task.cancelled:
+                    task.token += 1
+                    task.fire_at = now
+                    heapq.heappush(
+                        self._heap, (now, next(self._seq), "run", task, task.token)
+                    )
+            self._cond.notify()
+
+    @property
+    def deferred(self):
+        with self._cond:
+            return sorted(task.name for task in self._deferred)
+
+    def set_runner(self, runner):
+        """Replaces the function used to start task bodies."""
+        with self._cond:
+            self._runner = runner
+
+    # --- Task management ---
+
+    def add(self, task, due_in=None):
+        """
+        Adds (or replaces) a task and schedules its first run. `due_in`, in
+        seconds, overrides where its cadence starts and may be negative: a
+        restored task that is overdue then fires at once, and the slots it
+        missed follow its missed-run policy like those of any late task.
+        """
+        now = self._clock()
+        with self._cond:
+            old = self._tasks.get(task.name)
+            if old is not None:
+                old.cancelled = True
+                self._deferred.discard(old)
+                self._retire(old)
+            if due_in is not None:
+                task.slot = now + due_in
+            elif task.align and task.interval:
+                wall = time.time() + task.delay
+                task.slot = now + task.delay + (-wall % task.interval)
+            else:
+                task.slot = now + task.delay
+            self._tasks[task.name] = task
+            self._push(task)
+        event_bus.publish(
+            "tasks", event="scheduled", task=task.name, interval=task.interval
+        )
+        return task
+
+    def schedule(self, name, func, **options):
+        """Convenience wrapper: builds a ScheduledTask and adds it."""
+        return self.add(ScheduledTask(name, func, **options))
+
+    def cancel(self, name):
+        """Removes a task. A run already in progress is allowed to finish."""
+        with self._cond:
+            task = self._tasks.pop(name, None)
+            if task is None:
+                return False
+            task.cancelled = True
+            task.token += 1
+            task.fire_at = None
+            self._deferred.discard(task)
+            self._retire(task)
+            self._cond.notify()
+        event_bus.publish("tasks", event="cancelled", task=name)
+        return True
+
+    def trigger(self, name):
+        """Runs a task now, outside its schedule (unless it is already running)."""
+        with self._cond:
+            task = self._tasks.get(name)
+            if task is None:
+                return False
+            if task.running:
+                return False
+            self._start_run(task, 1)
+        return True
+
+    def get(self, name):
+        with self._cond:
+            return self._tasks.get(name)
+
+    def list(self):
+        now = self._clock()
+        with self._cond:
+            return [self._tasks[name].describe(now) for name in sorted(self._tasks)]
+
+    # --- Internals (called with self._cond held) ---
+
+    def _retire(self, task):
+        if self._on_retired is not None:
+            self._on_retired(task)
+
+    def _push(self, task):
+        task.token += 1
+        task.fire_at = task.slot + (
+            random.uniform(0, task.jitter) if task.jitter else 0
+        )
+        heapq.heappush(
+            self._heap, (task.fire_at, next(self._seq), "run", task, task.token)
+        )
+        self._cond.notify()
+
+    def _loop(self):
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                now = self._clock()
+                when = self._heap[0][0]
+                if when > now:
+                    self._cond.wait(when - now)
+                    continue
+                _, _, kind, task, token = heapq.heappop(self._heap)
+                if kind == "run":
+                    if token == task.token and not task.cancelled:
+                        self._fire(task, now)
+                elif task.run_id == token and task.running:
+                    self._deadline_exceeded(task)
+
+    def _fire(self, task, now):
+        if self._deferring and task.priority == "low":
+            # Keep the slot, so the missed policy applies once released.
+            task.deferrals += 1
+            self._deferred.add(task)
+            task.token += 1
+            task.fire_at = now + DEFER_RECHECK
+            heapq.heappush(
+                self._heap, (task.fire_at, next(self._seq), "run", task, task.token)
+            )
+            return
+        self._deferred.discard(task)
+        times = 1
+        if task.interval:
+            missed = int((now - task.slot) // task.interval)
+            if missed > 0:
+                task.misses += missed
+                TASK_MISSED.inc(task.name, amount=missed)
+                event_bus.publish("tasks", event="missed", task=task.name, slots=missed)
+                if task.missed == "skip":
+                    times = 0
+                elif task.missed == "catch_up":
+                    times = 1 + min(missed, MAX_CATCH_UP)
+            # Advance along the original cadence so runs never drift.
+            task.slot += task.interval * (missed + 1)
+            self._push(task)
+        else:
+            # One-shot tasks leave the table once they fire.
+            task.fire_at = None
+            self._tasks.pop(task.name, None)
+        if times == 0:
+            return
+        if task.running:
+            task.overruns += 1
+            TASK_OVERRUNS.inc(task.name)
+            event_bus.publish("tasks", event="overrun", task=task.name)
+            if not task.interval:
+                self._retire(task)
+            return
+        self._start_run(task, times)
+
+    def _start_run(self, task, times):
+        task.run_id = next(self._run_ids)
+        task.run_started = self._clock()
+        run_id = task.run_id
+        try:
+            future = self._submit(task, times)
+        except (RuntimeError, ValueError) as err:  # Runner shut down or refused.
+            logging.error("Could not start task %s: %s", task.name, err)
+            if not task.interval:
+                self._retire(task)
+            return
+        task.future = future
+        if task.deadline:
+            heapq.heappush(
+                self._heap,
+                (
+                    task.run_started + task.deadline,
+                    next(self._seq),
+                    "deadline",
+                    task,
+                    run_id,
+                ),
+            )
+        event_bus.publish("tasks", event="started", task=task.name, run=run_id)
+        future.add_done_callback(
+            lambda fut: self._finished(task, run_id, fut)  # pylint: disable=W0108
+        )
+
+    def _submit(self, task, times):
+        if self._runner is not None:
+            return self._runner(task, times)
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=DEFAULT_RUNNER_WORKERS,
+                thread_name_prefix="lite-agent-task",
+            )
+        return self._pool.submit(
+            run_repeatedly, task.func, times, task.args, task.kwargs
+        )
+
+    def _deadline_exceeded(self, task):
+        task.deadline_misses += 1
+        # Only a run that has not started can be cancelled outright.
+        cancelled = task.future.cancel()
+        logging.warning(
+            "Task %s exceeded its %ss deadline%s.",
+            task.name,
+            task.deadline,
+            " and was cancelled" if cancelled else "",
+        )
+        event_bus.publish(
+            "tasks",
+            event="deadline_exceeded",
+            task=task.name,
+            run=task.run_id,
+            cancelled=cancelled,
+        )
+
+    def _finished(self, task, run_id, future):
+        with self._cond:
+            if task.run_id != run_id:
+                return
+            task.future = None
+            task.last_duration = round(self._clock() - task.run_started, 6)
+            task.runs += 1
+            if future.cancelled() or isinstance(
+                future.exception(), concurrent.futures.CancelledError
+            ):
+                status, task.last_error = "cancelled", "cancelled"
+            elif future.exception() is not None:
+                task.failures += 1
+                status, task.last_error = "failed", repr(future.exception())
+            else:
+                status, task.last_error = "ok", None
+            duration = task.last_duration
+            if not task.interval and self._tasks.get(task.name) is not task:
+                self._retire(task)  # A one-shot task that has now run.
+        TASK_RUNS.inc(task.name, status)
+        TASK_SECONDS.observe(duration, task.name)
+        if status == "failed":
+            logging.error("Task %s failed: %s", task.name, task.last_error)
+        event_bus.publish(
+            "tasks",
+            event="finished",
+            task=task.name,
+            run=run_id,
+            status=status,
+            duration=duration,
+            error=task.last_error,
+        )
+
+
+def _forget_record(task):
+    if task.record_id is not None:
+        work_queue.ack(task.record_id)
+        task.record_id = None
+
+
+# The daemon-wide scheduler.
+scheduler = Scheduler(on_retired=_forget_record)
+
+
+@task_function("log_heartbeat")
+def log_heartbeat(message="Agent is alive, performing background tasks..."):
+    """A minimal periodic task: logs that the agent is alive."""
+    logging.info(message)
+
+
+# --- IPC commands ---
+
+
+def task_from_command(command_dict):
+    """Builds a ScheduledTask from a schedule_task command."""
+    function_name = command_dict.get("function")
+    func = TASK_FUNCTIONS.get(function_name)
+    if func is None:
+        raise KeyError(
+            f"Unknown task function {function_name!r}; "
+            f"available: {sorted(TASK_FUNCTIONS)}"
+        )
+    return ScheduledTask(
+        command_dict.get("name") or function_name,
+        func,
+        interval=command_dict.get("interval"),
+        delay=command_dict.get("delay", 0),
+        jitter=command_dict.get("jitter", 0),
+        deadline=command_dict.get("deadline"),
+        missed=command_dict.get("missed", "run_once"),
+        align=bool(command_dict.get("align", False)),
+        args=command_dict.get("args", ()),
+        kwargs=command_dict.get("kwargs"),
+        function_name=function_name,
+        kind=command_dict.get("kind", "io"),
+        priority=command_dict.get("priority", "normal"),
+    )
+
+
+def restore_task(record_id, item):
+    """
+    Re-adds a task recovered from the durable queue on its original cadence.
+    Slots that passed while the agent was down are handled by the task's
+    missed-run policy, so a restart does not set off a burst of runs.
+    """
+    task = task_from_command(item["command"])
+    task.record_id = record_id
+    return scheduler.add(task, due_in=item["due_at"] - time.time())
+
+
+@command("schedule_task")
+async def _schedule_task(command_dict):
+    """Schedules a registered task function (one-shot or periodic)."""
+    try:
+        task = task_from_command(command_dict)
+    except (KeyError, ValueError, TypeError) as err:
+        return {"error": str(err).strip("'\"")}
+    if work_queue.is_open and as_bool(command_dict.get("durable", True)):
+        item = {
+            "type": "schedule",
+            "command": {k: v for k, v in command_dict.items() if k != "command"},
+            "due_at": time.time() + task.delay,
+        }
+        task.record_id, committed = work_queue.put_nowait(item)
+        try:
+            await asyncio.wrap_future(committed)
+        except OSError as err:
+            work_queue.ack(task.record_id)
+            return {"error": f"Could not record the task durably: {err}"}
+    scheduler.add(task)
+    return {"status": "scheduled", "task": task.describe(time.monotonic())}
+
+
+@command("unschedule_task")
+def _unschedule_task(command_dict):
+    """Removes a scheduled task by name."""
+    name = command_dict.get("name")
+    if scheduler.cancel(name):
+        return {"status": "unscheduled", "name": name}
+    return {"error": f"No scheduled task named {name!r}."}
+
+
+@command("trigger_task")
+def _trigger_task(command_dict):
+    """Runs a scheduled task immediately."""
+    name = command_dict.get("name")
+    if scheduler.trigger(name):
+        return {"status": "triggered", "name": name}
+    return {"error": f"Task {name!r} is unknown or already running."}
+
+
+@command(
+    "list_tasks",
+    idempotent=True,
+    timeout=5.0,
+    lane="control",
+    cache_ttl=1.0,
+    invalidated_by=("tasks",),
+)
+def _list_tasks(command_dict):  # pylint: disable=unused-argument
+    """Lists scheduled tasks and the task functions available to schedule."""
+    return {"tasks": scheduler.list(), "functions": sorted(TASK_FUNCTIONS)}
@@ -0,0 +1,241 @@
+# src/lite_agent/shm.py
+"""
+Shared-memory side channel for bulk IPC payloads.
+Large thoughts travel by reference, not by value.
+
+Bulk data (arrays, model state, log dumps) is written once into a
+`multiprocessing.shared_memory` segment, and only a small handle,
+``{"__shm__": name, "size": n}``, crosses the IPC socket. A receiver that
+calls `attach()` maps the segment and reads the bytes in place through a
+memoryview.
+
+The IPC layer uses it for clients created with ``IPCClient(shm=True)``:
+
+* Requests whose JSON exceeds `SHM_THRESHOLD` are sent as a handle.
+* Replies that are bytes-like go into a segment as they are, with no JSON
+  encoding, and reach the caller as ``bytes``.
+* Other replies whose JSON exceeds `SHM_THRESHOLD` are spilled too. These
+  still pay for encoding and decoding; only the socket copy is saved.
+
+Lifetime rules, so segments never outlive their usefulness:
+
+* The creator owns a segment until a receiver claims it. `share()` records
+  the segment with a deadline (`DEFAULT_TTL`).
+* `attach()` claims the segment. The receiver unlinks the name as soon as it
+  has mapped it. The memory then lives only as long as the receiver's
+  mapping, and the kernel frees it even if the receiver crashes.
+* If nobody claims a segment before its deadline, the creator unlinks it.
+  A reaper thread, running while segments are outstanding, does so at the
+  deadline, so a client that dies without claiming a reply cannot keep it
+  in /dev/shm. Whatever is left is unlinked at interpreter exit.
+* Segment names embed the creator's PID. `sweep_orphans()` removes segments
+  left behind by a creator that crashed before it could clean up. The daemon
+  runs it at start-up.
+"""
+
+import atexit
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from multiprocessing import shared_memory
+
+SHM_PREFIX = "lite_agent_"
+SHM_THRESHOLD = 256 * 1024  # Replies above this size are spilled to a segment.
+DEFAULT_TTL = 60.0  # Seconds an unclaimed segment is kept alive by its creator.
+_SHM_DIR = "/dev/shm"  # Where POSIX segments appear on Linux.
+
+_outstanding = {}  # name -> (deadline, SharedMemory or None)
+_outstanding_lock = threading.Lock()
+_outstanding_changed = threading.Condition(_outstanding_lock)
+_reaper = None  # The thread unlinking expired segments, while any are left.
+
+
+def _untrack(segment):
+    # Before Python 3.13 every SharedMemory, even one merely attached, is
+    # registered with the resource tracker, which unlinks it at exit. Ownership
+    # is managed explicitly here, so opt out of that.
+    if os.name == "posix" and sys.version_info < (3, 13):
+        # pylint: disable=import-outside-toplevel,protected-access
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(segment._name, "shared_memory")
+
+
+def _open(name, create=False, size=0):
+    if sys.version_info >= (3, 13):
+        # pylint: disable=unexpected-keyword-arg
+        return shared_memory.SharedMemory(
+            name=name, create=create, size=size, track=False
+        )
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    _untrack(segment)
+    return segment
+
+
+def _unlink_segment(segment):
+    if os.name == "posix" and sys.version_info < (3, 13):
+        # SharedMemory.unlink() would also unregister the segment from the
+        # resource tracker, which _untrack() already did.
+        # pylint: disable=import-outside-toplevel,protected-access
+        import _posixshmem
+
+        _posixshmem.shm_unlink(segment._name)
+    else:
+        segment.unlink()
+
+
+def _unlink(name):
+    """Removes a segment by name; missing segments are already gone."""
+    try:
+        segment = _open(name)
+    except FileNotFoundError:
+        return False
+    try:
+        _unlink_segment(segment)
+    except FileNotFoundError:
+        pass
+    finally:
+        segment.close()
+    return True
+
+
+def is_handle(obj):
+    """True if obj is a shared-memory handle produced by share()."""
+    return isinstance(obj, dict) and "__shm__" in obj
+
+
+def share(data, ttl=DEFAULT_TTL):
+    """
+    Copies a bytes-like object into a new shared-memory segment.
+    Returns the handle to send to the receiver.
+    """
+    reap_expired()
+    view = memoryview(data).cast("B")
+    name = f"{SHM_PREFIX}{os.getpid()}_{uuid.uuid4().hex[:16]}"
+    segment = _open(name, create=True, size=max(view.nbytes, 1))
+    segment.buf[: view.nbytes] = view
+    if os.name == "nt":
+        # Windows frees a segment when its last handle closes, so the creator
+        # must keep it open until it is claimed or expires.
+        keep = segment
+    else:
+        segment.close()
+        keep = None
+    global _reaper  # pylint: disable=global-statement
+    with _outstanding_changed:
+        _outstanding[name] = (time.monotonic() + ttl, keep)
+        # A thread from before a fork is not alive in the child.
+        if _reaper is None or not _reaper.is_alive():
+            _reaper = threading.Thread(
+                target=_reap_loop, name="lite-agent-shm-reaper", daemon=True
+            )
+            _reaper.start()
+        else:
+            _outstanding_changed.notify()
+    return {"__shm__": name, "size": view.nbytes}
+
+
+def _reap_loop():
+    global _reaper  # pylint: disable=global-statement
+    while True:
+        with _outstanding_changed:
+            if not _outstanding:
+                _reaper = None
+                return
+            now = time.monotonic()
+            delay = min(deadline for deadline, _ in _outstanding.values()) - now
+            if delay > 0:
+                _outstanding_changed.wait(delay)
+                continue
+        reap_expired()
+
+
+@contextlib.contextmanager
+def attach(handle):
+    """
+    Claims a shared-memory handle and yields a read-only memoryview of it.
+    The segment name is unlinked immediately, so the memory is released when
+    the context exits, or by the kernel if this process dies first.
+    """
+    segment = _open(handle["__shm__"])
+    try:
+        if os.name != "nt":
+            _unlink_segment(segment)
+        view = segment.buf[: handle["size"]].toreadonly()
+        try:
+            yield view
+        finally:
+            view.release()
+    finally:
+        segment.close()
+
+
+def read(handle):
+    """Claims a handle and returns a copy of its contents as bytes."""
+    with attach(handle) as view:
+        return bytes(view)
+
+
+def reap_expired(now=None):
+    """
+    Unlinks segments this process created that nobody claimed in time.
+    Returns how many were still unclaimed.
+    """
+    now = time.monotonic() if now is None else now
+    with _outstanding_lock:
+        expired = [
+            name for name, (deadline, _) in _outstanding.items() if deadline <= now
+        ]
+        entries = [(name, _outstanding.pop(name)[1]) for name in expired]
+    unclaimed = 0
+    for name, segment in entries:
+        if segment is not None:
+            segment.close()
+        if _unlink(name):
+            unclaimed += 1
+            logging.warning("Shared-memory segment %s expired unclaimed.", name)
+    return unclaimed
+
+
+def release_all():
+    """Unlinks every segment this process still owns."""
+    return reap_expired(now=float("inf"))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but belongs to someone else.
+    return True
+
+
+def sweep_orphans():
+    """
+    Removes segments whose creating process no longer exists.
+    Only possible where segments are visible as files (Linux /dev/shm).
+    """
+    if not os.path.isdir(_SHM_DIR):
+        return 0
+    removed = 0
+    for entry in os.listdir(_SHM_DIR):
+        if not entry.startswith(SHM_PREFIX):
+            continue
+        try:
+            pid = int(entry[len(SHM_PREFIX) :].split("_", 1)[0])
+        except ValueError:
+            continue
+        if not _pid_alive(pid) and _unlink(entry):
+            removed += 1
+    if removed:
+        logging.info("Removed %s orphaned shared-memory segments.", removed)
+    return removed
+
+
+atexit.register(release_all)
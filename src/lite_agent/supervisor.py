@@ -0,0 +1,156 @@
+# src/lite_agent/supervisor.py
+"""
+Pre-fork worker supervisor for the Lite Agent daemon.
+One mind, many hands: a watchful parent keeping its workers alive.
+
+In pre-fork mode the daemon process binds the listening sockets, then forks
+N worker processes that inherit them and each run their own event loop and
+command registry. The kernel hands every new connection to one worker, so
+command handling scales across cores instead of sharing one GIL.
+
+The supervisor itself does no IPC work. It owns the PID file, forwards
+SIGTERM and SIGHUP to its workers and restarts any worker that dies. A worker
+that keeps dying right after start-up is restarted with an exponential
+backoff, so a broken configuration cannot turn into a fork storm. The backoff
+waits on the stop request rather than sleeping, so a shutdown that arrives
+meanwhile is not held up and nothing more is restarted.
+"""
+
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+MIN_UPTIME = 1.0  # A worker that dies sooner than this counts as a crash loop.
+MAX_BACKOFF = 30.0  # Seconds; upper bound on the delay before a restart.
+PREFORK_SUPPORTED = hasattr(os, "fork")
+
+
+def resolve_worker_count(value):
+    """Parses the ``ipc_workers`` setting: a number, or "auto" for one per core."""
+    if value in (None, ""):
+        return 1
+    if str(value).strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+class Supervisor:
+    """
+    Forks `workers` processes running worker_main(index) and keeps them alive.
+    worker_main's return value (or SystemExit code) is the worker's exit code.
+    on_started, if given, is called once the initial workers have been forked.
+    """
+
+    def __init__(self, workers, worker_main, on_started=None):
+        self.workers = workers
+        self.worker_main = worker_main
+        self.on_started = on_started
+        self.children = {}  # pid -> worker index
+        self.restarts = 0
+        self._stopping = threading.Event()
+        self._backoff = {}  # index -> current restart delay
+        self._started_at = {}  # pid -> monotonic start time
+        self._previous = {}  # signal handlers to restore in workers
+
+    def run(self):
+        """Starts the workers and supervises them until asked to stop."""
+        if threading.current_thread() is threading.main_thread():
+            # Signal handlers can only be installed from the main thread.
+            self._previous = {
+                signum: signal.signal(signum, self._forward)
+                for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+            }
+        try:
+            for index in range(self.workers):
+                self._spawn(index)
+            if self.on_started is not None:
+                self.on_started()
+            logging.info(
+                "Supervisor %s started %s workers: %s",
+                os.getpid(),
+                self.workers,
+                sorted(self.children),
+            )
+            while self.children:
+                pid, status = os.wait()
+                index = self.children.pop(pid, None)
+                if index is None:
+                    continue
+                self._reap(pid, index, status)
+        finally:
+            for signum, handler in self._previous.items():
+                signal.signal(signum, handler)
+        logging.info("All workers exited; supervisor stopping.")
+
+    def stop(self):
+        """Asks every worker to shut down; run() returns once they have."""
+        self._stopping.set()
+        self._signal_children(signal.SIGTERM)
+
+    def _forward(self, signum, frame):  # pylint: disable=unused-argument
+        if signum == signal.SIGHUP:
+            self._signal_children(signal.SIGHUP)
+            return
+        logging.info("Supervisor received signal %s; stopping workers.", signum)
+        self.stop()
+
+    def _signal_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                # Workers handle their own signals; drop the supervisor's.
+                for signum, handler in self._previous.items():
+                    signal.signal(signum, handler)
+                code = self.worker_main(index) or 0
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else 0
+            except BaseException:  # pylint: disable=broad-except
+                logging.exception("Worker %s crashed.", index)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                # Never fall back into the supervisor's code or atexit hooks.
+                os._exit(code)  # pylint: disable=protected-access
+        self.children[pid] = index
+        self._started_at[pid] = time.monotonic()
+        return pid
+
+    def _reap(self, pid, index, status):
+        uptime = time.monotonic() - self._started_at.pop(pid, 0.0)
+        if hasattr(os, "waitstatus_to_exitcode"):  # Python 3.9+
+            code = os.waitstatus_to_exitcode(status)
+        else:
+            code = status
+        if self._stopping.is_set():
+            logging.info("Worker %s (pid %s) exited with %s.", index, pid, code)
+            return
+        if uptime < MIN_UPTIME:
+            delay = min(MAX_BACKOFF, self._backoff.get(index, 0.5) * 2)
+        else:
+            delay = 0.0
+        self._backoff[index] = delay or 0.5
+        logging.warning(
+            "Worker %s (pid %s) died with %s after %.1fs; restarting in %.1fs.",
+            index,
+            pid,
+            code,
+            uptime,
+            delay,
+        )
+        # Returns early if stop() is called, from a signal handler or a thread.
+        if self._stopping.wait(delay):
+            logging.info("Not restarting worker %s: the supervisor is stopping.", index)
+            return
+        self.restarts += 1
+        self._spawn(index)
@@ -0,0 +1,212 @@
+# src/lite_agent/throttle.py
+"""
+Resource-aware throttling for the Lite Agent daemon.
+The AI as a considerate guest: it eats less when the household is hungry.
+
+The agent often shares a box with the workload that matters. Every
+``throttle_interval`` seconds (default 5) the resource governor takes a
+reading through psutil, which costs about 0.1 ms:
+
+* host CPU use since the previous reading, and the one-minute load average
+  per core;
+* host memory use;
+* the daemon's own CPU use and resident memory.
+
+The host is under pressure while any reading is over its threshold
+(``throttle_cpu_percent``, ``throttle_load_per_cpu``,
+``throttle_memory_percent``, ``throttle_rss_mb``; a threshold of 0 is
+ignored). Under pressure the governor halves a scale factor at every reading,
+down to ``throttle_min_scale``. Once every reading is back under ``RECOVERY``
+of its threshold it raises the factor by ``SCALE_STEP`` per reading, back to
+1. In between it holds the factor steady, so it does not flap.
+
+The factor scales the execution engine's pools and the concurrency of the
+normal and bulk admission lanes. While it is below 1 the scheduler also
+defers low-priority tasks. The control lane is never scaled, so ``status``
+and ``stop_daemon`` always answer.
+
+``throttle_status`` reports the readings, the factor and the limits in
+force. Setting ``throttle`` to false turns the governor off and restores the
+configured limits.
+"""
+
+import asyncio
+import logging
+
+import psutil
+
+from .commands import command, registry
+from .config import as_bool
+from .events import event_bus
+from .executor import engine
+from .metrics import metrics
+from .scheduler import scheduler
+
+DEFAULT_INTERVAL = 5.0  # Seconds between readings.
+DEFAULT_MIN_SCALE = 0.25  # Never throttle below this fraction of the limits.
+RECOVERY = 0.8  # Scale back up once readings are under this share of the limits.
+SCALE_STEP = 0.25  # Added to the scale factor per reading while recovering.
+# reading -> (config key, default threshold; 0 or None disables it)
+THRESHOLDS = {
+    "cpu_percent": ("throttle_cpu_percent", 90.0),
+    "load_per_cpu": ("throttle_load_per_cpu", 1.5),
+    "memory_percent": ("throttle_memory_percent", 90.0),
+    "rss_mb": ("throttle_rss_mb", None),
+}
+
+
+class ResourceGovernor:
+    """Scales the daemon's concurrency down while the host is under pressure."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, job_engine, admission, task_scheduler, sampler=None):
+        self.engine = job_engine
+        self.admission = admission
+        self.scheduler = task_scheduler
+        self.sampler = sampler or self._sample
+        self.enabled = False
+        self.interval = DEFAULT_INTERVAL
+        self.min_scale = DEFAULT_MIN_SCALE
+        self.thresholds = {name: default for name, (_, default) in THRESHOLDS.items()}
+        self.scale = 1.0
+        self.readings = {}
+        self.pressure = []  # Readings over their threshold at the last sample.
+        self.changes = 0
+        self._process = None
+        self._timer = None
+
+    def configure(self, config_data):
+        """Applies the ``throttle*`` settings of the agent configuration."""
+        self.enabled = as_bool(config_data.get("throttle", True))
+        self.interval = max(
+            0.1, float(config_data.get("throttle_interval", DEFAULT_INTERVAL))
+        )
+        self.min_scale = min(
+            1.0,
+            max(0.0, float(config_data.get("throttle_min_scale", DEFAULT_MIN_SCALE))),
+        )
+        for name, (key, default) in THRESHOLDS.items():
+            value = config_data.get(key, default)
+            self.thresholds[name] = float(value) if value else None
+        if not self.enabled:
+            self.pressure = []
+            self._set_scale(1.0)
+
+    def start(self, config_data):
+        """Takes a reading every interval on the running event loop."""
+        self.configure(config_data)
+        # The process is looked up here, not at import: pre-fork workers
+        # each watch themselves.
+        self._process = psutil.Process()
+        self._process.cpu_percent(None)  # CPU percentages need a baseline.
+        psutil.cpu_percent(None)
+        self._timer = asyncio.get_running_loop().call_later(self.interval, self._tick)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def update(self, readings):
+        """Adjusts the scale factor to one set of readings."""
+        self.readings = readings
+        self.pressure = [
+            name
+            for name, limit in self.thresholds.items()
+            if limit and readings.get(name) is not None and readings[name] > limit
+        ]
+        if self.pressure:
+            scale = max(self.min_scale, self.scale / 2)
+        elif all(
+            readings.get(name) is None or readings[name] <= limit * RECOVERY
+            for name, limit in self.thresholds.items()
+            if limit
+        ):
+            scale = min(1.0, self.scale + SCALE_STEP)
+        else:
+            scale = self.scale
+        self._set_scale(scale)
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "scale": self.scale,
+            "pressure": list(self.pressure),
+            "readings": dict(self.readings),
+            "thresholds": dict(self.thresholds),
+            "interval": self.interval,
+            "changes": self.changes,
+            "limits": {
+                "workers": dict(self.engine.workers),
+                "lanes": {
+                    name: {"concurrency": lane["concurrency"], "limit": lane["limit"]}
+                    for name, lane in self.admission.stats().items()
+                },
+            },
+            "deferred_tasks": self.scheduler.deferred,
+        }
+
+    def _tick(self):
+        self._timer = None
+        if self.enabled:
+            try:
+                self.update(self.sampler())
+            except (psutil.Error, OSError) as err:
+                logging.warning("Resource reading failed: %s", err)
+        self._timer = asyncio.get_running_loop().call_later(self.interval, self._tick)
+
+    def _sample(self):
+        process = self._process
+        with process.oneshot():
+            process_cpu = process.cpu_percent(None)
+            rss = process.memory_info().rss
+        cores = psutil.cpu_count() or 1
+        return {
+            "cpu_percent": psutil.cpu_percent(None),
+            "load_per_cpu": round(psutil.getloadavg()[0] / cores, 3),
+            "memory_percent": psutil.virtual_memory().percent,
+            "rss_mb": round(rss / (1024 * 1024), 1),
+            "process_cpu_percent": process_cpu,
+        }
+
+    def _set_scale(self, scale):
+        if scale == self.scale:
+            return
+        previous, self.scale = self.scale, scale
+        self.changes += 1
+        self.engine.set_scale(scale)
+        self.admission.set_scale(scale)
+        self.scheduler.set_deferring(scale < 1.0)
+        if scale < previous:
+            logging.warning(
+                "Host under pressure (%s); throttling work to %.0f%% of its limits.",
+                ", ".join(self.pressure),
+                scale * 100,
+            )
+        else:
+            logging.info("Pressure easing; work limits back to %.0f%%.", scale * 100)
+        event_bus.publish(
+            "status", state="throttle", scale=scale, pressure=self.pressure
+        )
+
+
+# The daemon-wide governor; started once the IPC server is listening.
+governor = ResourceGovernor(engine, registry.admission, scheduler)
+metrics.gauge(
+    "throttle_scale",
+    "Fraction of the configured work limits currently allowed.",
+    function=lambda: governor.scale,
+)
+metrics.gauge(
+    "resource_reading",
+    "The resource governor's latest readings.",
+    ("resource",),
+    function=lambda: {(name,): value for name, value in governor.readings.items()},
+)
+
+
+@command("throttle_status", idempotent=True, timeout=5.0, lane="control")
+def _throttle_status(command_dict):  # pylint: disable=unused-argument
+    """Reports resource readings, the throttle factor and the limits in force."""
+    return governor.status()
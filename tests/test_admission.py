@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from src.lite_agent.admission import AdmissionController, LaneFull
+from src.lite_agent.commands import CommandRegistry
+
+
+def test_full_queue_is_rejected_fast():
+    async def scenario():
+        controller = AdmissionController({"normal": (1, 1)})
+        release = asyncio.Event()
+        running = asyncio.ensure_future(controller.run("normal", release.wait))
+        queued = asyncio.ensure_future(controller.run("normal", release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(LaneFull):
+            await controller.run("normal", release.wait)
+        stats = controller.stats()["normal"]
+        assert (stats["active"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+        release.set()
+        await asyncio.gather(running, queued)
+        assert controller.stats()["normal"]["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_control_lane_stays_responsive_under_load():
+    async def scenario():
+        commands = CommandRegistry(admission=AdmissionController({"normal": (1, 2)}))
+        release = asyncio.Event()
+
+        @commands.register("heavy")
+        async def heavy(command_dict):
+            await release.wait()
+            return {"done": True}
+
+        commands.register("ping", lambda command_dict: {"pong": True}, lane="control")
+
+        heavy_calls = [
+            asyncio.ensure_future(commands.dispatch({"command": "heavy"}))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        busy = await commands.dispatch({"command": "heavy"})
+        assert busy["busy"] is True and busy["lane"] == "normal"
+        assert await commands.dispatch({"command": "ping"}) == {"pong": True}
+        release.set()
+        assert all(r == {"done": True} for r in await asyncio.gather(*heavy_calls))
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController({"bulk": (1, 4)})
+        release = asyncio.Event()
+        running = asyncio.ensure_future(controller.run("bulk", release.wait))
+        waiter = asyncio.ensure_future(controller.run("bulk", release.wait))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.stats()["bulk"]["queued"] == 0
+        release.set()
+        await running
+        assert controller.stats()["bulk"]["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_raising_concurrency_admits_waiters():
+    async def scenario():
+        controller = AdmissionController({"normal": (1, 4)})
+        release = asyncio.Event()
+        first = asyncio.ensure_future(controller.run("normal", release.wait))
+        second = asyncio.ensure_future(controller.run("normal", release.wait))
+        await asyncio.sleep(0)
+        controller.apply_config({"lane_normal_concurrency": "2"})
+        assert controller.stats()["normal"]["active"] == 2
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+
+
+def test_removed_settings_restore_the_lane_defaults():
+    controller = AdmissionController({"bulk": (3, 5)})
+    controller.apply_config({"lane_bulk_concurrency": "1", "lane_bulk_depth": "0"})
+    assert (
+        controller.stats()["bulk"]["concurrency"],
+        controller.stats()["bulk"]["depth"],
+    ) == (1, 0)
+    controller.apply_config({})
+    assert (
+        controller.stats()["bulk"]["concurrency"],
+        controller.stats()["bulk"]["depth"],
+    ) == (3, 5)
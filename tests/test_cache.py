@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from src.lite_agent.cache import ResultCache, cache_key
+from src.lite_agent.commands import CommandRegistry, registry
+from src.lite_agent.events import event_bus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_ignores_key_order():
+    assert cache_key({"command": "x", "a": 1, "b": 2}) == cache_key(
+        {"b": 2, "a": 1, "command": "x"}
+    )
+    assert cache_key({"command": "x", "value": object()}) is None
+
+
+def test_entries_expire_and_lru_is_evicted():
+    clock = FakeClock()
+    cache = ResultCache(max_entries=2, clock=clock)
+    cache.put("a", "cmd", {"n": 1}, ttl=5)
+    cache.put("b", "cmd", {"n": 2}, ttl=5)
+    assert cache.get("a") == (True, {"n": 1})  # "b" is now least recently used.
+    cache.put("c", "cmd", {"n": 3}, ttl=5)
+    assert cache.get("b") == (False, None)
+    clock.now = 6
+    assert cache.get("a") == (False, None)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 2, 1)
+    assert stats["entries"] == 1  # The expired entry was dropped on lookup.
+
+
+def test_invalidation_by_name_and_by_event():
+    cache = ResultCache()
+    cache.put("a", "list_jobs", {}, ttl=60)
+    cache.put("b", "status", {}, ttl=60)
+    cache.watch("list_jobs", ["jobs"])
+    cache.on_event({"topic": "tasks"})
+    assert cache.stats()["entries"] == 2
+    cache.on_event({"topic": "jobs"})
+    assert cache.get("a") == (False, None) and cache.get("b")[0]
+    assert cache.invalidate() == 1
+
+
+def test_dispatch_serves_repeat_queries_from_the_cache():
+    commands = CommandRegistry()
+    calls = []
+
+    @commands.register(
+        "count", idempotent=True, cache_ttl=60, invalidated_by=("cache-test",)
+    )
+    def count(command_dict):
+        calls.append(command_dict)
+        return {"calls": len(calls)}
+
+    @commands.register("flaky", idempotent=True, cache_ttl=60)
+    def flaky(command_dict):  # pylint: disable=unused-argument
+        return {"error": "try again"}
+
+    async def scenario():
+        first = await commands.dispatch({"command": "count", "x": 1})
+        again = await commands.dispatch({"x": 1, "command": "count"})
+        other = await commands.dispatch({"command": "count", "x": 2})
+        event_bus.publish("cache-test")
+        fresh = await commands.dispatch({"command": "count", "x": 1})
+        await commands.dispatch({"command": "flaky"})
+        await commands.dispatch({"command": "flaky"})
+        return first, again, other, fresh
+
+    first, again, other, fresh = asyncio.run(scenario())
+    assert first == again == {"calls": 1}
+    assert other == {"calls": 2} and fresh == {"calls": 3}
+    stats = commands.cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 5)  # Errors are not cached.
+
+
+def test_only_idempotent_commands_can_be_cached():
+    with pytest.raises(ValueError):
+        CommandRegistry().register("write", lambda c: {}, cache_ttl=1)
+
+
+def test_cache_stats_command():
+    asyncio.run(registry.dispatch({"command": "status"}))
+    asyncio.run(registry.dispatch({"command": "status"}))
+    stats = asyncio.run(registry.dispatch({"command": "cache_stats"}))["cache"]
+    assert stats["hits"] >= 1 and stats["entries"] >= 1
+    cleared = asyncio.run(registry.dispatch({"command": "cache_stats", "clear": True}))
+    assert cleared["cache"]["entries"] == 0
+
+
+def test_identical_queries_in_flight_share_one_call():
+    commands = CommandRegistry()
+    calls = []
+
+    @commands.register("slow_read", idempotent=True, cache_ttl=60)
+    async def slow_read(command_dict):  # pylint: disable=unused-argument
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def scenario():
+        return await asyncio.gather(
+            *(commands.dispatch({"command": "slow_read"}) for _ in range(10))
+        )
+
+    assert asyncio.run(scenario()) == [{"value": 42}] * 10
+    assert len(calls) == 1
+    assert commands.cache.stats()["coalesced"] == 9
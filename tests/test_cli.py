@@ -0,0 +1,251 @@
+import json
+import signal
+
+import pytest
+from click.testing import CliRunner
+
+from src.lite_agent import cli, config
+
+PID = 4242
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    """A fake running agent: a PID file, a stop reply and recorded signals."""
+    pid_file = tmp_path / "lite_agent.pid"
+    pid_file.write_text(str(PID))
+    state = {"reply": {"status": "Stopping.", "deadline": 1.0}, "kills": []}
+    state["pid_file"] = pid_file
+    monkeypatch.setattr(cli, "PID_FILE", str(pid_file))
+    monkeypatch.setattr(cli, "load_config", dict)
+    monkeypatch.setattr(cli, "_pid_exists", lambda pid: True)
+    monkeypatch.setattr(cli, "send_command_to_agent", lambda command: state["reply"])
+    monkeypatch.setattr(
+        cli.os, "kill", lambda pid, signum: state["kills"].append((pid, signum))
+    )
+    return state
+
+
+def _exits_after(agent, monkeypatch, signum=None):
+    # wait_for_exit reports the process gone once `signum` has been sent to
+    # it, or at once without one.
+    def wait_for_exit(pid, timeout):  # pylint: disable=unused-argument
+        return signum is None or (PID, signum) in agent["kills"]
+
+    monkeypatch.setattr(cli, "wait_for_exit", wait_for_exit)
+
+
+def test_stop_waits_for_a_graceful_exit(agent, monkeypatch):
+    _exits_after(agent, monkeypatch)
+    result = CliRunner().invoke(cli.main, ["stop"])
+    assert result.exit_code == 0, result.output
+    assert "no longer running" in result.output
+    assert agent["kills"] == []
+    assert not agent["pid_file"].exists()
+
+
+def test_stop_escalates_to_sigterm_and_sigkill(agent, monkeypatch):
+    agent["reply"] = {"error": "Agent not running or connection refused."}
+    _exits_after(agent, monkeypatch, signal.SIGKILL)
+    result = CliRunner().invoke(cli.main, ["stop", "--timeout", "0"])
+    assert result.exit_code == 0, result.output
+    assert agent["kills"] == [(PID, signal.SIGTERM), (PID, signal.SIGKILL)]
+    assert "did not exit within 0s. Sending SIGKILL." in result.output
+    assert "no longer running" in result.output
+
+
+def test_stop_fails_when_the_agent_survives_sigkill(agent, monkeypatch):
+    _exits_after(agent, monkeypatch, signal.SIGSTOP)  # Never sent: never exits.
+    result = CliRunner().invoke(
+        cli.main, ["stop", "--timeout", "0", "--kill-wait", "0"]
+    )
+    assert result.exit_code == 1
+    assert agent["kills"] == [(PID, signal.SIGKILL)]
+    assert "still running 0s after SIGKILL" in result.output
+    assert agent["pid_file"].exists()  # Still the agent's: it is running.
+
+
+def test_stop_waits_for_the_deadline_plus_the_grace_period(agent, monkeypatch):
+    waits = []
+    monkeypatch.setattr(
+        cli, "_wait_for_exit", lambda pid, timeout: waits.append(timeout) or True
+    )
+    monkeypatch.setattr(cli, "load_config", lambda: {"stop_grace": "4"})
+    assert CliRunner().invoke(cli.main, ["stop"]).exit_code == 0
+    agent["pid_file"].write_text(str(PID))
+    assert CliRunner().invoke(cli.main, ["stop", "--grace", "2"]).exit_code == 0
+    assert waits == [1.0 + 4, 1.0 + 2]
+
+
+class _Client:
+    """Records the update_config pushes of `config set` and `config unset`."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    def request(self, command_dict):
+        self.requests.append(command_dict)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    monkeypatch.setattr(config, "CONFIG_FILE", str(path))
+    monkeypatch.setattr(cli, "PID_FILE", str(tmp_path / "no-agent.pid"))
+    return path
+
+
+def test_config_set_rejects_an_odd_argument_count(config_file):
+    result = CliRunner().invoke(cli.main, ["config", "set", "a", "1", "b"])
+    assert result.exit_code == 2
+    assert "Expected KEY VALUE pairs." in result.output
+    assert not config_file.exists()
+
+
+def test_config_set_stores_values_verbatim_in_one_write(config_file):
+    config_file.write_text(json.dumps({"kept": 1}))
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "config",
+            "set",
+            "io_workers",
+            "8",
+            "not_a_known_key",
+            "a b=c",
+            "io_workers",
+            "9",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    # Values stay strings (each setting parses its own) and unknown keys are
+    # kept; the last of repeated keys wins.
+    assert json.loads(config_file.read_text()) == {
+        "kept": 1,
+        "io_workers": "9",
+        "not_a_known_key": "a b=c",
+    }
+
+    result = CliRunner().invoke(cli.main, ["config", "unset", "io_workers", "missing"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(config_file.read_text()) == {
+        "kept": 1,
+        "not_a_known_key": "a b=c",
+    }
+
+
+def test_config_set_refuses_to_overwrite_an_unreadable_file(config_file):
+    config_file.write_text("{half")
+    result = CliRunner().invoke(cli.main, ["config", "set", "a", "1"])
+    assert result.exit_code == 1
+    assert "Could not update the configuration" in result.output
+    assert config_file.read_text() == "{half"
+
+
+@pytest.mark.parametrize(
+    "reply, expected",
+    [
+        ({"changed": ["log_level"], "restart_required": []}, "has applied the change"),
+        ({"restart_required": ["ipc_port"]}, "Restart the agent to apply: ipc_port"),
+        ({"error": "Agent is shutting down."}, "Could not update the running agent"),
+        (ConnectionRefusedError("refused"), "Could not update the running agent"),
+    ],
+)
+def test_config_changes_are_pushed_to_a_running_agent(
+    config_file, monkeypatch, tmp_path, reply, expected
+):
+    pid_file = tmp_path / "agent.pid"
+    pid_file.write_text(str(PID))
+    monkeypatch.setattr(cli, "PID_FILE", str(pid_file))
+    client = _Client(reply)
+    monkeypatch.setattr(cli, "get_client", lambda: client)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.main, ["config", "set", "log_level", "DEBUG", "ipc_port", "1"]
+    )
+    assert result.exit_code == 0, result.output
+    assert expected in result.output
+    result = runner.invoke(cli.main, ["config", "unset", "ipc_port"])
+    assert result.exit_code == 0, result.output
+    assert client.requests == [
+        {
+            "command": "update_config",
+            "settings": {"log_level": "DEBUG", "ipc_port": "1"},
+            "unset": [],
+        },
+        {"command": "update_config", "settings": {}, "unset": ["ipc_port"]},
+    ]
+    assert json.loads(config_file.read_text()) == {"log_level": "DEBUG"}
+
+
+def test_config_changes_are_not_pushed_without_an_agent(config_file, monkeypatch):
+    monkeypatch.setattr(cli, "get_client", lambda: pytest.fail("no agent to push to"))
+    result = CliRunner().invoke(cli.main, ["config", "set", "log_level", "DEBUG"])
+    assert result.exit_code == 0, result.output
+    assert "running agent" not in result.output
+
+
+class _BatchClient:
+    """Stands in for IPCClient: imap answers in input order, as the real one."""
+
+    def __init__(self, connect_error=None):
+        self.connect_error = connect_error
+        self.options = None
+
+    def connect(self):
+        if self.connect_error is not None:
+            raise self.connect_error
+
+    def imap(self, commands, window, timeout):
+        self.options = (window, timeout)
+        for command in commands:
+            if isinstance(command, Exception):
+                yield {"error": str(command)}
+            elif command.get("command") == "fail":
+                yield {"error": "Unknown command: fail"}
+            else:
+                yield {"echo": command["n"]}
+
+
+def _batch(monkeypatch, stdin, *args, client=None):
+    client = client or _BatchClient()
+    monkeypatch.setattr(cli, "get_client", lambda: client)
+    result = CliRunner().invoke(cli.main, ["batch", *args], input=stdin)
+    return result, client
+
+
+def _lines(result):
+    return [json.loads(line) for line in result.stdout.splitlines()]
+
+
+def test_batch_writes_replies_in_input_order(monkeypatch):
+    stdin = "".join(json.dumps({"command": "echo", "n": n}) + "\n" for n in range(5))
+    result, client = _batch(monkeypatch, stdin + "\n   \n", "--window", "2")
+    assert result.exit_code == 0, result.output
+    assert _lines(result) == [{"echo": n} for n in range(5)]  # Blank lines skipped.
+    assert client.options == (2, None)
+
+
+def test_batch_reports_bad_lines_and_failed_commands_in_place(monkeypatch):
+    stdin = '{"command": "echo", "n": 1}\n{not json\n{"command": "fail"}\n'
+    stdin += '{"command": "echo", "n": 4}\n'
+    result, _ = _batch(monkeypatch, stdin, "--timeout", "5")
+    assert result.exit_code == 1
+    replies = _lines(result)
+    assert replies[0] == {"echo": 1} and replies[3] == {"echo": 4}
+    assert replies[1]["error"].startswith("Line 2 is not valid JSON")
+    assert replies[2] == {"error": "Unknown command: fail"}
+    assert "2 command(s) failed." in result.stderr
+
+
+def test_batch_fails_without_an_agent(monkeypatch):
+    client = _BatchClient(ConnectionRefusedError("refused"))
+    result, _ = _batch(monkeypatch, '{"command": "status"}\n', client=client)
+    assert result.exit_code == 1
+    assert result.stdout == ""
+    assert "Agent is not running or unreachable: refused" in result.stderr
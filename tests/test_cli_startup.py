@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules only the daemon, or commands that need them, may load. Absent
+# modules are the budget: their presence, not a wall-clock figure, is what
+# regresses start-up on every runner.
+HEAVY_MODULES = (
+    "asyncio",
+    "multiprocessing",
+    "psutil",
+    "subprocess",
+    "src.lite_agent.agent_core",
+    "src.lite_agent.commands",
+    "src.lite_agent.ipc",
+    "src.lite_agent.readiness",
+)
+# The budget for the total import time of `lite-agent status`: a multiple of
+# what a bare interpreter imports at start-up (about 115 ms against 8 ms on
+# the reference VM), so it scales with the runner's speed. Importing asyncio
+# alone would add about 75 ms. LITE_AGENT_IMPORT_BUDGET_MS sets an absolute
+# budget in milliseconds instead.
+BUDGET_RATIO = 25
+BUDGET_MS = float(os.environ.get("LITE_AGENT_IMPORT_BUDGET_MS", "0"))
+
+_REPORT_LOADED = (
+    "import sys; sys.argv = ['lite-agent', '--help']\n"
+    "from src.lite_agent.cli import main\n"
+    "try:\n"
+    "    main()\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "print('\\n'.join(sys.modules), file=sys.stderr)\n"
+)
+
+
+def _env(tmp_path):
+    return dict(os.environ, HOME=str(tmp_path), XDG_CONFIG_HOME=str(tmp_path))
+
+
+def test_help_loads_no_heavy_modules(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-c", _REPORT_LOADED],
+        cwd=ROOT,
+        env=_env(tmp_path),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    loaded = set(result.stderr.split())
+    assert "click" in loaded and "src.lite_agent.client" in loaded
+    assert not set(HEAVY_MODULES) & loaded
+
+
+def test_status_loads_no_heavy_modules(tmp_path):
+    times = _import_times(tmp_path, "status")
+    assert "src.lite_agent.client" in times
+    assert not set(HEAVY_MODULES) & set(times)
+
+
+def test_status_stays_within_its_import_budget(tmp_path):
+    times = _import_times(tmp_path, "status")
+    total_ms = sum(times.values()) / 1000
+    budget_ms = BUDGET_MS or BUDGET_RATIO * _bare_import_ms(tmp_path)
+    slowest = sorted(times, key=times.get, reverse=True)[:5]
+    assert total_ms < budget_ms, (
+        f"{total_ms:.0f} ms against a budget of {budget_ms:.0f} ms; slowest: {slowest}"
+    )
+
+
+def _bare_import_ms(tmp_path):
+    # The best of a few runs: the figure is small, so noise weighs on it.
+    command = [sys.executable, "-X", "importtime", "-c", "pass"]
+    runs = [sum(_importtime(command, tmp_path).values()) for _ in range(3)]
+    return min(runs) / 1000
+
+
+def _import_times(tmp_path, *args):
+    """Runs the CLI under -X importtime; returns {module: self time in us}."""
+    command = [sys.executable, "-X", "importtime", "-m", "src.lite_agent.cli", *args]
+    return _importtime(command, tmp_path)
+
+
+def _importtime(command, tmp_path):
+    subprocess.run(command, cwd=ROOT, env=_env(tmp_path), capture_output=True)
+    # The second run measures with the bytecode cache warm.
+    result = subprocess.run(
+        command, cwd=ROOT, env=_env(tmp_path), capture_output=True, text=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_us)
+    return times
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+from src.lite_agent.commands import CommandRegistry, load_command_modules, registry
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_dispatch_and_unknown_command():
+    commands = CommandRegistry()
+    commands.register("echo", lambda command_dict: {"echo": command_dict["value"]})
+    assert _run(commands.dispatch({"command": "echo", "value": 3})) == {"echo": 3}
+    assert "Unknown command" in _run(commands.dispatch({"command": "nope"}))["error"]
+
+
+def test_timeouts_are_enforced():
+    commands = CommandRegistry()
+
+    @commands.register("slow_async", timeout=0.05)
+    async def slow_async(command_dict):
+        await asyncio.sleep(5)
+
+    @commands.register("slow_pool", timeout=0.05, mode="pool")
+    def slow_pool(command_dict):
+        time.sleep(0.3)
+
+    started = time.monotonic()
+    assert "timed out" in _run(commands.dispatch({"command": "slow_async"}))["error"]
+    assert "timed out" in _run(commands.dispatch({"command": "slow_pool"}))["error"]
+    assert time.monotonic() - started < 0.3
+    commands.shutdown()
+
+
+def test_pool_commands_run_off_the_event_loop_thread():
+    commands = CommandRegistry()
+    commands.register(
+        "where",
+        lambda command_dict: {"thread": threading.current_thread().name},
+        mode="pool",
+    )
+    result = _run(commands.dispatch({"command": "where"}))
+    assert result["thread"].startswith("lite-agent-cmd")
+    commands.shutdown()
+
+
+def test_handler_errors_and_metadata():
+    commands = CommandRegistry()
+
+    @commands.register("boom", idempotent=True)
+    def boom(command_dict):
+        """Always fails."""
+        raise RuntimeError("kaput")
+
+    assert "kaput" in _run(commands.dispatch({"command": "boom"}))["error"]
+    (meta,) = commands.describe()
+    assert meta == {
+        "name": "boom",
+        "timeout": 30.0,
+        "idempotent": True,
+        "mode": "inline",
+        "lane": "normal",
+        "description": "Always fails.",
+        "cache_ttl": None,
+    }
+
+
+def test_builtin_commands_and_plugin_loading():
+    names = {meta["name"] for meta in registry.describe()}
+    assert {"status", "stop_daemon", "subscribe", "list_commands"} <= names
+    assert load_command_modules("json, no_such_module_xyz,") == ["json"]
+
+
+def test_subscribe_rejects_a_heartbeat_that_would_spin():
+    for heartbeat in (0, -1, "5", None, True, float("nan"), float("inf")):
+        reply = _run(
+            registry.dispatch({"command": "subscribe", "heartbeat": heartbeat})
+        )
+        assert "heartbeat must be a positive" in reply["error"], heartbeat
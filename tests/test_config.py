@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+import pytest
+
+from src.lite_agent import config
+from src.lite_agent.config import ConfigStore
+
+
+def test_reads_are_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(str(path))
+    assert store.load() == {} and store.reads == 0
+
+    path.write_text(json.dumps({"a": 1}))
+    assert store.load() == {"a": 1}
+    first = store.load()
+    first["a"] = 2  # Callers get their own copy.
+    assert store.load() == {"a": 1} and store.reads == 1
+
+    path.write_text(json.dumps({"a": 10}))
+    os.utime(path, ns=(0, 1))  # A distinct modification time.
+    assert store.load() == {"a": 10} and store.reads == 2
+
+    path.write_text("{half")
+    os.utime(path, ns=(0, 2))
+    assert store.load() == {}
+    with pytest.raises(json.JSONDecodeError):
+        store.load(strict=True)
+
+
+def test_update_writes_atomically_and_refuses_to_clobber(tmp_path):
+    path = tmp_path / "config.json"
+    store = ConfigStore(str(path))
+    store.save({"keep": "yes", "drop": "x"})
+    assert store.update({"a": "1", "b": "2"}, unset=["drop"]) == {
+        "keep": "yes",
+        "a": "1",
+        "b": "2",
+    }
+    assert json.loads(path.read_text()) == {"keep": "yes", "a": "1", "b": "2"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "config.json",
+        "config.json.lock",
+    ]  # No temporary files left behind.
+
+    path.write_text("{half")
+    with pytest.raises(json.JSONDecodeError):
+        store.update({"c": "3"})
+    assert path.read_text() == "{half"
+
+
+@pytest.mark.skipif(config.fcntl is None, reason="needs fcntl locking")
+def test_concurrent_updates_do_not_lose_keys(tmp_path):
+    path = str(tmp_path / "config.json")
+
+    def writer(index):
+        store = ConfigStore(path)  # Separate stores, as in separate CLIs.
+        for round_ in range(10):
+            store.update({f"key_{index}_{round_}": round_})
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ConfigStore(path).load()) == 40
@@ -0,0 +1,243 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from src.lite_agent import agent_core, durable, executor  # noqa: F401 (registers submit_job)
+from src.lite_agent.commands import registry
+from src.lite_agent.durable import DurableQueue, work_queue
+from src.lite_agent.scheduler import restore_task, scheduler
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "queue.log")
+
+
+def test_unacknowledged_items_survive_a_restart(log_path):
+    queue = DurableQueue()
+    assert queue.open(log_path) == []
+    first = queue.put({"n": 1})
+    second = queue.put({"n": 2})
+    queue.ack(first)
+    queue.close()
+
+    reopened = DurableQueue()
+    assert reopened.open(log_path) == [(second, {"n": 2})]
+    assert reopened.put({"n": 3}) > second  # Ids keep increasing.
+    reopened.close()
+
+
+def test_torn_tail_is_discarded(log_path):
+    queue = DurableQueue()
+    queue.open(log_path)
+    kept = queue.put({"n": 1})
+    queue.put({"n": 2})
+    queue.close()
+    os.truncate(log_path, os.path.getsize(log_path) - 3)  # Crash mid-append.
+
+    reopened = DurableQueue()
+    assert reopened.open(log_path) == [(kept, {"n": 1})]
+    reopened.put({"n": 3})
+    reopened.close()
+    assert [item for _, item in DurableQueue().open(log_path)] == [
+        {"n": 1},
+        {"n": 3},
+    ]
+
+
+def test_concurrent_puts_share_commits(log_path):
+    queue = DurableQueue()
+    queue.open(log_path)
+
+    def producer():
+        for i in range(50):
+            queue.put({"i": i})
+
+    threads = [threading.Thread(target=producer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = queue.stats()
+    queue.close()
+    assert stats["pending"] == 400
+    assert stats["commits"] < stats["records"]
+
+
+def test_compaction_keeps_only_live_items(log_path, monkeypatch):
+    monkeypatch.setattr(durable, "COMPACT_MIN_BYTES", 4096)
+    queue = DurableQueue(fsync=False)
+    queue.open(log_path)
+    live = queue.put({"keep": True})
+    for i in range(200):
+        queue.ack(queue.put({"payload": "x" * 64, "i": i}))
+    queue.put({"flush": True})  # Lets the writer notice and compact.
+    stats = queue.stats()
+    queue.close()
+    assert stats["compactions"] >= 1
+    assert os.path.getsize(log_path) < 4096
+    items = dict(DurableQueue().open(log_path))
+    assert items[live] == {"keep": True}
+    assert len(items) == 2
+
+
+def test_submitted_jobs_are_recorded_until_done(log_path):
+    work_queue.open(log_path)
+    try:
+        reply = asyncio.run(
+            registry.dispatch({"command": "submit_job", "function": "log_heartbeat"})
+        )
+        assert reply["durable"]
+        status = asyncio.run(
+            registry.dispatch(
+                {"command": "job_status", "id": reply["job"]["id"], "wait": 5}
+            )
+        )
+        assert status["job"]["state"] == "done"
+        assert work_queue.pending() == []
+        stats = asyncio.run(registry.dispatch({"command": "queue_stats"}))
+        assert stats["queue"]["records"] >= 1
+    finally:
+        work_queue.close()
+
+
+def test_scheduled_tasks_are_restored(log_path):
+    work_queue.open(log_path)
+    try:
+        reply = asyncio.run(
+            registry.dispatch(
+                {
+                    "command": "schedule_task",
+                    "function": "log_heartbeat",
+                    "name": "durable-hb",
+                    "interval": "1h",
+                }
+            )
+        )
+        assert reply["status"] == "scheduled"
+    finally:
+        work_queue.close()
+    scheduler.cancel("durable-hb")  # Acks nothing: the log is closed.
+
+    records = work_queue.open(log_path)
+    try:
+        assert [item["command"]["name"] for _, item in records] == ["durable-hb"]
+        task = restore_task(*records[0])
+        assert task.interval == 3600
+        assert scheduler.cancel("durable-hb")
+        assert work_queue.pending() == []  # Unscheduling retires the record.
+    finally:
+        work_queue.close()
+
+
+def test_partial_write_is_cut_off_before_later_commits(log_path, monkeypatch):
+    queue = DurableQueue(fsync=False)
+    queue.open(log_path)
+    kept = queue.put({"n": 1})
+    real_write = os.write
+    calls = []
+
+    def torn_write(fd, data):
+        if not calls:
+            calls.append(fd)
+            real_write(fd, bytes(data[: len(data) // 2]))
+            raise OSError(28, "No space left on device")
+        return real_write(fd, data)
+
+    monkeypatch.setattr(durable.os, "write", torn_write)
+    with pytest.raises(OSError):
+        queue.put({"n": 2, "payload": "x" * 100})
+    later = queue.put({"n": 3})
+    queue.close()
+
+    items = dict(DurableQueue().open(log_path))
+    assert items[kept] == {"n": 1}
+    assert items[later] == {"n": 3}
+
+
+def test_queue_rejects_puts_once_it_cannot_rewind(log_path, monkeypatch):
+    queue = DurableQueue(fsync=False)
+    queue.open(log_path)
+
+    def fail(*args):
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(durable.os, "write", fail)
+    monkeypatch.setattr(durable.os, "ftruncate", fail)
+    with pytest.raises(OSError):
+        queue.put({"n": 1})
+    monkeypatch.undo()
+    _, future = queue.put_nowait({"n": 2})
+    with pytest.raises(OSError):
+        future.result(1)
+    assert queue.stats()["failed"]
+    queue.close()
+
+
+def test_compaction_writes_outside_the_lock_and_keeps_counts(log_path, monkeypatch):
+    monkeypatch.setattr(durable, "COMPACT_MIN_BYTES", 4096)
+    queue = DurableQueue(fsync=False)
+    queue.open(log_path)
+    real_fsync = os.fsync
+    locked_during_fsync = []
+
+    def fsync(fd):
+        free = queue._cond.acquire(blocking=False)  # pylint: disable=W0212
+        if free:
+            queue._cond.release()  # pylint: disable=W0212
+        locked_during_fsync.append(not free)
+        real_fsync(fd)
+
+    monkeypatch.setattr(durable.os, "fsync", fsync)
+    live = [queue.put({"keep": i}) for i in range(3)]
+    for i in range(200):
+        queue.ack(queue.put({"payload": "x" * 64, "i": i}))
+    for i in range(20):
+        live.append(queue.put({"after": i}))
+    stats = queue.stats()
+    queue.close()
+    assert stats["compactions"] >= 1
+    assert locked_during_fsync and not any(locked_during_fsync)
+    assert stats["file_bytes"] == os.path.getsize(log_path)
+    items = DurableQueue().open(log_path)
+    assert [record_id for record_id, _ in items] == live
+    assert stats["live_bytes"] == sum(
+        len(durable._encode(durable._PUT, record_id, item))  # pylint: disable=W0212
+        for record_id, item in items
+    )
+
+
+def _fill(path, item):
+    queue = DurableQueue(fsync=False)
+    queue.open(path)
+    queue.put(item)
+    queue.close()
+
+
+@pytest.mark.parametrize(
+    "before, after",
+    [((0, 1, 2, 3), 2), ((0, 1), None), ((None,), 2)],
+    ids=["fewer-workers", "prefork-to-single", "single-to-prefork"],
+)
+def test_logs_no_worker_owns_are_recovered(log_path, monkeypatch, before, after):
+    # Worker indexes before and after the restart; None is single-process.
+    for index in before:
+        path = log_path if index is None else f"{log_path}.{index}"
+        _fill(path, {"type": "job", "spec": {"from": index}})
+    submitted = []
+    monkeypatch.setattr(
+        agent_core, "submit_registered", lambda spec, _: submitted.append(spec["from"])
+    )
+    indexes = range(after) if after else [None]
+    for index in indexes:
+        monkeypatch.setattr(agent_core, "work_queue", DurableQueue(fsync=False))
+        agent_core.recover_work(
+            {"queue_path": log_path}, worker_index=index, workers=after or 1
+        )
+        agent_core.work_queue.close()
+
+    assert sorted(submitted, key=str) == sorted(before, key=str)
+    owned = [log_path if i is None else f"{log_path}.{i}" for i in indexes]
+    assert durable.queue_logs(log_path) == sorted(owned)
@@ -0,0 +1,132 @@
+import asyncio
+import math
+import os
+import threading
+import time
+
+import pytest
+
+from src.lite_agent.commands import registry
+from src.lite_agent.executor import ExecutionEngine, parse_caps
+from src.lite_agent.scheduler import Scheduler
+
+
+@pytest.fixture
+def engine():
+    eng = ExecutionEngine(io_workers=4, cpu_workers=2)
+    yield eng
+    eng.shutdown(wait=True)
+
+
+def test_io_and_cpu_jobs_report_results(engine):
+    io_job = engine.submit(threading.current_thread, kind="io")
+    cpu_job = engine.submit(os.getpid, kind="cpu")
+    math_job = engine.submit(math.factorial, (20,), kind="cpu")
+    assert io_job.future.result(5).name.startswith("lite-agent-job")
+    assert cpu_job.future.result(30) != os.getpid()  # Ran in a worker process.
+    assert math_job.future.result(30) == math.factorial(20)
+    assert math_job.describe()["state"] == "done"
+
+
+def test_failures_are_reported(engine):
+    job = engine.submit(int, ("not a number",))
+    with pytest.raises(ValueError):
+        job.future.result(5)
+    assert job.state == "failed"
+    assert "ValueError" in job.error
+
+
+def test_caps_hold_jobs_and_held_jobs_cancel_cleanly(engine):
+    engine.caps["slow"] = 1
+    release = threading.Event()
+    first = engine.submit(release.wait, (5,), name="slow")
+    second = engine.submit(release.wait, (5,), name="slow")
+    third = engine.submit(release.wait, (5,), name="slow")
+    assert second.state == third.state == "queued"
+    assert engine.stats()["held"] == 2
+    assert engine.cancel(third.id)
+    assert third.future.cancelled() and third.state == "cancelled"
+    release.set()
+    assert first.future.result(5) and second.future.result(5)
+    assert engine.stats()["held"] == 0
+
+
+def test_running_io_jobs_cancel_cooperatively(engine):
+    started = threading.Event()
+
+    def poll(cancel_event):
+        started.set()
+        cancel_event.wait(5)
+        return "stopped"
+
+    job = engine.submit(poll)
+    assert started.wait(5)
+    assert engine.cancel(job.id)
+    assert job.future.result(5) == "stopped"
+    assert job.state == "cancelled"
+    assert not engine.cancel(job.id)  # Already finished.
+
+
+def test_parse_caps():
+    assert parse_caps("backup=1, index=2") == {"backup": 1, "index": 2}
+    assert parse_caps(None) == {}
+
+
+def test_ipc_job_commands():
+    submitted = asyncio.run(
+        registry.dispatch({"command": "submit_job", "function": "log_heartbeat"})
+    )
+    job_id = submitted["job"]["id"]
+    status = asyncio.run(
+        registry.dispatch({"command": "job_status", "id": job_id, "wait": 5})
+    )
+    assert status["job"]["state"] == "done"
+    listing = asyncio.run(registry.dispatch({"command": "list_jobs"}))
+    assert job_id in [job["id"] for job in listing["jobs"]]
+    bad = asyncio.run(
+        registry.dispatch(
+            {"command": "submit_job", "function": "log_heartbeat", "kind": "gpu"}
+        )
+    )
+    assert "Unknown job kind" in bad["error"]
+
+
+def test_scheduler_runs_tasks_on_the_engine(engine):
+    sched = Scheduler(runner=engine.run_task)
+    sched.schedule("pid", os.getpid, delay=0, kind="cpu")
+    sched.start()
+    try:
+        deadline = time.monotonic() + 30
+        while not engine.list() or engine.list()[0]["state"] != "done":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        sched.stop()
+    job = engine.list()[0]
+    assert job["name"] == "getpid" and job["result"] != os.getpid()
+
+
+def test_wait_idle_reports_jobs_still_running(engine):
+    release = threading.Event()
+    engine.submit(release.wait, (5,))
+    assert engine.wait_idle(0.1) == 1
+    release.set()
+    assert engine.wait_idle(5) == 0
+
+
+def test_apply_config_resizes_pools_and_releases_held_jobs(engine):
+    release = threading.Event()
+    engine.apply_config({"job_caps": "slow=1"})
+    first = engine.submit(release.wait, (5,), name="slow")
+    second = engine.submit(release.wait, (5,), name="slow")
+    assert second.state == "queued"
+    old_pool = engine._pool("io")  # pylint: disable=protected-access
+    engine.apply_config({"io_workers": 2})  # Cap removed, pool resized.
+    assert engine.workers["io"] == 2 and engine.caps == {}
+    assert engine._pool("io") is not old_pool  # pylint: disable=protected-access
+    deadline = time.monotonic() + 5
+    while second.state == "queued":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    release.set()
+    assert first.future.result(5) and second.future.result(5)
@@ -0,0 +1,443 @@
+import asyncio
+import concurrent.futures
+import os
+import queue
+import socket
+import threading
+import time
+
+import pytest
+
+from src.lite_agent import client as client_module
+from src.lite_agent import shm
+from src.lite_agent.events import event_bus
+from src.lite_agent.ipc import (
+    UDS_SUPPORTED,
+    IPCClient,
+    IPCServer,
+    agent_command_handler,
+    ipc_settings,
+    send_batch_to_agent,
+    send_command_to_agent,
+    stream_command_to_agent,
+)
+from src.lite_agent.protocol import ProtocolError, recv_message, send_message
+
+
+@pytest.fixture
+def run_server():
+    """Starts IPCServer instances on a background event loop."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    servers = []
+
+    def _start(handler, **kwargs):
+        kwargs.setdefault("port", 0)
+        server = IPCServer(handler, **kwargs)
+        asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+        servers.append(server)
+        return server
+
+    async def _shutdown():
+        for server in servers:
+            server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    yield _start
+    asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_sync_and_async_handlers(run_server):
+    async def async_handler(command_dict):
+        return {"status": "async", "command": command_dict["command"]}
+
+    sync_server = run_server(lambda command_dict: {"status": "sync"})
+    async_server = run_server(async_handler)
+
+    assert send_command_to_agent({"command": "status"}, port=sync_server.port) == {
+        "status": "sync"
+    }
+    assert send_command_to_agent({"command": "status"}, port=async_server.port) == {
+        "status": "async",
+        "command": "status",
+    }
+
+
+def test_stalled_client_does_not_block_others(run_server):
+    server = run_server(lambda command_dict: {"status": "ok"})
+    stalled = socket.create_connection(("127.0.0.1", server.port))
+    try:
+        started = time.monotonic()
+        assert send_command_to_agent({"command": "status"}, port=server.port) == {
+            "status": "ok"
+        }
+        assert time.monotonic() - started < 2
+    finally:
+        stalled.close()
+
+
+def test_handler_exception_is_reported(run_server):
+    def failing_handler(command_dict):
+        raise RuntimeError("boom")
+
+    server = run_server(failing_handler)
+    response = send_command_to_agent({"command": "status"}, port=server.port)
+    assert "boom" in response["error"]
+
+
+def test_large_payload_round_trip(run_server):
+    server = run_server(lambda command_dict: {"echo": command_dict["payload"]})
+    payload = "y" * (1024 * 1024)
+    response = send_command_to_agent(
+        {"command": "echo", "payload": payload}, port=server.port
+    )
+    assert response == {"echo": payload}
+
+
+def test_generator_reply_is_streamed(run_server):
+    def streaming_handler(command_dict):
+        for i in range(command_dict["n"]):
+            yield {"line": i}
+
+    server = run_server(streaming_handler)
+    items = list(stream_command_to_agent({"n": 5}, port=server.port))
+    assert items == [{"line": i} for i in range(5)]
+    assert send_command_to_agent({"n": 3}, port=server.port)["count"] == 3
+
+
+def test_client_multiplexes_out_of_order_replies(run_server):
+    async def sleepy_handler(command_dict):
+        await asyncio.sleep(command_dict["delay"])
+        return {"delay": command_dict["delay"]}
+
+    server = run_server(sleepy_handler)
+    with IPCClient(port=server.port, timeout=5) as client:
+        slow = client.submit({"delay": 0.5})
+        fast = client.submit({"delay": 0.0})
+        assert fast.result(5) == {"delay": 0.0}
+        assert not slow.done()
+        assert slow.result(5) == {"delay": 0.5}
+        # Everything travelled over the one persistent socket.
+        assert client.request({"delay": 0}) == {"delay": 0}
+
+
+def test_client_reconnects_after_server_restart(run_server):
+    server = run_server(lambda command_dict: {"status": "ok"})
+    with IPCClient(port=server.port, timeout=5) as client:
+        assert client.request({"command": "status"}) == {"status": "ok"}
+        client.close()
+        assert client.request({"command": "status"}) == {"status": "ok"}
+
+
+@pytest.mark.skipif(not UDS_SUPPORTED, reason="Unix domain sockets unavailable")
+def test_slow_stream_consumer_keeps_the_client_buffer_bounded(run_server, monkeypatch):
+    produced = [0]
+
+    def handler(command_dict):
+        if command_dict.get("command") == "ping":
+            return {"pong": True}
+
+        def numbers():
+            for i in range(200):
+                produced[0] = i + 1
+                yield i
+
+        return numbers()
+
+    buffered = []
+    deliver = client_module._PendingCall.deliver  # pylint: disable=W0212
+
+    def recording_deliver(call, kind, payload):
+        done = deliver(call, kind, payload)
+        if call.streaming:
+            buffered.append(call.queue.qsize())
+        return done
+
+    monkeypatch.setattr(client_module._PendingCall, "deliver", recording_deliver)  # pylint: disable=W0212
+    server = run_server(handler)
+    with IPCClient(port=server.port, timeout=5) as client:
+        stream = client.stream({"command": "numbers"}, window=8)
+        assert next(stream) == 0
+        time.sleep(0.2)  # A stalled consumer: the daemon must wait for credit.
+        assert produced[0] <= 8 + 2
+        # The paused stream does not hold up other calls on the connection.
+        assert client.request({"command": "ping"}) == {"pong": True}
+        rest = []
+        for item in stream:
+            rest.append(item)
+            time.sleep(0.001)
+    assert rest == list(range(1, 200))
+    assert max(buffered) <= 8 + 1
+
+
+def test_non_object_reply_fails_the_connection_instead_of_hanging():
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            recv_message(conn)
+            send_message(conn, [1, 2, 3])
+            time.sleep(1)
+
+    threading.Thread(target=serve, daemon=True).start()
+    try:
+        with IPCClient(port=listener.getsockname()[1], timeout=5) as client:
+            started = time.monotonic()
+            with pytest.raises(ProtocolError):
+                client.request({"command": "status"})
+            assert time.monotonic() - started < 2
+    finally:
+        listener.close()
+
+
+def test_unix_socket_transport(run_server, tmp_path):
+    uds_path = str(tmp_path / "agent.sock")
+    run_server(lambda command_dict: {"status": "uds"}, uds_path=uds_path, tcp=False)
+    assert os.stat(uds_path).st_mode & 0o777 == 0o600
+    with IPCClient(uds_path=uds_path, tcp_fallback=False, timeout=5) as client:
+        assert client.request({"command": "status"}) == {"status": "uds"}
+
+
+@pytest.mark.skipif(not UDS_SUPPORTED, reason="Unix domain sockets unavailable")
+def test_client_falls_back_to_tcp(run_server, tmp_path):
+    server = run_server(lambda command_dict: {"status": "tcp"})
+    missing = str(tmp_path / "missing.sock")
+    with IPCClient(port=server.port, uds_path=missing, timeout=5) as client:
+        assert client.request({"command": "status"}) == {"status": "tcp"}
+    with pytest.raises(ConnectionRefusedError):
+        IPCClient(uds_path=missing, tcp_fallback=False).connect()
+
+
+def test_ipc_settings_from_config():
+    assert ipc_settings({})["transport"] == "tcp"
+    settings = ipc_settings(
+        {"ipc_transport": "unix", "ipc_socket_path": "/tmp/x.sock", "ipc_port": "6000"}
+    )
+    assert settings["port"] == 6000
+    if UDS_SUPPORTED:
+        assert settings["uds_path"] == "/tmp/x.sock"
+        assert settings["tcp_fallback"] is True
+        assert not ipc_settings({"ipc_transport": "unix", "ipc_tcp_fallback": "false"})[
+            "tcp_fallback"
+        ]
+
+
+def test_batch_runs_in_order_with_per_item_errors(run_server):
+    seen = []
+
+    def handler(command_dict):
+        if command_dict["command"] == "fail":
+            raise ValueError("bad item")
+        seen.append(command_dict["n"])
+        return {"n": command_dict["n"]}
+
+    server = run_server(handler)
+    commands = [{"command": "ok", "n": i} for i in range(50)]
+    commands.insert(10, {"command": "fail"})
+    commands.insert(20, "not a dict")
+    with IPCClient(port=server.port, timeout=5) as client:
+        results = client.batch(commands)
+    assert len(results) == 52
+    assert "bad item" in results[10]["error"]
+    assert "error" in results[20]
+    assert seen == list(range(50))
+    assert send_batch_to_agent([{"command": "ok", "n": 1}], port=server.port) == {
+        "results": [{"n": 1}]
+    }
+
+
+def test_pipeline_returns_replies_in_order(run_server):
+    async def handler(command_dict):
+        await asyncio.sleep(0.01 * (command_dict["n"] % 3))
+        return {"n": command_dict["n"]}
+
+    server = run_server(handler)
+    with IPCClient(port=server.port, timeout=5) as client:
+        replies = client.pipeline([{"n": i} for i in range(100)])
+    assert replies == [{"n": i} for i in range(100)]
+
+
+def test_imap_streams_in_order_within_the_window(run_server):
+    in_flight, peak = [0], [0]
+
+    async def handler(command_dict):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01 * (command_dict["n"] % 3))
+        in_flight[0] -= 1
+        return {"n": command_dict["n"]}
+
+    server = run_server(handler)
+    commands = [{"n": i} for i in range(40)]
+    commands[5] = ValueError("Line 6 is not valid JSON")
+    commands[7] = [1]
+    with IPCClient(port=server.port, timeout=5) as client:
+        replies = list(client.imap(iter(commands), window=4))
+        # A reply is yielded before the next command has to be read.
+        feed = queue.Queue()
+        replies_iter = client.imap(iter(feed.get, None))
+        feed.put({"n": 1})
+        assert next(replies_iter) == {"n": 1}
+        feed.put(None)
+        assert list(replies_iter) == []
+    assert replies[5] == {"error": "Line 6 is not valid JSON"}
+    assert replies[7] == {"error": "A command must be a JSON object."}
+    assert [r["n"] for i, r in enumerate(replies) if i not in (5, 7)] == [
+        i for i in range(40) if i not in (5, 7)
+    ]
+    assert peak[0] <= 4
+
+
+def test_subscription_pushes_events_and_heartbeats(run_server):
+    server = run_server(agent_command_handler)
+    with IPCClient(port=server.port, timeout=5) as client:
+        events = client.subscribe(["status"], heartbeat=0.2)
+        assert next(events)["topic"] == "subscribed"
+        event_bus.publish("tasks", name="ignored")
+        event_bus.publish("status", state="running")
+        event = next(events)
+        assert (event["topic"], event["state"]) == ("status", "running")
+        assert next(events)["topic"] == "heartbeat"
+        events.close()
+        deadline = time.monotonic() + 2
+        while event_bus.subscriber_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert event_bus.subscriber_count() == 0
+        # The connection stays usable after cancelling the subscription.
+        assert client.request({"command": "status"})["status"] == "Agent is running"
+
+
+def test_large_reply_spills_to_shared_memory(run_server, monkeypatch):
+    monkeypatch.setattr(shm, "SHM_THRESHOLD", 1024)
+    spilled = []
+    real_share = shm.share
+
+    def recording_share(data, ttl=shm.DEFAULT_TTL):
+        handle = real_share(data, ttl)
+        spilled.append(handle)
+        return handle
+
+    monkeypatch.setattr(shm, "share", recording_share)
+    server = run_server(lambda command_dict: {"blob": "z" * command_dict["n"]})
+    with IPCClient(port=server.port, timeout=5, shm=True) as client:
+        assert client.request({"n": 10}) == {"blob": "z" * 10}
+        assert client.request({"n": 100_000}) == {"blob": "z" * 100_000}
+    assert len(spilled) == 1
+
+
+def test_binary_reply_skips_json_and_large_request_spills(run_server, monkeypatch):
+    monkeypatch.setattr(shm, "SHM_THRESHOLD", 1024)
+    received = []
+
+    def handler(command_dict):
+        received.append(len(command_dict.get("blob", "")))
+        return b"\x00\xff" * 50_000
+
+    server = run_server(handler)
+    with IPCClient(port=server.port, timeout=5, shm=True) as client:
+        assert client.request({"blob": "y" * 100_000}) == b"\x00\xff" * 50_000
+    assert received == [100_000]
+    assert shm.release_all() == 0  # The daemon claimed the request segment.
+
+
+def test_unreadable_shared_request_gets_an_error_reply(run_server):
+    server = run_server(lambda command_dict: {"status": "ran"})
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        handle = {"__shm__": f"{shm.SHM_PREFIX}0_missing", "size": 4}
+        send_message(sock, {"id": 1, "shm": True, "request_shm": handle})
+        reply = recv_message(sock)
+    assert "Shared-memory request unavailable" in reply["response"]["error"]
+
+
+class _LegacyTimeout(Exception):
+    """concurrent.futures.TimeoutError before Python 3.11: not an OSError."""
+
+
+def test_hung_agent_gives_an_error_reply_not_a_traceback(run_server, monkeypatch):
+    monkeypatch.setattr(concurrent.futures, "TimeoutError", _LegacyTimeout)
+    monkeypatch.setattr(concurrent.futures._base, "TimeoutError", _LegacyTimeout)
+
+    async def handler(command_dict):  # pylint: disable=unused-argument
+        await asyncio.sleep(5)
+
+    server = run_server(handler)
+    client = client_module.get_client("127.0.0.1", server.port)
+    client.timeout = 0.2
+    try:
+        reply = send_command_to_agent({"command": "status"}, port=server.port)
+        assert "within 0.2s" in reply["error"]
+        with pytest.raises(TimeoutError):
+            client.pipeline([{"command": "status"}])
+    finally:
+        client.close()
+
+
+def _serve_in_background(server):
+    # serve_forever() on the fixture's loop; request_stop() makes it return.
+    return asyncio.run_coroutine_threadsafe(server.serve_forever(), server._loop)
+
+
+def test_drain_waits_for_requests_in_flight(run_server):
+    started = threading.Event()
+
+    async def handler(command_dict):
+        if command_dict["command"] == "slow":
+            started.set()
+            await asyncio.sleep(0.3)
+            return {"status": "finished"}
+        return {"status": "ok"}
+
+    server = run_server(handler, drain_timeout=5)
+    serving = _serve_in_background(server)
+    with IPCClient(port=server.port, timeout=5) as client:
+        slow = client.submit({"command": "slow"})
+        assert started.wait(5)
+        server.request_stop()
+        deadline = time.monotonic() + 2
+        while not server.draining and time.monotonic() < deadline:
+            time.sleep(0.01)
+        refused = client.request({"command": "status"})
+        assert refused["draining"] and "shutting down" in refused["error"]
+        assert slow.result(5) == {"status": "finished"}
+    serving.result(5)  # serve_forever() returned once the request finished.
+
+
+def test_drain_cancels_requests_past_the_deadline(run_server):
+    started = threading.Event()
+
+    async def handler(command_dict):  # pylint: disable=unused-argument
+        started.set()
+        await asyncio.sleep(30)
+
+    server = run_server(handler, drain_timeout=0.2)
+    serving = _serve_in_background(server)
+    with IPCClient(port=server.port, timeout=5) as client:
+        stuck = client.submit({"command": "stuck"})
+        assert started.wait(5)
+        began = time.monotonic()
+        server.request_stop()
+        reply = stuck.result(5)
+        assert reply["draining"] and "cancelled" in reply["error"]
+        serving.result(5)
+        assert time.monotonic() - began < 2
+
+
+def test_drain_ends_event_subscriptions(run_server):
+    server = run_server(agent_command_handler, drain_timeout=1)
+    serving = _serve_in_background(server)
+    with IPCClient(port=server.port, timeout=5) as client:
+        events = client.subscribe(["status"], heartbeat=5)
+        assert next(events)["topic"] == "subscribed"
+        server.request_stop()
+        remaining = list(events)  # The stream ends instead of hanging.
+        assert all(event["topic"] != "subscribed" for event in remaining)
+    serving.result(5)
+    assert event_bus.subscriber_count() == 0
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+
+import pytest
+
+from src.lite_agent import logs
+from src.lite_agent.commands import registry
+from src.lite_agent.logs import LogPipeline, RingBufferHandler
+
+
+@pytest.fixture
+def root_handlers():
+    root = logging.getLogger()
+    saved, level = list(root.handlers), root.level
+    root.setLevel(logging.INFO)
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _record(name, level, message, created):
+    record = logging.LogRecord(name, level, __file__, 1, message, None, None)
+    record.created = created
+    return record
+
+
+def test_ring_buffer_keeps_the_latest_records_and_filters():
+    buffer = RingBufferHandler(capacity=3)
+    for i, (name, level) in enumerate(
+        [
+            ("app", logging.INFO),
+            ("app.db", logging.WARNING),
+            ("other", logging.ERROR),
+            ("app", logging.INFO),
+        ]
+    ):
+        buffer.handle(_record(name, level, f"message {i}", created=100.0 + i))
+
+    assert [r["message"] for r in buffer.tail()] == [
+        "message 1",
+        "message 2",
+        "message 3",
+    ]
+    assert [r["message"] for r in buffer.tail(lines=1)] == ["message 3"]
+    assert [r["message"] for r in buffer.tail(level=logging.WARNING)] == [
+        "message 1",
+        "message 2",
+    ]
+    assert [r["logger"] for r in buffer.tail(logger="app")] == ["app.db", "app"]
+    assert [r["message"] for r in buffer.tail(contains="2")] == ["message 2"]
+    assert [r["message"] for r in buffer.tail(since=101.0)] == [
+        "message 2",
+        "message 3",
+    ]
+
+    buffer.resize(1)
+    assert [r["message"] for r in buffer.tail()] == ["message 3"]
+
+
+def test_pipeline_writes_the_file_and_buffer_off_the_caller(tmp_path, root_handlers):  # pylint: disable=unused-argument,redefined-outer-name
+    pipeline = LogPipeline()
+    path = tmp_path / "agent.log"
+    pipeline.start({"log_file": str(path)})
+    try:
+        logging.getLogger("lite").warning("disk %s", "full")
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logging.exception("handler failed")
+        # Moving the file keeps what was queued and writes on to the new one.
+        moved = tmp_path / "moved.log"
+        pipeline.configure({"log_file": str(moved)})
+        logging.info("after the move")
+    finally:
+        pipeline.stop()
+
+    assert pipeline._handler not in logging.getLogger().handlers  # pylint: disable=W0212
+    text = path.read_text(encoding="utf-8")
+    assert "WARNING - disk full" in text
+    assert "RuntimeError: boom" in text
+    assert moved.read_text(encoding="utf-8").endswith("INFO - after the move\n")
+    records = pipeline.buffer.tail(logger="lite")
+    assert [r["message"] for r in records] == ["disk full"]
+
+
+def test_full_queue_drops_instead_of_blocking(monkeypatch, root_handlers):  # pylint: disable=unused-argument,redefined-outer-name
+    monkeypatch.setattr(logs, "QUEUE_SIZE", 1)
+    pipeline = LogPipeline()
+    pipeline.start({"log_file": ""})
+    pipeline._listener.stop()  # pylint: disable=W0212  # Stand in for a stalled disk.
+    pipeline._listener = None  # pylint: disable=W0212
+    logging.info("queued")
+    logging.info("dropped")
+    logging.info("dropped too")
+    assert pipeline.dropped == 2
+    pipeline.stop()
+
+
+def test_logs_command_tails_the_daemon_buffer(monkeypatch):
+    buffer = RingBufferHandler()
+    monkeypatch.setattr(logs.log_pipeline, "buffer", buffer)
+    buffer.handle(_record("lite", logging.INFO, "started", created=1.0))
+    buffer.handle(_record("lite", logging.ERROR, "failed", created=2.0))
+
+    reply = asyncio.run(registry.dispatch({"command": "logs", "level": "error"}))
+    assert [r["message"] for r in reply["records"]] == ["failed"]
+    assert reply["buffer_size"] == logs.DEFAULT_BUFFER_SIZE
+
+    reply = asyncio.run(registry.dispatch({"command": "logs", "level": "loud"}))
+    assert "error" in reply
+    assert os.path.basename(logs.log_path({"log_file": "/x/agent.log"}, 1)) == (
+        "agent.1.log"
+    )
@@ -0,0 +1,87 @@
+import asyncio
+
+from src.lite_agent.commands import CommandRegistry
+from src.lite_agent.ipc import IPCClient, IPCServer, agent_command_handler
+from src.lite_agent.metrics import MetricsRegistry, metrics
+
+
+def test_counters_gauges_and_histograms():
+    reg = MetricsRegistry()
+    requests = reg.counter("test_requests_total", "Requests.", ("command",))
+    requests.inc("status")
+    requests.inc("status", amount=2)
+    open_conns = reg.gauge("test_connections", "Connections.")
+    open_conns.inc()
+    open_conns.inc()
+    open_conns.dec()
+    latency = reg.histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+    reg.gauge("test_computed", "Computed.", ("lane",), function=lambda: {("a",): 7})
+
+    assert reg.counter("test_requests_total", "Requests.", ("command",)) is requests
+    text = reg.exposition()
+    assert 'lite_agent_test_requests_total{command="status"} 3' in text
+    assert "lite_agent_test_connections 1" in text
+    assert 'lite_agent_test_seconds_bucket{le="0.1"} 1' in text
+    assert 'lite_agent_test_seconds_bucket{le="1.0"} 2' in text
+    assert 'lite_agent_test_seconds_bucket{le="+Inf"} 3' in text
+    assert "lite_agent_test_seconds_count 3" in text
+    assert 'lite_agent_test_computed{lane="a"} 7' in text
+    snapshot = reg.snapshot()["lite_agent_test_seconds"]["values"][0]
+    assert (snapshot["count"], snapshot["sum"]) == (3, 5.55)
+
+
+def test_write_replaces_the_file(tmp_path):
+    reg = MetricsRegistry()
+    reg.counter("test_total", "Test.").inc()
+    path = tmp_path / "out" / "agent.prom"
+    reg.write(str(path))
+    assert "lite_agent_test_total 1" in path.read_text()
+    assert [p.name for p in path.parent.iterdir()] == ["agent.prom"]
+
+
+def _sample(name, **labels):
+    for value in metrics.snapshot()[name]["values"]:
+        if value["labels"] == labels:
+            return value
+    return None
+
+
+def test_dispatch_records_outcomes_and_latency():
+    commands = CommandRegistry()
+    commands.register("metrics_probe", lambda command_dict: {"ok": True})
+    asyncio.run(commands.dispatch({"command": "metrics_probe"}))
+    assert (
+        _sample("lite_agent_commands_total", command="metrics_probe", outcome="ok")[
+            "value"
+        ]
+        >= 1
+    )
+    assert _sample("lite_agent_command_seconds", command="metrics_probe")["count"] >= 1
+    assert _sample("lite_agent_handler_seconds", command="metrics_probe")["count"] >= 1
+
+
+def test_metrics_command_over_ipc():
+    def client_calls(port):
+        with IPCClient(port=port, timeout=5) as client:
+            client.request({"command": "status"})
+            return (
+                client.request({"command": "metrics"}),
+                client.request({"command": "metrics", "format": "prometheus"}),
+            )
+
+    async def scenario():
+        server = IPCServer(agent_command_handler, port=0)
+        await server.start()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, client_calls, server.port
+            )
+        finally:
+            server.close()
+
+    reply, text = asyncio.run(scenario())
+    assert reply["metrics"]["lite_agent_ipc_requests_total"]["values"]
+    assert "# TYPE lite_agent_ipc_request_seconds histogram" in text["text"]
+    assert "lite_agent_lane_active" in text["text"]
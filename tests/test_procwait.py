@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.lite_agent import procwait
+
+
+@pytest.fixture(params=["pidfd", "psutil"])
+def waiter(request, monkeypatch):
+    if request.param == "psutil":
+        monkeypatch.delattr(procwait.os, "pidfd_open", raising=False)
+    elif not hasattr(os, "pidfd_open"):
+        pytest.skip("needs os.pidfd_open")
+    return procwait.wait_for_exit
+
+
+def _sleeper(seconds):
+    return subprocess.Popen(
+        [sys.executable, "-c", f"import time; time.sleep({seconds})"]
+    )
+
+
+def test_returns_as_soon_as_the_process_exits(waiter):
+    child = _sleeper(0.2)
+    try:
+        started = time.monotonic()
+        assert waiter(child.pid, timeout=5)
+        assert time.monotonic() - started < 2
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_times_out_on_a_running_process_and_ignores_missing_ones(waiter):
+    child = _sleeper(30)
+    try:
+        assert not waiter(child.pid, timeout=0.1)
+    finally:
+        child.kill()
+        child.wait()
+    assert waiter(child.pid, timeout=0.1)  # Reaped: the PID is gone.
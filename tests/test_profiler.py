@@ -0,0 +1,83 @@
+import asyncio
+import pstats
+import signal
+import time
+
+import pytest
+
+from src.lite_agent.commands import registry
+from src.lite_agent.profiler import SAMPLING_SUPPORTED, Profiler
+
+
+def _busy(seconds):
+    deadline = time.process_time() + seconds
+    total = 0
+    while time.process_time() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def test_cprofile_writes_a_pstats_dump(tmp_path):
+    profiler = Profiler()
+    profiler.output_dir = str(tmp_path)
+    profiler.start("cprofile")
+    _busy(0.05)
+    result = profiler.stop()
+    assert not profiler.running
+    stats = pstats.Stats(result["path"])
+    assert any(func == "_busy" for _, _, func in stats.stats)
+    assert result["top"]
+
+
+@pytest.mark.skipif(not SAMPLING_SUPPORTED, reason="needs setitimer and SIGPROF")
+def test_sampling_writes_collapsed_stacks(tmp_path):
+    profiler = Profiler()
+    profiler.output_dir = str(tmp_path)
+    previous = signal.getsignal(signal.SIGPROF)
+    profiler.start("sample", interval=0.002)
+    _busy(0.3)
+    result = profiler.stop()
+    # Nothing is left installed once the profile is written.
+    assert signal.getsignal(signal.SIGPROF) == previous
+    assert signal.getitimer(signal.ITIMER_PROF) == (0.0, 0.0)
+    assert result["samples"] > 0
+    lines = open(result["path"], encoding="utf-8").read().splitlines()
+    busy = [line for line in lines if "_busy (test_profiler.py" in line]
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.startswith("MainThread;") and int(count) > 0
+
+
+def test_only_one_profile_at_a_time(tmp_path):
+    profiler = Profiler()
+    profiler.output_dir = str(tmp_path)
+    with pytest.raises(RuntimeError):
+        profiler.stop()
+    profiler.start("cprofile")
+    try:
+        with pytest.raises(RuntimeError):
+            profiler.start("cprofile")
+    finally:
+        profiler.stop()
+    with pytest.raises(ValueError):
+        profiler.start("perf")
+
+
+def test_profiler_commands_stop_after_a_duration(tmp_path, monkeypatch):
+    from src.lite_agent.reload import reloader
+
+    monkeypatch.setitem(reloader.config, "profile_dir", str(tmp_path))
+
+    async def scenario():
+        started = await registry.dispatch(
+            {"command": "start_profiler", "mode": "cprofile", "duration": 0.1}
+        )
+        assert started["running"] and started["mode"] == "cprofile"
+        again = await registry.dispatch({"command": "start_profiler"})
+        assert "already running" in again["error"]
+        await asyncio.sleep(0.3)
+        return await registry.dispatch({"command": "profiler_status"})
+
+    assert asyncio.run(scenario()) == {"running": False}
+    assert [p.suffix for p in tmp_path.iterdir()] == [".pstats"]
+    stopped = asyncio.run(registry.dispatch({"command": "stop_profiler"}))
+    assert "No profile is running" in stopped["error"]
@@ -0,0 +1,69 @@
+import socket
+import threading
+
+import pytest
+
+from src.lite_agent.protocol import (
+    HEADER,
+    MessageTooLarge,
+    ProtocolError,
+    encode_message,
+    recv_message,
+    send_message,
+)
+
+
+def test_large_message_round_trip():
+    left, right = socket.socketpair()
+    message = {"command": "store", "blob": "x" * (2 * 1024 * 1024)}
+    sender = threading.Thread(target=send_message, args=(left, message))
+    sender.start()
+    try:
+        assert recv_message(right) == message
+    finally:
+        sender.join()
+        left.close()
+        right.close()
+
+
+def test_message_split_across_segments():
+    left, right = socket.socketpair()
+    frame = encode_message({"command": "status"})
+    try:
+        for i in range(len(frame)):
+            left.sendall(frame[i : i + 1])
+        assert recv_message(right) == {"command": "status"}
+    finally:
+        left.close()
+        right.close()
+
+
+def test_oversized_frame_is_rejected():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(HEADER.pack(1024) + b"{}")
+        with pytest.raises(MessageTooLarge):
+            recv_message(right, max_size=16)
+    finally:
+        left.close()
+        right.close()
+
+
+def test_truncated_frame_is_rejected():
+    left, right = socket.socketpair()
+    try:
+        left.sendall(HEADER.pack(10) + b'{"a"')
+        left.close()
+        with pytest.raises(ProtocolError):
+            recv_message(right)
+    finally:
+        right.close()
+
+
+def test_clean_eof_returns_none():
+    left, right = socket.socketpair()
+    left.close()
+    try:
+        assert recv_message(right) is None
+    finally:
+        right.close()
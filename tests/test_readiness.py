@@ -0,0 +1,118 @@
+import os
+import socket
+import subprocess
+import tempfile
+
+import pytest
+
+from src.lite_agent import cli, readiness
+
+needs_pipes = pytest.mark.skipif(
+    not readiness.PIPE_SUPPORTED, reason="needs POSIX pipes and select"
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    monkeypatch.delenv(readiness.READY_FD_ENV, raising=False)
+    monkeypatch.delenv(readiness.NOTIFY_SOCKET_ENV, raising=False)
+    yield
+    readiness.release()
+    readiness.claim_from_environment()  # Forgets any unused notify socket.
+
+
+@needs_pipes
+def test_notify_ready_writes_once_and_closes_the_pipe(monkeypatch):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setenv(readiness.READY_FD_ENV, str(write_fd))
+    readiness.claim_from_environment()
+    assert readiness.READY_FD_ENV not in os.environ
+
+    readiness.notify_ready()
+    readiness.notify_ready()  # Only the first call reports.
+    try:
+        fields = readiness.wait_for_ready(read_fd, timeout=1)
+        assert fields == {"READY": "1", "MAINPID": str(os.getpid())}
+        assert os.read(read_fd, 100) == b""  # The daemon's end is closed.
+    finally:
+        os.close(read_fd)
+    with pytest.raises(OSError):
+        os.fstat(write_fd)
+
+
+@needs_pipes
+def test_wait_for_ready_sees_an_early_exit_and_times_out():
+    read_fd, write_fd = os.pipe()
+    try:
+        with pytest.raises(TimeoutError):
+            readiness.wait_for_ready(read_fd, timeout=0.05)
+        os.close(write_fd)  # The daemon died before reporting.
+        assert readiness.wait_for_ready(read_fd, timeout=1) is None
+    finally:
+        os.close(read_fd)
+
+
+@needs_pipes
+def test_release_and_bad_descriptors(monkeypatch):
+    monkeypatch.setenv(readiness.READY_FD_ENV, "not-a-number")
+    readiness.claim_from_environment()
+    readiness.notify_ready()  # Nothing to report to; must not raise.
+
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setenv(readiness.READY_FD_ENV, str(write_fd))
+    readiness.claim_from_environment()
+    readiness.release()
+    try:
+        assert readiness.wait_for_ready(read_fd, timeout=1) is None
+    finally:
+        os.close(read_fd)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_notify_socket_receives_the_sd_notify_message(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "notify")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.bind(path)
+            monkeypatch.setenv(readiness.NOTIFY_SOCKET_ENV, path)
+            readiness.claim_from_environment()
+            readiness.notify_ready(main_pid=4321)
+            sock.settimeout(1)
+            assert sock.recv(100) == b"READY=1\nMAINPID=4321\n"
+
+
+class _Process:
+    def __init__(self, returncode=None):
+        self.returncode = returncode
+
+    def poll(self):
+        return self.returncode
+
+
+def test_poll_for_ready_probes_until_the_daemon_answers():
+    answers = iter([None, None, 4321])
+    fields = readiness.poll_for_ready(
+        _Process(0), lambda: next(answers), timeout=1, interval=0.01
+    )
+    assert fields == {"READY": "1", "MAINPID": "4321"}
+
+    assert (
+        readiness.poll_for_ready(_Process(1), lambda: None, timeout=1, interval=0.01)
+        is None
+    )
+    with pytest.raises(TimeoutError):
+        readiness.poll_for_ready(_Process(), lambda: None, timeout=0.05, interval=0.01)
+
+
+def test_start_falls_back_to_polling_without_pipes(monkeypatch):
+    launched = []
+
+    def popen(command, **kwargs):
+        launched.append(kwargs)
+        return _Process()
+
+    monkeypatch.setattr(readiness, "PIPE_SUPPORTED", False)
+    monkeypatch.setattr(subprocess, "Popen", popen)
+    monkeypatch.setattr(cli, "_probe_ready", lambda: 99)
+    assert cli._launch(["agent"]) == {"READY": "1", "MAINPID": "99"}  # pylint: disable=W0212
+    assert launched == [{}]  # No descriptors to pass, no pipe to select on.
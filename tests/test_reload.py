@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.lite_agent import config
+from src.lite_agent.commands import registry
+from src.lite_agent.ipc import IPCServer, _serve_until_signalled
+from src.lite_agent.reload import ConfigReloader, changed_keys, reloader
+
+
+def test_changed_keys():
+    assert changed_keys({"a": 1, "b": 2}, {"a": 1, "b": 3, "c": 4}) == ["b", "c"]
+    assert changed_keys({"a": 1}, {}) == ["a"]
+
+
+def test_only_hooks_for_changed_keys_run():
+    calls = []
+    reloader_ = ConfigReloader()
+
+    @reloader_.on_change("io_workers", "cpu_workers")
+    def _pools(config_data, changed):
+        calls.append(("pools", changed, config_data.get("io_workers")))
+
+    @reloader_.on_change("log_level")
+    def _logging(config_data, changed):  # pylint: disable=unused-argument
+        calls.append(("logging", changed))
+
+    reloader_.start({"io_workers": 4, "log_level": "INFO"})
+    result = reloader_.reload({"io_workers": 8, "log_level": "INFO"})
+    assert calls == [("pools", ["io_workers"], 8)]
+    assert result["changed"] == ["io_workers"]
+    assert reloader_.reload({"io_workers": 8, "log_level": "INFO"})["changed"] == []
+    assert len(calls) == 1
+
+
+def test_restart_keys_keep_their_running_values():
+    reloader_ = ConfigReloader()
+    reloader_.start({"ipc_port": 1234})
+    result = reloader_.reload({"ipc_port": 4321, "heartbeat_interval": 60})
+    assert result["restart_required"] == ["ipc_port"]
+    assert result["changed"] == ["heartbeat_interval"]
+    assert reloader_.config == {"ipc_port": 1234, "heartbeat_interval": 60}
+
+
+def test_failed_hook_is_reported_and_retried():
+    reloader_ = ConfigReloader()
+    attempts = []
+
+    @reloader_.on_change("io_workers")
+    def _pools(config_data, changed):  # pylint: disable=unused-argument
+        attempts.append(config_data["io_workers"])
+        if len(attempts) == 1:
+            raise ValueError("pool busy")
+
+    reloader_.start({"io_workers": 4})
+    result = reloader_.reload({"io_workers": 8})
+    assert "pool busy" in next(iter(result["errors"].values()))
+    assert reloader_.config == {"io_workers": 4}
+    assert reloader_.reload({"io_workers": 8})["changed"] == ["io_workers"]
+    assert attempts == [8, 8]
+
+
+def test_blocking_hooks_run_off_the_event_loop():
+    reloader_ = ConfigReloader()
+    threads = {}
+
+    @reloader_.on_change("log_file", blocking=True)
+    def _reopen(config_data, changed):  # pylint: disable=unused-argument
+        threads["blocking"] = threading.current_thread()
+        time.sleep(0.2)
+
+    @reloader_.on_change("lane_io_depth")
+    def _admission(config_data, changed):  # pylint: disable=unused-argument
+        threads["inline"] = threading.current_thread()
+
+    async def scenario():
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.ensure_future(tick())
+        reloader_.start({"log_file": "a.log", "lane_io_depth": 1})
+        result = await reloader_.reload_async({"log_file": "b.log", "lane_io_depth": 2})
+        ticking.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result["changed"] == ["lane_io_depth", "log_file"]
+    assert threads["inline"] is threading.main_thread()
+    assert threads["blocking"] is not threading.main_thread()
+    assert len(ticks) > 5  # The loop kept running while the hook blocked.
+
+
+def test_reload_config_command_rereads_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    monkeypatch.setattr(config, "CONFIG_FILE", str(path))
+    applied = []
+
+    @reloader.on_change("test_reload_key")
+    def _record(config_data, changed):  # pylint: disable=unused-argument
+        applied.append(config_data["test_reload_key"])
+
+    monkeypatch.setattr(reloader, "config", {})
+    path.write_text(json.dumps({"test_reload_key": "on"}))
+    reply = asyncio.run(registry.dispatch({"command": "reload_config"}))
+    assert reply["changed"] == ["test_reload_key"] and applied == ["on"]
+
+    path.write_text("{not json")  # A half-edited file changes nothing.
+    reply = asyncio.run(registry.dispatch({"command": "reload_config"}))
+    assert "Could not read" in reply["error"]
+    assert reloader.config == {"test_reload_key": "on"}
+
+
+def test_update_config_applies_pushed_settings(monkeypatch):
+    applied = []
+
+    @reloader.on_change("test_update_key", "test_update_gone")
+    def _record(config_data, changed):  # pylint: disable=unused-argument
+        applied.append(sorted(changed))
+
+    monkeypatch.setattr(reloader, "config", {"test_update_gone": "1", "ipc_port": 1})
+    reply = asyncio.run(
+        registry.dispatch(
+            {
+                "command": "update_config",
+                "settings": {"test_update_key": "on", "ipc_port": 2},
+                "unset": ["test_update_gone"],
+            }
+        )
+    )
+    assert reply["changed"] == ["test_update_gone", "test_update_key"]
+    assert reply["restart_required"] == ["ipc_port"]
+    assert reloader.config == {"test_update_key": "on", "ipc_port": 1}
+    assert applied == [["test_update_gone", "test_update_key"]]
+
+    reply = asyncio.run(registry.dispatch({"command": "update_config", "unset": "x"}))
+    assert "error" in reply
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="needs SIGHUP")
+def test_sighup_reloads_on_the_event_loop():
+    async def scenario():
+        server = IPCServer(lambda command_dict: {}, port=0)
+        hangups = []
+
+        def on_hangup():
+            hangups.append(asyncio.get_running_loop())
+            server.request_stop()
+
+        serving = asyncio.ensure_future(_serve_until_signalled(server, on_hangup))
+        while server.port == 0:
+            await asyncio.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGHUP)
+        await asyncio.wait_for(serving, 5)
+        assert hangups == [asyncio.get_running_loop()]
+
+    asyncio.run(scenario())
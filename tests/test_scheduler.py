@@ -0,0 +1,175 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from src.lite_agent import scheduler as scheduler_module
+from src.lite_agent.commands import registry
+from src.lite_agent.scheduler import ScheduledTask, Scheduler, parse_interval
+
+
+@pytest.fixture
+def scheduler():
+    sched = Scheduler()
+    sched.start()
+    yield sched
+    sched.stop()
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_parse_interval():
+    assert parse_interval("90s") == 90
+    assert parse_interval("5m") == 300
+    assert parse_interval("1h") == 3600
+    assert parse_interval(2.5) == 2.5
+    assert parse_interval(None) is None
+
+
+def test_one_shot_and_periodic_tasks(scheduler):
+    fired = []
+    ticks = []
+    scheduler.schedule("once", lambda: fired.append(1), delay=0.05)
+    scheduler.schedule("tick", lambda: ticks.append(1), interval=0.02)
+    assert _wait_for(lambda: fired and len(ticks) >= 3)
+    time.sleep(0.1)
+    assert fired == [1]
+    names = [task["name"] for task in scheduler.list()]
+    assert names == ["tick"]  # The one-shot task left the table.
+    assert scheduler.cancel("tick")
+    assert not scheduler.cancel("tick")
+
+
+@pytest.mark.parametrize(
+    "policy, expected_times", [("skip", []), ("run_once", [1]), ("catch_up", [4])]
+)
+def test_missed_run_policies(policy, expected_times):
+    now = [100.0]
+    started = []
+
+    def runner(task, times):
+        started.append(times)
+        future = concurrent.futures.Future()
+        future.set_result(None)
+        return future
+
+    sched = Scheduler(runner=runner, clock=lambda: now[0])
+    task = sched.schedule("t", print, interval=10, missed=policy)
+    now[0] = task.slot + 35  # Three whole slots passed unseen.
+    with sched._cond:  # pylint: disable=protected-access
+        sched._fire(task, now[0])  # pylint: disable=protected-access
+    assert started == expected_times
+    assert task.misses == 3
+    assert task.slot == 100.0 + 40  # Still on the original cadence.
+
+
+@pytest.mark.parametrize("policy, expected_times", [("skip", []), ("run_once", [1])])
+def test_restored_overdue_task_follows_its_missed_policy(
+    monkeypatch, policy, expected_times
+):
+    now = [1000.0]
+    started = []
+
+    def runner(task, times):
+        started.append(times)
+        future = concurrent.futures.Future()
+        future.set_result(None)
+        return future
+
+    sched = Scheduler(runner=runner, clock=lambda: now[0])
+    monkeypatch.setattr(scheduler_module, "scheduler", sched)
+    item = {
+        "command": {
+            "function": "log_heartbeat",
+            "name": "hb",
+            "interval": 10,
+            "missed": policy,
+        },
+        "due_at": time.time() - 35,  # Down for three and a half slots.
+    }
+    task = scheduler_module.restore_task(7, item)
+    assert task.slot == pytest.approx(now[0] - 35, abs=1)
+    with sched._cond:  # pylint: disable=protected-access
+        sched._fire(task, now[0])  # pylint: disable=protected-access
+    assert started == expected_times
+    assert task.misses == 3
+    assert task.slot == pytest.approx(now[0] + 5, abs=1)  # Next slot, on cadence.
+
+
+def test_runs_never_overlap_and_deadlines_are_reported(scheduler):
+    release = threading.Event()
+    scheduler.schedule("slow", release.wait, interval=0.02, deadline=0.05)
+    task = scheduler.get("slow")
+    assert _wait_for(lambda: task.overruns >= 1 and task.deadline_misses == 1)
+    assert not scheduler.trigger("slow")  # Still running.
+    release.set()
+    assert _wait_for(lambda: task.runs >= 1)
+
+
+def test_failures_are_recorded(scheduler):
+    def boom():
+        raise RuntimeError("nope")
+
+    task = scheduler.schedule("boom", boom, delay=0)
+    assert _wait_for(lambda: task.failures == 1)
+    assert "nope" in task.last_error
+
+
+def test_low_priority_tasks_are_deferred_under_pressure(scheduler):
+    ran = []
+    scheduler.set_deferring(True)
+    scheduler.schedule("report", lambda: ran.append("report"), delay=0, priority="low")
+    scheduler.schedule("urgent", lambda: ran.append("urgent"), delay=0)
+    assert _wait_for(lambda: "urgent" in ran)
+    time.sleep(0.05)
+    assert ran == ["urgent"]
+    assert scheduler.deferred == ["report"]
+    assert scheduler.get("report").deferrals == 1
+
+    scheduler.set_deferring(False)
+    assert _wait_for(lambda: "report" in ran)
+    assert scheduler.deferred == []
+
+
+def test_ipc_commands():
+    result = asyncio.run(
+        registry.dispatch({"command": "schedule_task", "function": "missing"})
+    )
+    assert "Unknown task function" in result["error"]
+    result = asyncio.run(
+        registry.dispatch(
+            {
+                "command": "schedule_task",
+                "function": "log_heartbeat",
+                "name": "hb",
+                "interval": "1h",
+            }
+        )
+    )
+    assert result["status"] == "scheduled"
+    assert result["task"]["interval"] == 3600
+    listing = asyncio.run(registry.dispatch({"command": "list_tasks"}))
+    assert "log_heartbeat" in listing["functions"]
+    assert [t["name"] for t in listing["tasks"]] == ["hb"]
+    result = asyncio.run(
+        registry.dispatch({"command": "unschedule_task", "name": "hb"})
+    )
+    assert result["status"] == "unscheduled"
+
+
+def test_task_validation():
+    with pytest.raises(ValueError):
+        ScheduledTask("bad", print, interval=10, missed="sometimes")
+    with pytest.raises(ValueError):
+        ScheduledTask("bad", print, interval=0)
+    with pytest.raises(ValueError):
+        ScheduledTask("bad", print, priority="urgent")
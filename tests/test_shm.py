@@ -0,0 +1,54 @@
+import os
+import time
+
+import pytest
+
+from src.lite_agent import shm
+
+pytestmark = pytest.mark.skipif(
+    not os.path.isdir("/dev/shm"), reason="POSIX shared memory not visible"
+)
+
+
+def _exists(name):
+    return os.path.exists(os.path.join("/dev/shm", name))
+
+
+def test_attach_claims_and_unlinks_segment():
+    handle = shm.share(b"bulk payload" * 1000)
+    assert shm.is_handle(handle)
+    assert _exists(handle["__shm__"])
+    with shm.attach(handle) as view:
+        assert not _exists(handle["__shm__"])
+        assert view.readonly
+        assert bytes(view[:12]) == b"bulk payload"
+    assert shm.release_all() == 0  # Already claimed: nothing left to unlink.
+
+
+def test_unclaimed_segment_is_reaped():
+    handle = shm.share(b"x", ttl=30)
+    assert _exists(handle["__shm__"])
+    assert shm.reap_expired(now=time.monotonic() + 60) == 1
+    assert not _exists(handle["__shm__"])
+
+
+def test_reaper_unlinks_expired_segments_without_another_share():
+    handle = shm.share(b"x", ttl=0.1)
+    deadline = time.monotonic() + 5
+    while _exists(handle["__shm__"]) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not _exists(handle["__shm__"])
+    assert shm.release_all() == 0
+
+
+def test_sweep_removes_segments_of_dead_creators():
+    dead_pid = 2**22 + 12345  # Above the default pid_max, so never alive.
+    name = f"{shm.SHM_PREFIX}{dead_pid}_deadbeef"
+    shm._open(name, create=True, size=16).close()
+    live = shm.share(b"still owned")
+    try:
+        assert shm.sweep_orphans() >= 1
+        assert not _exists(name)
+        assert _exists(live["__shm__"])
+    finally:
+        shm.release_all()
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.lite_agent import supervisor as supervisor_module
+from src.lite_agent.ipc import IPCClient, IPCServer, bind_listeners
+from src.lite_agent.supervisor import (
+    PREFORK_SUPPORTED,
+    Supervisor,
+    resolve_worker_count,
+)
+
+pytestmark = pytest.mark.skipif(not PREFORK_SUPPORTED, reason="needs os.fork")
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _ask_pid(port):
+    with IPCClient(port=port, timeout=10) as client:
+        return client.request({"command": "pid"})["pid"]
+
+
+def test_resolve_worker_count():
+    assert resolve_worker_count(None) == 1
+    assert resolve_worker_count("3") == 3
+    assert resolve_worker_count("auto") == (os.cpu_count() or 1)
+
+
+def test_workers_share_the_socket_and_are_restarted():
+    sockets = bind_listeners(port=0)
+    port = sockets[0].getsockname()[1]
+
+    def worker_main(index):  # pylint: disable=unused-argument
+        server = IPCServer(lambda command: {"pid": os.getpid()}, sockets=sockets)
+        asyncio.run(server.serve_forever())
+
+    supervisor = Supervisor(2, worker_main)
+    thread = threading.Thread(target=supervisor.run)
+    thread.start()
+    try:
+        assert _wait_for(lambda: len(supervisor.children) == 2)
+        workers = set(supervisor.children)
+        assert {_ask_pid(port) for _ in range(8)} <= workers
+
+        victim = next(iter(workers))
+        os.kill(victim, signal.SIGKILL)
+        assert _wait_for(
+            lambda: supervisor.restarts == 1 and len(supervisor.children) == 2
+        )
+        assert victim not in supervisor.children
+        assert _ask_pid(port) in supervisor.children
+    finally:
+        supervisor.stop()
+        thread.join(15)
+        for sock in sockets:
+            sock.close()
+    assert not thread.is_alive()
+    assert not supervisor.children
+
+
+def test_stop_is_not_held_up_by_a_restart_backoff(monkeypatch):
+    monkeypatch.setattr(supervisor_module, "MIN_UPTIME", 60.0)
+
+    def worker_main(index):
+        if index == 0:
+            return 1  # Crash-loops, so its restart is backed off.
+        time.sleep(60)  # Until the supervisor's SIGTERM.
+        return 0
+
+    supervisor = Supervisor(2, worker_main)
+    supervisor._backoff[0] = supervisor_module.MAX_BACKOFF  # pylint: disable=W0212
+    thread = threading.Thread(target=supervisor.run)
+    thread.start()
+    try:
+        assert _wait_for(lambda: list(supervisor.children.values()) == [1])
+        time.sleep(0.2)  # Well into the 30 s backoff.
+    finally:
+        started = time.monotonic()
+        supervisor.stop()
+        thread.join(15)
+    assert not thread.is_alive()
+    assert time.monotonic() - started < 5
+    assert supervisor.restarts == 0
@@ -0,0 +1,71 @@
+import asyncio
+
+from src.lite_agent.admission import AdmissionController
+from src.lite_agent.commands import registry
+from src.lite_agent.executor import ExecutionEngine
+from src.lite_agent.scheduler import Scheduler
+from src.lite_agent.throttle import ResourceGovernor
+
+CALM = {"cpu_percent": 10.0, "load_per_cpu": 0.2, "memory_percent": 40.0}
+BUSY = dict(CALM, cpu_percent=97.0)
+WARM = dict(CALM, cpu_percent=80.0)  # Under the threshold, over the recovery mark.
+
+
+def _governor():
+    engine = ExecutionEngine(io_workers=8, cpu_workers=4)
+    governor = ResourceGovernor(engine, AdmissionController(), Scheduler())
+    governor.configure({})
+    return governor
+
+
+def _limits(governor):
+    lanes = governor.status()["limits"]["lanes"]
+    return (
+        governor.engine.workers["io"],
+        governor.engine.workers["cpu"],
+        lanes["normal"]["concurrency"],
+        lanes["control"]["concurrency"],
+    )
+
+
+def test_pressure_shrinks_limits_and_calm_restores_them():
+    governor = _governor()
+    governor.update(BUSY)
+    assert governor.scale == 0.5
+    assert governor.pressure == ["cpu_percent"]
+    assert _limits(governor) == (4, 2, 2, 8)  # The control lane is never scaled.
+    assert governor.scheduler.deferred == [] and governor.scheduler._deferring  # pylint: disable=W0212
+
+    governor.update(BUSY)
+    governor.update(BUSY)
+    assert governor.scale == 0.25  # throttle_min_scale
+    assert _limits(governor) == (2, 1, 1, 8)
+
+    governor.update(WARM)
+    assert governor.scale == 0.25  # Holds between the two marks.
+    governor.update(CALM)
+    governor.update(CALM)
+    governor.update(CALM)
+    assert governor.scale == 1.0
+    assert _limits(governor) == (8, 4, 4, 8)
+    assert not governor.scheduler._deferring  # pylint: disable=W0212
+
+
+def test_configured_limits_survive_throttling():
+    governor = _governor()
+    governor.update(BUSY)
+    # A reload while throttled changes the limit the scale applies to.
+    governor.engine.apply_config({"io_workers": "16"})
+    governor.admission.apply_config({"lane_normal_concurrency": "10"})
+    assert _limits(governor)[:3] == (8, 2, 5)
+
+    governor.configure({"throttle": "false", "throttle_rss_mb": "512"})
+    assert governor.scale == 1.0
+    assert governor.thresholds["rss_mb"] == 512.0
+    assert _limits(governor) == (16, 4, 10, 8)
+
+
+def test_throttle_status_command():
+    status = asyncio.run(registry.dispatch({"command": "throttle_status"}))
+    assert {"enabled", "scale", "readings", "thresholds", "limits"} <= set(status)
+    assert set(status["limits"]["lanes"]) == {"control", "normal", "bulk"}